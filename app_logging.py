@@ -0,0 +1,51 @@
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# DEBUG shows per-message chatter (parsed times, intents); the default keeps only problems
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_root = logging.getLogger("calendar_app")
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"calendar_app.{name}")
+
+
+def start_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Route the app's loggers through a queue: callers only enqueue the record and a
+    listener thread does the stderr write, so a slow terminal or pipe never stalls a
+    request. Disabled levels are rejected before the message is even formatted.
+    """
+    global _listener
+    _root.setLevel(level)
+    if _listener is not None:
+        return
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _root.addHandler(QueueHandler(records))
+    _root.propagate = False
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write out whatever is still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        for handler in list(_root.handlers):
+            if isinstance(handler, QueueHandler):
+                _root.removeHandler(handler)
+        _root.propagate = True
+
+
+start_logging()
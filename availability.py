@@ -0,0 +1,60 @@
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+from zoneinfo import ZoneInfo
+
+Interval = Tuple[datetime, datetime]
+
+
+def parse_rfc3339(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def events_to_intervals(events: Iterable[Dict], tz: ZoneInfo) -> List[Interval]:
+    """Busy intervals for Google events; all-day `date` events are anchored in `tz`."""
+    intervals = []
+    for event in events:
+        if event.get('transparency') == 'transparent' or event.get('status') == 'cancelled':
+            continue
+        start = event['start'].get('dateTime')
+        end = event['end'].get('dateTime')
+        if start and end:
+            intervals.append((parse_rfc3339(start), parse_rfc3339(end)))
+        else:
+            intervals.append((
+                datetime.combine(date.fromisoformat(event['start']['date']), time.min, tz),
+                datetime.combine(date.fromisoformat(event['end']['date']), time.min, tz),
+            ))
+    return intervals
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort and merge overlapping/touching busy intervals."""
+    merged: List[Interval] = []
+    # Comparing aware datetimes is slow (offsets are resolved on every comparison), so
+    # sort on a precomputed timestamp; ends don't need ordering, the merge takes the max
+    for start, end in sorted(intervals, key=lambda interval: interval[0].timestamp()):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def overlaps(busy: List[Interval], interval: Interval) -> bool:
+    """Whether `interval` intersects any of the (merged, sorted) busy intervals."""
+    i = bisect_left(busy, (interval[1],))
+    return i > 0 and busy[i - 1][1] > interval[0]
+
+
+def working_windows(
+    first_day: date, last_day: date, work_start: time, work_end: time, tz: ZoneInfo
+) -> List[Interval]:
+    """One [work_start, work_end) window per day from first_day to last_day inclusive."""
+    windows = []
+    day = first_day
+    while day <= last_day:
+        windows.append((datetime.combine(day, work_start, tz), datetime.combine(day, work_end, tz)))
+        day += timedelta(days=1)
+    return windows
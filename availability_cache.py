@@ -0,0 +1,52 @@
+from datetime import date
+from typing import Dict, List, Optional
+
+from availability import Interval, merge_intervals
+from ttl_cache import TTLCache
+
+
+class AvailabilityCache:
+    """
+    Busy intervals per (user, calendar, day), so repeated availability checks in a
+    chat don't go back to Google. Bookings write through into the cached day instead
+    of evicting it.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 5 * 60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.write_throughs = 0
+
+    @staticmethod
+    def _key(user_id: str, calendar_id: str, day: date):
+        return (user_id, calendar_id, day.isoformat())
+
+    def get(self, user_id: str, calendar_id: str, day: date) -> Optional[List[Interval]]:
+        return self._cache.get(self._key(user_id, calendar_id, day))
+
+    def set(self, user_id: str, calendar_id: str, day: date, busy: List[Interval]) -> None:
+        self._cache.set(self._key(user_id, calendar_id, day), merge_intervals(busy))
+
+    def add_busy(self, user_id: str, calendar_id: str, day: date, interval: Interval) -> bool:
+        updated = self._cache.update(
+            self._key(user_id, calendar_id, day),
+            lambda busy: merge_intervals(busy + [interval]),
+        )
+        if updated:
+            self.write_throughs += 1
+        return updated
+
+    def invalidate(self, user_id: str, calendar_id: str, day: date) -> None:
+        self._cache.pop(self._key(user_id, calendar_id, day))
+
+    def invalidate_calendar(self, user_id: str, calendar_id: str) -> int:
+        return self._cache.pop_where(lambda key: key[0] == user_id and key[1] == calendar_id)
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._cache.stats()
+        stats["write_throughs"] = self.write_throughs
+        # Every hit is an events.list call we didn't have to make
+        stats["api_calls_saved"] = stats["hits"]
+        return stats
+
+
+default_availability_cache = AvailabilityCache()
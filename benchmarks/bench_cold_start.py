@@ -0,0 +1,79 @@
+# === benchmarks/bench_cold_start.py ===
+#
+# Cold start of a worker, measured in fresh processes: `import main`, the lifespan hook
+# until the app serves, the first client build, and the first chat messages (one the
+# fast path understands, one that needs dateparser). Runs both STARTUP_MODEs.
+#
+#   python benchmarks/bench_cold_start.py [--runs 3] [--modes prewarm lazy]
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ["import", "lifespan", "client_build", "chat_fast_path", "chat_dateparser"]
+TOKEN = json.dumps({"token": "cold-start", "refresh_token": "cold-start", "client_id": "cold-start",
+                    "client_secret": "cold-start", "token_uri": "https://oauth2.googleapis.com/token"})
+
+
+async def child() -> dict:
+    timings = {}
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import main
+    timings["import"] = time.perf_counter() - started
+
+    import httpx
+
+    started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        timings["lifespan"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        main.client_pool.get("cold-start", TOKEN)
+        timings["client_build"] = time.perf_counter() - started
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            for phase, message in (("chat_fast_path", "book a meeting tomorrow at 3 pm"),
+                                   ("chat_dateparser", "book a meeting a fortnight from now")):
+                started = time.perf_counter()
+                await client.post("/chat", json={"message": message, "session_id": "cold-start"})
+                timings[phase] = time.perf_counter() - started
+    return timings
+
+
+def run_child(mode: str) -> dict:
+    env = dict(os.environ, STARTUP_MODE=mode, LOG_LEVEL="ERROR")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"], env=env, cwd=ROOT,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["prewarm", "lazy"], choices=["prewarm", "lazy"])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child())))
+        return
+
+    print(f"{'mode':<10}" + "".join(f"{phase:>17}" for phase in PHASES) + "   (median ms)")
+    for mode in args.modes:
+        runs = [run_child(mode) for _ in range(args.runs)]
+        medians = [statistics.median(run[phase] for run in runs) * 1e3 for phase in PHASES]
+        print(f"{mode:<10}" + "".join(f"{value:>17.1f}" for value in medians))
+
+
+if __name__ == "__main__":
+    main()
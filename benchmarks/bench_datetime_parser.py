@@ -0,0 +1,90 @@
+# === benchmarks/bench_datetime_parser.py ===
+#
+# Micro-benchmark for chat datetime parsing: plain dateparser (what /chat used to
+# call first on every message) vs the precompiled fast path, cold and memoized, and
+# main.parse_datetime_from_message as /chat awaits it (fallback pool included).
+#
+#   python benchmarks/bench_datetime_parser.py [--rounds 200]
+
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dateparser
+
+import datetime_parser
+
+MESSAGES = [
+    "Book meeting next Friday at 3 PM",
+    "Schedule call Tuesday at 11 AM",
+    "Meeting tomorrow at 2 PM",
+    "tomorrow 10 am",
+    "book on 2026-10-20 at 3:30 PM",
+    "oct 20th 2-3pm",
+    "can we do monday between 2 and 3pm",
+    "Next Monday 2 PM",
+]
+
+
+def bench(label: str, fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            fn(message)
+    per_call = (time.perf_counter() - start) / (rounds * len(MESSAGES))
+    print(f"{label:<28} {per_call * 1e6:10.1f} us/call")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    settings = {'DATE_ORDER': 'MDY'}
+
+    start = time.perf_counter()
+    dateparser.parse("tomorrow", settings=settings)
+    print(f"{'dateparser first call':<28} {(time.perf_counter() - start) * 1e3:10.1f} ms")
+
+    baseline = bench("dateparser.parse", lambda m: dateparser.parse(m, settings=settings), max(1, args.rounds // 10))
+
+    def cold(message):
+        datetime_parser._fast_parse.cache_clear()
+        return datetime_parser.parse_datetime(message, now)
+
+    fast = bench("fast path (no memo)", cold, args.rounds)
+    datetime_parser._fast_parse.cache_clear()
+    memo = bench("fast path (memoized)", lambda m: datetime_parser.parse_datetime(m, now), args.rounds)
+
+    print(f"\nspeedup vs dateparser: {baseline / fast:.0f}x cold, {baseline / memo:.0f}x memoized")
+    print(datetime_parser.cache_info())
+
+    # End to end through the /chat helper; the last message misses the fast path
+    api = importlib.import_module("main")
+    datetime_parser.start_fallback_pool()
+    messages = MESSAGES + ["let's meet the day after tomorrow around noon"]
+
+    async def chat_parse(rounds: int) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for message in messages:
+                await api.parse_datetime_from_message(message)
+        return (time.perf_counter() - start) / (rounds * len(messages))
+
+    try:
+        per_call = asyncio.run(chat_parse(max(1, args.rounds // 10)))
+    finally:
+        datetime_parser.stop_fallback_pool()
+    print(f"\n{'parse_datetime_from_message':<28} {per_call * 1e6:10.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# === benchmarks/bench_slots.py ===
+#
+# Micro-benchmark for slot computation: CalendarService._find_available_slots over
+# raw Google events at growing calendar sizes, and repeated "is X free" lookups on
+# a prebuilt SlotEngine.
+#
+#   python benchmarks/bench_slots.py [--rounds 200]
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import events_to_intervals
+from calendar_service import CalendarService
+from slot_engine import SchedulingPreferences, SlotEngine
+
+
+def random_events(count: int, day_start: datetime, tz: ZoneInfo):
+    events = []
+    for i in range(count):
+        if i % 50 == 49:
+            # The odd all-day event
+            events.append({"start": {"date": day_start.date().isoformat()},
+                           "end": {"date": (day_start + timedelta(days=1)).date().isoformat()},
+                           "transparency": "transparent"})
+            continue
+        start = day_start + timedelta(minutes=random.randrange(0, 24 * 60, 5))
+        end = start + timedelta(minutes=random.choice([15, 30, 45, 60, 90]))
+        events.append({"start": {"dateTime": start.isoformat()}, "end": {"dateTime": end.isoformat()}})
+    return events
+
+
+def bench(label: str, fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    per_call = (time.perf_counter() - start) / rounds
+    print(f"{label:<40} {per_call * 1e6:10.1f} us/call")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    tz = ZoneInfo("Asia/Kolkata")
+    # No Google client is needed for pure slot computation
+    service = CalendarService(None, service=object(), preferences=SchedulingPreferences(
+        buffer_before_minutes=10, buffer_after_minutes=10, granularity_minutes=15
+    ))
+    day_start = datetime.combine((datetime.now(tz) + timedelta(days=1)).date(), datetime.min.time(), tz)
+    work_start, work_end = day_start.replace(hour=9), day_start.replace(hour=17)
+
+    for count in (10, 100, 1000, 10000):
+        events = random_events(count, day_start, tz)
+        bench(f"_find_available_slots ({count} events)",
+              lambda: service._find_available_slots(work_start, work_end, events, 30),
+              max(1, args.rounds // max(1, count // 100)))
+
+    events = random_events(10000, day_start, tz)
+    engine = SlotEngine(events_to_intervals(events, tz), service.preferences)
+    probes = [day_start + timedelta(minutes=random.randrange(0, 24 * 60, 5)) for _ in range(1000)]
+
+    def is_free():
+        for probe in probes:
+            engine.is_free(probe, probe + timedelta(minutes=30))
+
+    per_batch = bench("SlotEngine.is_free x1000 (10000 events)", is_free, args.rounds)
+    print(f"{'  per lookup':<40} {per_batch / len(probes) * 1e6:10.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# === benchmarks/load_test.py ===
+#
+# End-to-end load test of /chat and /calendar/book. The FastAPI app runs in-process
+# (lifespan included) and its Google client talks to fake_google.FakeGoogleServer, so
+# the whole stack runs for real: routing, parsing, caches, rate limiting, retries and
+# the HTTP round-trips to "Google".
+#
+#   python benchmarks/load_test.py --scenario chat --users 50 --concurrency 20 --requests 500
+#   python benchmarks/load_test.py --latency 0.08 --error-rate 0.02 --json results.json
+#   python benchmarks/load_test.py --max-p95-ms 300     # exit 1 if any p95 is worse
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from fake_google import FakeGoogleServer, owner_calendar
+
+# One booking per hour between 09:00 and 17:00; chat books 45 minutes, so they never overlap
+SLOTS_PER_DAY = 8
+
+
+def fake_token(access_token: str) -> str:
+    # Far-future expiry, so google-auth never tries to refresh against the real endpoint
+    expiry = (datetime.now(timezone.utc) + timedelta(days=365)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return json.dumps({
+        "token": access_token, "refresh_token": "load-test", "client_id": "load-test",
+        "client_secret": "load-test", "token_uri": "https://oauth2.googleapis.com/token", "expiry": expiry,
+    })
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies, failures: int, wall_seconds: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "endpoint": name,
+        "requests": len(latencies),
+        "failures": failures,
+        "throughput_rps": len(latencies) / wall_seconds if wall_seconds else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p95_ms": percentile(latencies, 95) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1e3,
+    }
+
+
+def slot_for(n: int, first_day):
+    """The n-th distinct slot for a user, so bookings never collide with each other."""
+    day = first_day + timedelta(days=n // SLOTS_PER_DAY)
+    minutes = 9 * 60 + (n % SLOTS_PER_DAY) * 60
+    return day.isoformat(), f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+async def run(args) -> dict:
+    server = FakeGoogleServer(latency=args.latency, error_rate=args.error_rate).start()
+    os.environ["CALENDAR_API_ENDPOINT"] = server.url
+    # Injected errors make the app log every retry; keep the report readable
+    os.environ.setdefault("LOG_LEVEL", "DEBUG" if args.verbose else "ERROR")
+    import main  # only now, so CalendarService and the logger pick up the settings above
+
+    # Start far enough ahead that slots never fall inside minimum notice
+    first_day = (datetime.now() + timedelta(days=2)).date()
+    users = [f"load-user-{i}" for i in range(args.users)]
+    for user_id in users:
+        main.user_tokens[user_id] = fake_token(user_id)
+        # Some existing meetings, on days the test doesn't book into
+        for _ in range(args.seed_events):
+            start = datetime.combine(first_day - timedelta(days=1), datetime.min.time(), timezone.utc)
+            start += timedelta(minutes=random.randrange(0, 24 * 60, 15))
+            server.add_event(owner_calendar(user_id), start, start + timedelta(minutes=30))
+
+    scenarios = ["chat", "book"] if args.scenario == "both" else [args.scenario]
+    jobs = [(scenarios[n % len(scenarios)], users[n % len(users)], n // len(users)) for n in range(args.requests)]
+    user_locks = {user_id: asyncio.Lock() for user_id in users}
+    latencies = {"chat": [], "book": []}
+    failures = {"chat": 0, "book": 0}
+
+    async def timed(client, name: str, path: str, payload: dict):
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload)
+            body = response.json()
+        except Exception:
+            body = None
+        latencies[name].append(time.perf_counter() - start)
+        return body
+
+    async def chat_booking(client, user_id: str, n: int):
+        date, start_time = slot_for(n, first_day)
+        hour, minute = map(int, start_time.split(":"))
+        spoken = f"{(hour - 1) % 12 + 1}:{minute:02d} {'PM' if hour >= 12 else 'AM'}"
+        proposal = await timed(client, "chat", "/chat", {
+            "message": f"Book meeting on {date} at {spoken}", "session_id": user_id,
+        })
+        if not proposal or "Should I confirm" not in proposal.get("response", ""):
+            failures["chat"] += 1
+            return
+        confirmation = await timed(client, "chat", "/chat", {"message": "yes", "session_id": user_id})
+        if not confirmation or not confirmation.get("booking_confirmed"):
+            failures["chat"] += 1
+
+    async def api_booking(client, user_id: str, n: int):
+        date, start_time = slot_for(n, first_day + timedelta(days=60))
+        result = await timed(client, "book", "/calendar/book", {
+            "user_id": user_id, "title": "Load test", "date": date, "start_time": start_time,
+            "duration_minutes": 30, "idempotency_key": uuid.uuid4().hex,
+        })
+        if not result or not result.get("success"):
+            failures["book"] += 1
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def worker(client):
+        while True:
+            try:
+                scenario, user_id, n = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # One conversation per user at a time, like a real chat tab
+            async with user_locks[user_id]:
+                if scenario == "chat":
+                    await chat_booking(client, user_id, n)
+                else:
+                    await api_booking(client, user_id, n)
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+            wall = time.perf_counter() - started
+            stats = (await client.get("/cache/stats")).json()
+            if args.metrics:
+                with open(args.metrics, "w") as f:
+                    f.write((await client.get("/metrics")).text)
+    server.stop()
+
+    return {
+        "config": vars(args),
+        "wall_seconds": wall,
+        "results": [summarize(name, latencies[name], failures[name], wall) for name in scenarios],
+        "fake_google": {"requests": server.requests, "errors_injected": server.errors_injected},
+        "google_api": stats.get("google_api"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /chat and /calendar/book against a fake Google Calendar")
+    parser.add_argument("--scenario", choices=["chat", "book", "both"], default="both")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="bookings to make (a chat booking is two messages)")
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds the fake Google adds per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake Google calls that fail")
+    parser.add_argument("--seed-events", type=int, default=20, help="existing events per user")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="exit 1 if any endpoint's p95 is above this")
+    parser.add_argument("--metrics", help="write the app's /metrics scrape after the run to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the app's debug log")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    print(f"{'endpoint':<10} {'requests':>8} {'failed':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in report["results"]:
+        print(f"{r['endpoint']:<10} {r['requests']:>8} {r['failures']:>7} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    print(f"\nfake Google: {report['fake_google']}")
+    print(f"google_api:  {report['google_api']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if args.max_p95_ms is not None:
+        slow = [r["endpoint"] for r in report["results"] if r["p95_ms"] > args.max_p95_ms]
+        if slow:
+            print(f"\np95 above {args.max_p95_ms} ms for: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
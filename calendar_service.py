@@ -1,117 +1,749 @@
-from datetime import datetime, timedelta
-from typing import List, Dict
-from googleapiclient.discovery import build
+import os
+from dataclasses import replace
+from datetime import date, datetime, timedelta, time
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from urllib.parse import urljoin
+from zoneinfo import ZoneInfo
+import httplib2
 from google.oauth2.credentials import Credentials
 
+from app_logging import get_logger
+from availability import Interval, events_to_intervals, merge_intervals, overlaps, parse_rfc3339, working_windows
+from availability_cache import AvailabilityCache, default_availability_cache
+from event_mirror import EventMirror, MirrorRegistry, default_mirror_registry
+from google_executor import GoogleApiExecutor, default_executor
+from idempotency import IdempotencyIndex, default_idempotency_index, event_id_for
+from metrics import default_registry
+from rate_limiter import GoogleUnavailable, error_status
+from singleflight import SingleFlight, default_singleflight
+from slot_engine import BusyTimeline, SchedulingPreferences, SlotEngine, format_slots
+from slot_index import SLOT_INDEX_DAYS, FreeSlotIndex, SlotIndexRegistry, default_slot_index_registry
+
+# Point the Google client somewhere else, e.g. the fake server used by benchmarks/load_test.py
+CALENDAR_API_ENDPOINT = os.environ.get('CALENDAR_API_ENDPOINT')
+
+logger = get_logger("calendar_service")
+availability_fallbacks = default_registry.counter(
+    "calendar_app_availability_fallbacks_total", "Availability answered without Google, by status (stale/unavailable)",
+    ["status"]
+)
+
+# freebusy.query accepts a limited time span and number of calendars per call
+FREEBUSY_MAX_DAYS = 30
+FREEBUSY_MAX_CALENDARS = 50
+# Calendar API batch endpoint limit
+BATCH_MAX_REQUESTS = 50
+
+# events.list page size and field mask for streaming event listings
+EVENTS_PAGE_SIZE = 250
+EVENT_FIELDS = "items(id,summary,description,start,end,htmlLink,status),nextPageToken"
+
+# Incremental sync: how often the mirror asks Google for deltas, and how far back it keeps events
+MIRROR_MAX_AGE_SECONDS = 30
+MIRROR_LOOKBACK_DAYS = 1
+
+
+@lru_cache(maxsize=1)
+def calendar_resource():
+    """
+    One googleapiclient Resource shared by every CalendarService. It only builds
+    requests: GoogleApiExecutor attaches each user's credentials when it executes them,
+    so the discovery document is parsed once per process instead of once per user.
+    """
+    # googleapiclient.discovery is slow to import; main.prewarm loads it before the first request
+    from googleapiclient.discovery import build
+    return build(
+        'calendar', 'v3', http=httplib2.Http(timeout=30), static_discovery=True,
+        client_options={"api_endpoint": CALENDAR_API_ENDPOINT} if CALENDAR_API_ENDPOINT else None
+    )
+
+
+def new_batch(service, callback):
+    """
+    A batch request for `service`. googleapiclient sends batches to the discovery
+    rootUrl (www.googleapis.com) even when api_endpoint moved every other call, so
+    an overridden endpoint gets its batch path spelled out.
+    """
+    from googleapiclient.http import BatchHttpRequest
+    root = service._rootDesc
+    batch_path = root.get("batchPath", "batch")
+    if service._baseUrl.startswith(root["rootUrl"]):
+        return BatchHttpRequest(callback=callback, batch_uri=root["rootUrl"] + batch_path)
+    return BatchHttpRequest(callback=callback, batch_uri=urljoin(service._baseUrl, "/" + batch_path))
+
 
 class CalendarService:
-    def __init__(self, credentials: Credentials):
+    def __init__(
+        self, credentials: Credentials, user_id: Optional[str] = None, service=None,
+        executor: Optional[GoogleApiExecutor] = None,
+        availability_cache: Optional[AvailabilityCache] = None,
+        mirrors: Optional[MirrorRegistry] = None, incremental_sync: bool = True,
+        singleflight: Optional[SingleFlight] = None, preferences: Optional[SchedulingPreferences] = None,
+        idempotency: Optional[IdempotencyIndex] = None, slot_indexes: Optional[SlotIndexRegistry] = None
+    ):
         self.credentials = credentials
-        self.service = build('calendar', 'v3', credentials=self.credentials)
+        self.user_id = user_id
+        self.service = service or calendar_resource()
+        self.executor = executor or default_executor
+        self.availability_cache = availability_cache or default_availability_cache
+        self.mirrors = mirrors or default_mirror_registry
+        self.singleflight = singleflight or default_singleflight
+        self.idempotency = idempotency or default_idempotency_index
+        self.slot_indexes = slot_indexes or default_slot_index_registry
+        # The mirror is per user, so it needs to know who we are
+        self.incremental_sync = incremental_sync and user_id is not None
         self.calendar_id = 'primary'
-        self.timezone = 'Asia/Kolkata'
+        self.preferences = preferences or SchedulingPreferences()
+        self.timezone = self.preferences.timezone
+
+    async def _execute(self, request, idempotent: bool = True):
+        # Google client calls are blocking, run them off the event loop
+        return await self.executor.execute(
+            request, credentials=self.credentials, user_id=self.user_id, idempotent=idempotent
+        )
+
+    async def get_available_slots(self, date: str, duration_minutes: int = 60) -> Dict:
+        """
+        Free slots in the user's working hours that day. `status` is "ok", or "stale" when
+        Google couldn't be reached and the slots come from the last synced mirror (`as_of`),
+        or "unavailable" with an `error` when there is nothing trustworthy to show.
+        """
+        day = (datetime.fromisoformat(date) if 'T' in date else datetime.strptime(date, '%Y-%m-%d')).date()
 
-    async def get_available_slots(self, date: str, duration_minutes: int = 60) -> List[Dict]:
         try:
-            # Parse the date
-            target_date = datetime.fromisoformat(date) if 'T' in date else datetime.strptime(date, '%Y-%m-%d')
+            busy = await self._get_day_busy(day)
+        except Exception as e:
+            logger.warning("Availability lookup failed: %s", e)
+            stale = self._stale_day_busy(day)
+            if stale is not None:
+                busy, synced_at = stale
+                availability_fallbacks.labels("stale").inc()
+                return {
+                    "status": "stale",
+                    "slots": SlotEngine(busy, self.preferences).slots(day, day, duration_minutes),
+                    "as_of": synced_at.isoformat()
+                }
+            availability_fallbacks.labels("unavailable").inc()
+            return {
+                "status": "unavailable",
+                "slots": [],
+                "error": str(e),
+                "retry_after": getattr(e, 'retry_after', None)
+            }
+
+        return {"status": "ok", "slots": SlotEngine(busy, self.preferences).slots(day, day, duration_minutes)}
+
+    async def suggest_slots(self, start: datetime, duration_minutes: int, limit: int = 3) -> Dict:
+        """
+        Whether a meeting at `start` can be booked and, when it can't, why ("reason":
+        too_soon, outside_hours or busy) and the `limit` nearest free slots
+        ("alternatives"). Answered from the precomputed FreeSlotIndex, so trying time
+        after time costs no Google calls.
+        """
+        tz = ZoneInfo(self.timezone)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=tz)
+        index = await self.get_slot_index()
+        if not index.covers(start):
+            # Past the index's horizon: the same answer from that one day's busy time
+            day = start.astimezone(tz).date()
+            index = FreeSlotIndex(await self._get_day_busy(day), self.preferences, day, day)
+        reason = index.unavailable_reason(start, duration_minutes)
+        if reason is None:
+            return {"free": True, "alternatives": []}
+        return {"free": False, "reason": reason, "alternatives": format_slots(index.nearest(start, duration_minutes, limit))}
+
+    async def get_slot_index(self) -> FreeSlotIndex:
+        """Free gaps for the next SLOT_INDEX_DAYS days, built on first use and kept until the calendar changes"""
+        if self.user_id is None:
+            return await self._build_slot_index()
+        index = self.slot_indexes.get(self.user_id, self.calendar_id, self.preferences)
+        if index is not None:
+            return index
+        return await self.singleflight.do(("slot_index", self.user_id, self.calendar_id), self._build_slot_index)
+
+    async def _build_slot_index(self) -> FreeSlotIndex:
+        tz = ZoneInfo(self.timezone)
+        first_day = datetime.now(tz).date()
+        last_day = first_day + timedelta(days=SLOT_INDEX_DAYS - 1)
+        start = datetime.combine(first_day, time.min, tz)
+        end = datetime.combine(last_day + timedelta(days=1), time.min, tz)
+        if self.incremental_sync:
+            # The mirror already holds every upcoming event
+            busy = (await self.sync_mirror()).busy_between(start, end)
+        else:
+            busy = (await self.get_busy_intervals(start, end))[self.calendar_id]
+        index = FreeSlotIndex(busy, self.preferences, first_day, last_day)
+        if self.user_id is not None:
+            self.slot_indexes.set(self.user_id, self.calendar_id, index)
+        return index
+
+    def _stale_day_busy(self, day: date):
+        """Busy time from the mirror's last successful sync, if it covers `day`."""
+        mirror = self.mirrors.get(self.user_id, self.calendar_id) if self.incremental_sync else None
+        if mirror is None or mirror.synced_at is None:
+            return None
+        if day < (mirror.synced_at - timedelta(days=MIRROR_LOOKBACK_DAYS)).date():
+            return None
+        day_start = datetime.combine(day, time.min, ZoneInfo(self.timezone))
+        return mirror.busy_between(day_start, day_start + timedelta(days=1)), mirror.synced_at
+
+    async def _get_day_busy(self, day: date) -> List[Interval]:
+        """Busy intervals for a whole day, served from the availability cache when possible"""
+        if self.user_id is not None:
+            cached = self.availability_cache.get(self.user_id, self.calendar_id, day)
+            if cached is not None:
+                return cached
 
-            # Define work hours
-            start_time = target_date.replace(hour=9, minute=0, second=0, microsecond=0)
-            end_time = target_date.replace(hour=17, minute=0, second=0, microsecond=0)
+        if self.user_id is None:
+            return await self._fetch_day_busy(day)
+        # Concurrent tabs asking about the same day share one Google call
+        return await self.singleflight.do(
+            ("day_busy", self.user_id, self.calendar_id, day), lambda: self._fetch_day_busy(day)
+        )
 
-            # Convert to RFC3339 format with timezone
-            time_min = start_time.isoformat() + "+05:30"
-            time_max = end_time.isoformat() + "+05:30"
+    async def _fetch_day_busy(self, day: date) -> List[Interval]:
+        tz = ZoneInfo(self.timezone)
+        day_start = datetime.combine(day, time.min, tz)
+        day_end = day_start + timedelta(days=1)
 
-            events_result = self.service.events().list(
+        if self.incremental_sync:
+            mirror = await self.sync_mirror()
+            busy = mirror.busy_between(day_start, day_end)
+            self.availability_cache.set(self.user_id, self.calendar_id, day, busy)
+            return busy
+
+        events_result = await self._execute(self.service.events().list(
+            calendarId=self.calendar_id,
+            timeMin=day_start.isoformat(),
+            timeMax=day_end.isoformat(),
+            singleEvents=True,
+            orderBy='startTime'
+        ))
+
+        busy = merge_intervals(events_to_intervals(events_result.get('items', []), tz))
+        if self.user_id is not None:
+            self.availability_cache.set(self.user_id, self.calendar_id, day, busy)
+        return busy
+
+    async def sync_mirror(self) -> EventMirror:
+        """Bring the local event mirror up to date, using sync-token deltas after the first full sync"""
+        mirror = self.mirrors.get_or_create(self.user_id, self.calendar_id, ZoneInfo(self.timezone))
+        async with mirror.lock:
+            if mirror.is_fresh(MIRROR_MAX_AGE_SECONDS):
+                return mirror
+
+            if mirror.sync_token is None:
+                await self._full_sync(mirror)
+                return mirror
+
+            try:
+                items, sync_token = await self._list_all_pages(syncToken=mirror.sync_token)
+            except Exception as e:
+                # 410 Gone: the sync token expired, start over with a full sync
+                if getattr(getattr(e, 'resp', None), 'status', None) != 410:
+                    raise
+                self.mirrors.resyncs += 1
+                await self._full_sync(mirror)
+                return mirror
+
+            # Only the days touched by the delta need to drop out of the availability cache
+            changed_days = mirror.apply(items, sync_token)
+            for day in changed_days:
+                self.availability_cache.invalidate(self.user_id, self.calendar_id, day)
+            if changed_days:
+                self.slot_indexes.invalidate(self.user_id, self.calendar_id)
+            self.mirrors.incremental_syncs += 1
+            return mirror
+
+    async def _full_sync(self, mirror: EventMirror) -> None:
+        time_min = datetime.now(ZoneInfo(self.timezone)) - timedelta(days=MIRROR_LOOKBACK_DAYS)
+        items, sync_token = await self._list_all_pages(timeMin=time_min.isoformat())
+        mirror.replace_all(items, sync_token)
+        self.availability_cache.invalidate_calendar(self.user_id, self.calendar_id)
+        self.slot_indexes.invalidate(self.user_id, self.calendar_id)
+        self.mirrors.full_syncs += 1
+
+    async def refresh_after_change(self) -> None:
+        """Called when Google tells us the calendar changed"""
+        if self.incremental_sync:
+            mirror = self.mirrors.get(self.user_id, self.calendar_id)
+            if mirror is not None:
+                # Stale from now on, so if this sync fails the next read retries it
+                # instead of trusting the old copy until it ages out
+                mirror.mark_stale()
+            await self.sync_mirror()
+        elif self.user_id is not None:
+            self.availability_cache.invalidate_calendar(self.user_id, self.calendar_id)
+            self.slot_indexes.invalidate(self.user_id, self.calendar_id)
+
+    async def _list_all_pages(self, **params):
+        items = []
+        page_token = None
+        while True:
+            result = await self._execute(self.service.events().list(
+                calendarId=self.calendar_id,
+                singleEvents=True,
+                maxResults=2500,
+                pageToken=page_token,
+                **params
+            ))
+            items.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return items, result.get('nextSyncToken')
+
+    async def get_upcoming_events(self, limit: int = 10) -> List[Dict]:
+        if not self.incremental_sync:
+            result = await self._execute(self.service.events().list(
                 calendarId=self.calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
+                timeMin=datetime.now(ZoneInfo(self.timezone)).isoformat(),
+                maxResults=limit,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ))
+            return result.get('items', [])
 
-            events = events_result.get('items', [])
-            return self._find_available_slots(start_time, end_time, events, duration_minutes)
+        mirror = await self.sync_mirror()
+        return mirror.upcoming(datetime.now(ZoneInfo(self.timezone)), limit)
 
-        except Exception as e:
-            # Fallback slots
-            return self._get_mock_available_slots(date, duration_minutes)
+    async def iter_events(
+        self, time_min: datetime, time_max: datetime, page_size: int = EVENTS_PAGE_SIZE,
+        limit: Optional[int] = None, fields: str = EVENT_FIELDS
+    ) -> AsyncIterator[Dict]:
+        """
+        Events in a window, in start order. Each page is only requested once the previous
+        one has been consumed, and the field mask keeps the payload to what we display.
+        """
+        if limit is not None and limit <= 0:
+            return
+        if time_min.tzinfo is None:
+            time_min = time_min.replace(tzinfo=ZoneInfo(self.timezone))
+        if time_max.tzinfo is None:
+            time_max = time_max.replace(tzinfo=ZoneInfo(self.timezone))
 
-    def _find_available_slots(self, start_time: datetime, end_time: datetime, events: List, duration_minutes: int) -> List[Dict]:
-        slots = []
-        current_time = start_time
+        page_token = None
+        yielded = 0
+        while True:
+            result = await self._execute(self.service.events().list(
+                calendarId=self.calendar_id,
+                timeMin=time_min.isoformat(),
+                timeMax=time_max.isoformat(),
+                singleEvents=True,
+                orderBy='startTime',
+                maxResults=page_size if limit is None else min(page_size, limit - yielded),
+                pageToken=page_token,
+                fields=fields
+            ))
+            for event in result.get('items', []):
+                yield event
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return
+
+    async def get_busy_intervals(
+        self, time_min: datetime, time_max: datetime, calendar_ids: Optional[List[str]] = None
+    ) -> Dict[str, List[Interval]]:
+        """Merged busy intervals per calendar, fetched with as few freebusy queries as possible"""
+        busy, failed = await self.get_busy_intervals_partial(time_min, time_max, calendar_ids)
+        if failed:
+            calendar_id, reason = next(iter(failed.items()))
+            raise RuntimeError(f"freebusy failed for {calendar_id}: {reason}")
+        return busy
 
-        for event in events:
-            event_start_str = event['start'].get('dateTime', event['start'].get('date'))
-            event_end_str = event['end'].get('dateTime', event['end'].get('date'))
+    async def get_busy_intervals_partial(
+        self, time_min: datetime, time_max: datetime, calendar_ids: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, List[Interval]], Dict[str, str]]:
+        """
+        get_busy_intervals for many calendars, where some may fail (no access, not found):
+        busy intervals for those that answered, and the reason for each that didn't.
+        """
+        calendar_ids = calendar_ids or [self.calendar_id]
+        if self.user_id is None:
+            return await self._fetch_busy_intervals(time_min, time_max, calendar_ids)
+        return await self.singleflight.do(
+            ("busy", self.user_id, tuple(calendar_ids), time_min.isoformat(), time_max.isoformat()),
+            lambda: self._fetch_busy_intervals(time_min, time_max, calendar_ids)
+        )
 
-            event_start = datetime.fromisoformat(event_start_str.replace('Z', '+00:00'))
-            event_end = datetime.fromisoformat(event_end_str.replace('Z', '+00:00'))
+    async def _fetch_busy_intervals(
+        self, time_min: datetime, time_max: datetime, calendar_ids: List[str]
+    ) -> Tuple[Dict[str, List[Interval]], Dict[str, str]]:
+        busy = {calendar_id: [] for calendar_id in calendar_ids}
+        failed = {}
 
-            if (event_start - current_time).total_seconds() >= duration_minutes * 60:
-                slots.append({
-                    "start_time": current_time.strftime('%H:%M'),
-                    "end_time": event_start.strftime('%H:%M'),
-                    "duration_available": int((event_start - current_time).total_seconds() / 60)
-                })
+        chunk_start = time_min
+        while chunk_start < time_max:
+            chunk_end = min(chunk_start + timedelta(days=FREEBUSY_MAX_DAYS), time_max)
+            for i in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS):
+                result = await self._execute(self.service.freebusy().query(body={
+                    "timeMin": chunk_start.isoformat(),
+                    "timeMax": chunk_end.isoformat(),
+                    "timeZone": self.timezone,
+                    "items": [{"id": calendar_id} for calendar_id in calendar_ids[i:i + FREEBUSY_MAX_CALENDARS]],
+                }))
+                for calendar_id, info in result.get("calendars", {}).items():
+                    if info.get("errors"):
+                        # One attendee we can't see shouldn't sink the whole query
+                        failed[calendar_id] = ", ".join(error.get("reason", "unknown") for error in info["errors"])
+                        continue
+                    busy.setdefault(calendar_id, []).extend(
+                        (parse_rfc3339(b["start"]), parse_rfc3339(b["end"])) for b in info.get("busy", [])
+                    )
+            chunk_start = chunk_end
 
-            current_time = max(current_time, event_end)
+        busy = {calendar_id: merge_intervals(intervals) for calendar_id, intervals in busy.items() if calendar_id not in failed}
+        return busy, failed
 
-        # Final window after last event
-        if (end_time - current_time).total_seconds() >= duration_minutes * 60:
-            slots.append({
-                "start_time": current_time.strftime('%H:%M'),
-                "end_time": end_time.strftime('%H:%M'),
-                "duration_available": int((end_time - current_time).total_seconds() / 60)
-            })
+    async def find_available_slots_range(
+        self, start_date: str, end_date: str, duration_minutes: int = 60,
+        work_start: Optional[str] = None, work_end: Optional[str] = None, limit: int = 20
+    ) -> List[Dict]:
+        """
+        Free slots across a whole date range (inclusive) from a single freebusy lookup.
+        Working hours default to the user's preferences.
+        """
+        preferences = self.preferences
+        if work_start or work_end:
+            preferences = replace(
+                preferences, work_start=work_start or preferences.work_start, work_end=work_end or preferences.work_end
+            )
+        first_day = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_day = datetime.strptime(end_date, '%Y-%m-%d').date()
+        windows = SlotEngine((), preferences).working_windows(first_day, last_day)
+        if not windows:
+            return []
 
-        return slots
+        busy = await self.get_busy_intervals(windows[0][0], windows[-1][1])
+        return SlotEngine(busy[self.calendar_id], preferences).slots(first_day, last_day, duration_minutes, limit)
+
+    async def find_team_availability(
+        self, calendar_ids: List[str], start_date: str, end_date: str, duration_minutes: int = 60,
+        work_start: Optional[str] = None, work_end: Optional[str] = None, min_attendees: Optional[int] = None,
+        limit: int = 20
+    ) -> Dict:
+        """
+        Common free windows across many attendees' calendars, in the organiser's timezone.
+        Calendars freebusy can't read are left out and listed under "skipped_calendars".
+        """
+        tz = ZoneInfo(self.timezone)
+        first_day = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_day = datetime.strptime(end_date, '%Y-%m-%d').date()
+        windows = working_windows(
+            first_day, last_day, time.fromisoformat(work_start or self.preferences.work_start),
+            time.fromisoformat(work_end or self.preferences.work_end), tz
+        )
+        if not windows:
+            return {"windows": [], "skipped_calendars": []}
+
+        # Imported here so numpy isn't loaded until someone asks for team availability
+        from team_availability import TeamAvailability
+
+        busy, failed = await self.get_busy_intervals_partial(windows[0][0], windows[-1][1], calendar_ids)
+        skipped = [{"calendar_id": calendar_id, "reason": reason} for calendar_id, reason in failed.items()]
+        if not busy:
+            return {"windows": [], "skipped_calendars": skipped}
+        engine = TeamAvailability(windows[0][0], windows[-1][1])
+        engine.add_calendars(busy)
+        engine.restrict_to(windows)
+        return {
+            "windows": engine.free_windows(duration_minutes, min_attendees=min_attendees, limit=limit),
+            "skipped_calendars": skipped,
+        }
+
+    def _find_available_slots(self, start_time: datetime, end_time: datetime, events: List, duration_minutes: int) -> List[Dict]:
+        """Slots between two datetimes given raw Google events; naive datetimes are in the user's timezone"""
+        tz = ZoneInfo(self.timezone)
+        start_time = start_time if start_time.tzinfo else start_time.replace(tzinfo=tz)
+        end_time = end_time if end_time.tzinfo else end_time.replace(tzinfo=tz)
+        engine = SlotEngine(events_to_intervals(events, tz), self.preferences)
+        return format_slots(engine.gaps_in(start_time, end_time, duration_minutes))
+
+    def _build_event(self, date: str, start_time: str, duration_minutes: int, title: str, description: str):
+        target_date = datetime.fromisoformat(date) if 'T' in date else datetime.strptime(date, '%Y-%m-%d')
+        start_hour, start_minute = map(int, start_time.split(':'))
+
+        start_datetime = target_date.replace(hour=start_hour, minute=start_minute)
+        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
+
+        event = {
+            'summary': title,
+            'description': description,
+            'start': {
+                'dateTime': start_datetime.isoformat(),
+                'timeZone': self.timezone,
+            },
+            'end': {
+                'dateTime': end_datetime.isoformat(),
+                'timeZone': self.timezone,
+            }
+        }
+        return event, start_datetime, end_datetime
+
+    def _record_booking(self, created_event: Dict, start_datetime: datetime, end_datetime: datetime) -> None:
+        # Write the new event through to any cached busy data for that day
+        if self.incremental_sync:
+            mirror = self.mirrors.get(self.user_id, self.calendar_id)
+            if mirror is not None:
+                mirror.apply([created_event])
+        if self.user_id is not None:
+            tz = ZoneInfo(self.timezone)
+            start, end = start_datetime.replace(tzinfo=tz), end_datetime.replace(tzinfo=tz)
+            self.availability_cache.add_busy(self.user_id, self.calendar_id, start_datetime.date(), (start, end))
+            self.slot_indexes.add_busy(self.user_id, self.calendar_id, start, end)
 
     async def book_appointment(
         self, date: str, start_time: str, duration_minutes: int,
-        title: str = "Appointment", description: str = ""
+        title: str = "Appointment", description: str = "",
+        idempotency_key: Optional[str] = None, check_conflicts: bool = True
+    ) -> Dict:
+        """
+        Book an event. With an `idempotency_key`, repeats of the same booking return the
+        first result instead of creating another event. With `check_conflicts`, a slot
+        that is already taken in the cached busy data is refused before calling Google.
+        """
+        if idempotency_key is None:
+            return await self._book(date, start_time, duration_minutes, title, description, None, check_conflicts)
+        return await self.idempotency.run(
+            (self.user_id, self.calendar_id, idempotency_key),
+            lambda: self._book(date, start_time, duration_minutes, title, description, idempotency_key, check_conflicts)
+        )
+
+    async def _book(
+        self, date: str, start_time: str, duration_minutes: int, title: str, description: str,
+        idempotency_key: Optional[str], check_conflicts: bool
     ) -> Dict:
         try:
-            target_date = datetime.fromisoformat(date) if 'T' in date else datetime.strptime(date, '%Y-%m-%d')
-            start_hour, start_minute = map(int, start_time.split(':'))
-
-            start_datetime = target_date.replace(hour=start_hour, minute=start_minute)
-            end_datetime = start_datetime + timedelta(minutes=duration_minutes)
-
-            event = {
-                'summary': title,
-                'description': description,
-                'start': {
-                    'dateTime': start_datetime.isoformat(),
-                    'timeZone': self.timezone,
-                },
-                'end': {
-                    'dateTime': end_datetime.isoformat(),
-                    'timeZone': self.timezone,
-                }
-            }
+            event, start_datetime, end_datetime = self._build_event(
+                date, start_time, duration_minutes, title, description
+            )
+            if idempotency_key is not None:
+                # A fixed event id makes the insert itself idempotent at Google
+                event['id'] = event_id_for(f"{self.user_id}:{self.calendar_id}:{idempotency_key}")
 
-            created_event = self.service.events().insert(
-                calendarId=self.calendar_id,
-                body=event
-            ).execute()
+            if check_conflicts and not await self._looks_free(start_datetime, end_datetime):
+                # Could be our own event from an earlier attempt whose reply was lost
+                existing = await self._get_existing(event['id']) if 'id' in event else None
+                if existing is not None:
+                    return self._booking_result(existing, replayed=True)
+                if self.user_id is not None:
+                    # The index thought this was free, so it is older than what we just saw
+                    self.slot_indexes.invalidate(self.user_id, self.calendar_id)
+                return {"success": False, "conflict": True, "error": "That time is no longer free."}
 
-            return {
-                "success": True,
-                "message": "Event booked successfully!",
-                "event_id": created_event.get("id"),
-                "calendar_link": created_event.get("htmlLink")
-            }
+            try:
+                created_event = await self._execute(self.service.events().insert(
+                    calendarId=self.calendar_id,
+                    body=event
+                ), idempotent='id' in event)
+            except Exception as e:
+                if 'id' not in event or error_status(e) != 409:
+                    raise
+                created_event = await self._get_existing(event['id'])
+                if created_event is None:
+                    return {"success": False, "error": "This booking was already made and then cancelled."}
+                return self._booking_result(created_event, replayed=True)
+
+            self._record_booking(created_event, start_datetime, end_datetime)
+            return self._booking_result(created_event)
 
+        except GoogleUnavailable as e:
+            return {"success": False, "error": str(e), "retryable": True, "retry_after": e.retry_after}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def _get_mock_available_slots(self, date: str, duration_minutes: int = 60) -> List[Dict]:
-        return [
-            {"start_time": "09:00", "end_time": "10:00", "duration_available": 60},
-            {"start_time": "10:30", "end_time": "12:00", "duration_available": 90},
-            {"start_time": "14:00", "end_time": "15:30", "duration_available": 90},
-            {"start_time": "16:00", "end_time": "17:00", "duration_available": 60},
-        ]
+    @staticmethod
+    def _booking_result(event: Dict, replayed: bool = False) -> Dict:
+        result = {
+            "success": True,
+            "message": "Event booked successfully!",
+            "event_id": event.get("id"),
+            "calendar_link": event.get("htmlLink")
+        }
+        if replayed:
+            result["replayed"] = True
+        return result
+
+    async def _looks_free(self, start_datetime: datetime, end_datetime: datetime) -> bool:
+        """Optimistic check against cached busy time; if we can't tell, let Google decide."""
+        tz = ZoneInfo(self.timezone)
+        start, end = start_datetime.replace(tzinfo=tz), end_datetime.replace(tzinfo=tz)
+        try:
+            busy = []
+            day = start.date()
+            while day <= (end - timedelta(microseconds=1)).date():
+                busy.extend(await self._get_day_busy(day))
+                day += timedelta(days=1)
+        except Exception as e:
+            logger.warning("Conflict check skipped: %s", e)
+            return True
+        return BusyTimeline(busy).is_free(start, end)
+
+    async def _get_existing(self, event_id: str) -> Optional[Dict]:
+        try:
+            event = await self._execute(self.service.events().get(calendarId=self.calendar_id, eventId=event_id))
+        except Exception as e:
+            if error_status(e) in (404, 410):
+                return None
+            raise
+        return None if event.get('status') == 'cancelled' else event
+
+    async def cancel_event(self, event_id: str) -> Dict:
+        try:
+            await self._execute(self.service.events().delete(calendarId=self.calendar_id, eventId=event_id))
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        self.idempotency.forget_event(event_id)
+
+        # Drop the event from the mirror and any cached day it was on
+        mirror = self.mirrors.get(self.user_id, self.calendar_id) if self.incremental_sync else None
+        if mirror is not None:
+            for day in mirror.apply([{"id": event_id, "status": "cancelled"}]):
+                self.availability_cache.invalidate(self.user_id, self.calendar_id, day)
+        elif self.user_id is not None:
+            self.availability_cache.invalidate_calendar(self.user_id, self.calendar_id)
+        if self.user_id is not None:
+            # Freed time; rebuilding from the mirror is cheap
+            self.slot_indexes.invalidate(self.user_id, self.calendar_id)
+        return {"success": True, "event_id": event_id}
+
+    async def move_event(self, event_id: str, start: datetime, end: datetime) -> Dict:
+        """Move an existing event to [start, end); naive datetimes are in the user's timezone."""
+        tz = ZoneInfo(self.timezone)
+        start = start if start.tzinfo else start.replace(tzinfo=tz)
+        end = end if end.tzinfo else end.replace(tzinfo=tz)
+        try:
+            moved = await self._execute(self.service.events().patch(
+                calendarId=self.calendar_id,
+                eventId=event_id,
+                body={
+                    'start': {'dateTime': start.isoformat(), 'timeZone': self.timezone},
+                    'end': {'dateTime': end.isoformat(), 'timeZone': self.timezone},
+                }
+            ))
+        except GoogleUnavailable as e:
+            return {"success": False, "error": str(e), "retryable": True, "retry_after": e.retry_after}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+        # Both the day it left and the day it moved to changed
+        mirror = self.mirrors.get(self.user_id, self.calendar_id) if self.incremental_sync else None
+        if mirror is not None:
+            for day in mirror.apply([moved]):
+                self.availability_cache.invalidate(self.user_id, self.calendar_id, day)
+        elif self.user_id is not None:
+            self.availability_cache.invalidate_calendar(self.user_id, self.calendar_id)
+        if self.user_id is not None:
+            self.slot_indexes.invalidate(self.user_id, self.calendar_id)
+        return {"success": True, "event_id": event_id, "calendar_link": moved.get("htmlLink")}
+
+    async def book_appointments_bulk(self, bookings: List[Dict], check_conflicts: bool = False) -> List[Dict]:
+        """
+        Insert many events with Google batch requests (BATCH_MAX_REQUESTS per HTTP call).
+        Returns one result per booking, in order. Bookings may carry an `idempotency_key`,
+        with the same meaning as in book_appointment, and their own `check_conflicts`,
+        which overrides the argument for that booking.
+        """
+        results: List[Optional[Dict]] = [None] * len(bookings)
+        tz = ZoneInfo(self.timezone)
+        pending = []  # (index, event, start, end)
+        index_keys = {}  # booking index -> idempotency index key
+        maybe_ours = []  # bookings refused as duplicates/conflicts that may be our own earlier insert
+
+        for i, booking in enumerate(bookings):
+            try:
+                event, start_datetime, end_datetime = self._build_event(
+                    booking['date'], booking['start_time'], booking.get('duration_minutes', 60),
+                    booking.get('title', "Appointment"), booking.get('description', "")
+                )
+            except Exception as e:
+                results[i] = {"success": False, "error": str(e)}
+                continue
+            if booking.get('idempotency_key'):
+                index_keys[i] = (self.user_id, self.calendar_id, booking['idempotency_key'])
+                replay = self.idempotency.get(index_keys[i])
+                if replay is not None:
+                    results[i] = replay
+                    continue
+                event['id'] = event_id_for(f"{self.user_id}:{self.calendar_id}:{booking['idempotency_key']}")
+            pending.append((i, event, start_datetime, end_datetime))
+
+        checked = [item for item in pending if bookings[item[0]].get('check_conflicts', check_conflicts)]
+        busy = None
+        if checked:
+            range_start = min(p[2] for p in checked).replace(tzinfo=tz)
+            range_end = max(p[3] for p in checked).replace(tzinfo=tz)
+            try:
+                busy = (await self.get_busy_intervals(range_start, range_end))[self.calendar_id]
+            except Exception as e:
+                # Bookings that didn't ask for a check can still go ahead
+                for i, *_ in checked:
+                    results[i] = {"success": False, "error": f"Conflict check failed: {e}"}
+                pending = [item for item in pending if results[item[0]] is None]
+
+        if busy is not None:
+            accepted = []
+            for item in pending:
+                i, event, start_datetime, end_datetime = item
+                interval = (start_datetime.replace(tzinfo=tz), end_datetime.replace(tzinfo=tz))
+                if bookings[i].get('check_conflicts', check_conflicts) and overlaps(busy, interval):
+                    results[i] = {"success": False, "conflict": True, "error": "conflict"}
+                    if 'id' in event:
+                        maybe_ours.append(item)
+                else:
+                    accepted.append(item)
+                    # Later items in the same request must not collide with this one either
+                    busy = merge_intervals(busy + [interval])
+            pending = accepted
+
+        for chunk_start in range(0, len(pending), BATCH_MAX_REQUESTS):
+            chunk = pending[chunk_start:chunk_start + BATCH_MAX_REQUESTS]
+            by_request_id = {str(item[0]): item for item in chunk}
+
+            def callback(request_id, response, exception):
+                item = by_request_id[request_id]
+                i, event, start_datetime, end_datetime = item
+                if exception is not None:
+                    results[i] = {"success": False, "error": str(exception)}
+                    if 'id' in event and error_status(exception) == 409:
+                        maybe_ours.append(item)
+                    return
+                self._record_booking(response, start_datetime, end_datetime)
+                results[i] = {
+                    "success": True,
+                    "event_id": response.get("id"),
+                    "calendar_link": response.get("htmlLink")
+                }
+
+            batch = new_batch(self.service, callback)
+            for i, event, _, _ in chunk:
+                batch.add(self.service.events().insert(calendarId=self.calendar_id, body=event), request_id=str(i))
+            try:
+                # Safe to retry only when every insert carries its own event id
+                await self._execute(batch, idempotent=all('id' in item[1] for item in chunk))
+            except Exception as e:
+                for i, *_ in chunk:
+                    if results[i] is None:
+                        results[i] = {"success": False, "error": str(e)}
+
+        for i, event, _, _ in maybe_ours:
+            try:
+                existing = await self._get_existing(event['id'])
+            except Exception as e:
+                logger.warning("Could not look up event %s: %s", event['id'], e)
+                continue
+            if existing is not None:
+                results[i] = {
+                    "success": True,
+                    "event_id": existing.get("id"),
+                    "calendar_link": existing.get("htmlLink"),
+                    "replayed": True
+                }
+
+        for i, key in index_keys.items():
+            self.idempotency.remember(key, results[i])
+        return results
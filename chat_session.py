@@ -0,0 +1,170 @@
+import os
+import sys
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+from session_store import KeyValueStore, MemoryStore
+
+# Messages kept per session (a message and its reply are two); older ones fall off
+HISTORY_LENGTH = int(os.environ.get("CHAT_HISTORY_LENGTH", "20"))
+# Kept messages are cut to this many characters, a long event list doesn't need keeping whole
+HISTORY_MESSAGE_CHARS = 300
+# /metrics measures this many of the most recent sessions rather than all of them
+SIZE_SAMPLE = 256
+
+
+@dataclass(slots=True)
+class PendingBooking:
+    """A proposed chat booking, waiting for "yes"."""
+    booking_id: str
+    title: str
+    date: str
+    start_time: str
+    duration_minutes: int
+    description: str
+
+    def __post_init__(self):
+        # The same few titles ("Meeting", "Call") and description in every session share one string
+        self.title = sys.intern(self.title)
+        self.description = sys.intern(self.description)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class PendingCancellation:
+    """An event the user asked to cancel, waiting for "yes"."""
+    event_id: str
+    title: str
+    when: str  # as shown to the user
+
+    def __post_init__(self):
+        self.title = sys.intern(self.title)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class ChatSession:
+    """One chat's state. History is a ring buffer, so a long conversation stays the same size."""
+    history: Deque[Tuple[str, str]] = field(default_factory=lambda: deque(maxlen=HISTORY_LENGTH))
+    booking_pending: Optional[PendingBooking] = None
+    cancel_pending: Optional[PendingCancellation] = None
+    awaiting_time: bool = False
+    booking_confirmed: bool = False
+
+    @property
+    def has_pending(self) -> bool:
+        """A booking or cancellation is waiting for "yes" or "no"."""
+        return self.booking_pending is not None or self.cancel_pending is not None
+
+    def record(self, role: str, text: str) -> None:
+        self.history.append((sys.intern(role), text[:HISTORY_MESSAGE_CHARS]))
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by this session alone; interned strings are shared, so not counted."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.history)
+        for entry in self.history:
+            size += sys.getsizeof(entry) + sys.getsizeof(entry[1])
+        booking = self.booking_pending
+        if booking is not None:
+            size += sys.getsizeof(booking) + sum(
+                sys.getsizeof(value) for value in (booking.booking_id, booking.date, booking.start_time)
+            )
+        cancellation = self.cancel_pending
+        if cancellation is not None:
+            size += sys.getsizeof(cancellation) + sys.getsizeof(cancellation.event_id) + sys.getsizeof(cancellation.when)
+        return size
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ChatSession":
+        pending = data.get("booking_pending")
+        cancellation = data.get("cancel_pending")
+        session = cls(
+            booking_pending=PendingBooking(**pending) if pending else None,
+            cancel_pending=PendingCancellation(**cancellation) if cancellation else None,
+            awaiting_time=bool(data.get("awaiting_time")),
+            booking_confirmed=bool(data.get("booking_confirmed")),
+        )
+        for entry in data.get("history") or []:
+            # Sessions written before history was kept have other things in the list
+            if isinstance(entry, (list, tuple)) and len(entry) == 2:
+                session.record(*entry)
+        return session
+
+    def to_dict(self) -> Dict:
+        return {
+            "history": [list(entry) for entry in self.history],
+            "booking_pending": self.booking_pending.to_dict() if self.booking_pending else None,
+            "cancel_pending": self.cancel_pending.to_dict() if self.cancel_pending else None,
+            "awaiting_time": self.awaiting_time,
+            "booking_confirmed": self.booking_confirmed,
+        }
+
+
+class ChatSessionStore:
+    """
+    chat_sessions as ChatSession records. The memory backend holds the records
+    themselves; any other backend has to serialise values, so it gets their dicts.
+    """
+
+    def __init__(self, store: KeyValueStore):
+        self.store = store
+        self._records = isinstance(store, MemoryStore)
+        self.swept = 0
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        value = self.store.get(session_id)
+        if value is None or isinstance(value, ChatSession):
+            return value
+        return ChatSession.from_dict(value)
+
+    def set(self, session_id: str, session: ChatSession) -> None:
+        self.store.set(session_id, session if self._records else session.to_dict())
+
+    def delete(self, session_id: str) -> None:
+        self.store.delete(session_id)
+
+    def sweep(self, max_idle_seconds: float) -> int:
+        """Drop sessions idle for `max_idle_seconds`; run periodically so they don't wait for a lookup."""
+        swept = self.store.expire_idle(max_idle_seconds)
+        self.swept += swept
+        return swept
+
+    def flush(self) -> None:
+        self.store.flush()
+
+    def close(self) -> None:
+        self.store.close()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.store
+
+    def __getitem__(self, session_id: str) -> ChatSession:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session: ChatSession) -> None:
+        self.set(session_id, session)
+
+    def __delitem__(self, session_id: str) -> None:
+        self.delete(session_id)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def stats(self) -> Dict[str, int]:
+        stats = self.store.stats()
+        stats["swept"] = self.swept
+        if self._records:
+            # Only in-process records take this process's memory; a sample keeps scrapes cheap
+            sessions = [self.store.get(key) for key in self.store.keys()[-SIZE_SAMPLE:]]
+            sizes = [session.approx_bytes() for session in sessions if isinstance(session, ChatSession)]
+            stats["bytes_per_session"] = sum(sizes) // len(sizes) if sizes else 0
+            stats["max_session_bytes"] = max(sizes, default=0)
+        return stats
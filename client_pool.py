@@ -0,0 +1,86 @@
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+from google.oauth2.credentials import Credentials
+
+from calendar_service import CalendarService
+from metrics import default_registry
+from ttl_cache import TTLCache
+
+credential_load_seconds = default_registry.histogram(
+    "calendar_app_credential_load_seconds", "Time to parse a stored OAuth token into Credentials"
+)
+service_build_seconds = default_registry.histogram(
+    "calendar_app_service_build_seconds", "Time to build a CalendarService (discovery document included)"
+)
+
+
+class CalendarClientPool:
+    """
+    Keeps one built CalendarService (and its parsed credentials) per user so the
+    discovery document and the token JSON are only parsed once per user.
+
+    Entries are keyed by user/session id and remember the token JSON they were
+    built from: if the stored token changes (refresh, re-auth) the entry is
+    rebuilt, and `invalidate` drops it explicitly (e.g. on revocation).
+    """
+
+    def __init__(
+        self,
+        scopes: List[str],
+        maxsize: int = 256,
+        ttl: float = 30 * 60,
+        service_factory: Optional[Callable[[Credentials, str], CalendarService]] = None,
+    ):
+        self.scopes = scopes
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._service_factory = service_factory or (
+            lambda creds, user_id: CalendarService(creds, user_id=user_id)
+        )
+        self.rebuilds = 0
+
+    def get(self, user_id: str, token_json: str) -> CalendarService:
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            cached_token_json, service = entry
+            if cached_token_json == token_json:
+                return service
+            # The stored token changed underneath us, the cached client is stale
+            self.rebuilds += 1
+
+        start = time.perf_counter()
+        creds = Credentials.from_authorized_user_info(json.loads(token_json), scopes=self.scopes)
+        built = time.perf_counter()
+        service = self._service_factory(creds, user_id)
+        credential_load_seconds.observe(built - start)
+        service_build_seconds.observe(time.perf_counter() - built)
+        self._cache.set(user_id, (token_json, service))
+        return service
+
+    def peek(self, user_id: str, token_json: str) -> Optional[CalendarService]:
+        """The pooled client if it was built from `token_json`, without building one."""
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] == token_json:
+            return entry[1]
+        return None
+
+    def replace_token(self, user_id: str, old_token_json: str, new_token_json: str) -> None:
+        """
+        Record that the pooled client's credentials were refreshed in place, so the next
+        `get` with the new token JSON reuses it instead of rebuilding.
+        """
+        self._cache.update(
+            user_id, lambda entry: (new_token_json, entry[1]) if entry[0] == old_token_json else entry
+        )
+
+    def invalidate(self, user_id: str) -> None:
+        self._cache.pop(user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._cache.stats()
+        stats["rebuilds"] = self.rebuilds
+        return stats
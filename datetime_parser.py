@@ -0,0 +1,363 @@
+import asyncio
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from ttl_cache import TTLCache
+
+DATEPARSER_SETTINGS = {'DATE_ORDER': 'MDY'}
+# The chat is English. Left open, dateparser tries every locale it ships on a phrase it can't
+# read, which costs ~2s each time RELATIVE_BASE (so the settings) changes
+DATEPARSER_LANGUAGES = ['en']
+FALLBACK_WORKERS = 2
+FALLBACK_TIMEOUT_SECONDS = 2.0
+
+_MISSING = object()
+_fallback_pool: Optional[ProcessPoolExecutor] = None
+# Slow-path results are keyed by the minute, so they are only worth keeping briefly
+_fallback_cache = TTLCache(maxsize=1024, ttl=60)
+fallback_stats = {"calls": 0, "timeouts": 0, "errors": 0}
+
+_WEEKDAYS = {
+    'monday': 0, 'mon': 0,
+    'tuesday': 1, 'tues': 1, 'tue': 1,
+    'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thurs': 3, 'thur': 3, 'thu': 3,
+    'friday': 4, 'fri': 4,
+    'saturday': 5, 'sat': 5,
+    'sunday': 6, 'sun': 6,
+}
+_MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8, 'september': 9, 'sept': 9, 'sep': 9,
+    'october': 10, 'oct': 10, 'november': 11, 'nov': 11, 'december': 12, 'dec': 12,
+}
+
+_COUNTS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+           'eight': 8, 'nine': 9, 'ten': 10}
+
+# Longest names first so "tuesday" wins over "tue"
+_WEEKDAY_ALT = '|'.join(sorted(_WEEKDAYS, key=len, reverse=True))
+_MONTH_ALT = '|'.join(sorted(_MONTHS, key=len, reverse=True))
+_ORDINAL = r'(?:st|nd|rd|th)?'
+_COUNT = rf'(?:\d{{1,3}}|{"|".join(_COUNTS)})'
+_AMPM = r'(?:am|pm)'
+
+_AMPM_DOTS_RE = re.compile(r'\b([ap])\.\s?m\b\.?')
+_NORMALIZE_RE = re.compile(r'[^\w:/\-\.\s]|(?<!\d)\.|\.(?!\w)')
+_SPACES_RE = re.compile(r'\s+')
+
+_DATE_PATTERNS = [
+    ('relative', re.compile(r'\b(?P<rel>day after tomorrow|today|tonight|tomorrow|tmrw)\b')),
+    ('iso', re.compile(r'\b(?P<y>\d{4})-(?P<mo>\d{1,2})-(?P<d>\d{1,2})\b')),
+    ('slash', re.compile(r'\b(?P<mo>\d{1,2})/(?P<d>\d{1,2})(?:/(?P<y>\d{2}|\d{4}))?\b')),
+    ('month_day', re.compile(
+        rf'\b(?P<mon>{_MONTH_ALT})\.?\s+(?P<d>\d{{1,2}}){_ORDINAL}\b(?:,?\s+(?P<y>\d{{4}})\b)?')),
+    ('day_month', re.compile(
+        rf'\b(?P<d>\d{{1,2}}){_ORDINAL}\s+(?:of\s+)?(?P<mon>{_MONTH_ALT})\b\.?(?:,?\s+(?P<y>\d{{4}})\b)?')),
+    ('weekday', re.compile(rf'\b(?:(?P<mod>next|this|coming)\s+)?(?P<wd>{_WEEKDAY_ALT})\b')),
+    ('in_days', re.compile(rf'\bin\s+(?P<n>{_COUNT})\s+(?P<unit>day|week)s?\b')),
+    ('in_days', re.compile(rf'\b(?P<n>{_COUNT})\s+(?P<unit>day|week)s?\s+from\s+now\b')),
+    ('next_week', re.compile(r'\bnext\s+week\b')),
+    ('day_of_month', re.compile(r'\b(?:the\s+)?(?P<d>\d{1,2})(?:st|nd|rd|th)\b')),
+]
+# Date words the grammar above doesn't read ("next month", "in 2 months", a second date).
+# Left in the message after the date we did match, they mean the fast path can't be sure.
+_UNREAD_DATE_RE = re.compile(
+    r'\b(?:\d{1,2}(?:st|nd|rd|th)|(?:day|week|month|year|weekend)s?|from\s+now|ago)\b'
+)
+
+_RANGE_RE = re.compile(
+    rf'\b(?:from\s+|between\s+)?(?P<h1>\d{{1,2}})(?::(?P<m1>\d{{2}}))?\s*(?P<ap1>{_AMPM})?'
+    rf'\s*(?:-|to|until|till|and)\s*'
+    rf'(?P<h2>\d{{1,2}})(?::(?P<m2>\d{{2}}))?\s*(?P<ap2>{_AMPM})(?!\w)'
+)
+_TIME_RE = re.compile(
+    rf'\b(?P<named>noon|midday|midnight)\b'
+    rf'|(?:\bat\s+)?\b(?P<h1>\d{{1,2}})(?:[:.](?P<m1>\d{{2}}))?\s*(?P<ap1>{_AMPM})(?!\w)'
+    rf'|(?:\bat\s+)?\b(?P<h2>\d{{1,2}}):(?P<m2>\d{{2}})\b'
+    rf'|\bat\s+(?P<h3>\d{{1,2}})\b'
+)
+
+_FILLER_RE = re.compile(r'\b(book|schedule|meeting|appointment|call|session)\b', re.IGNORECASE)
+
+
+def normalize(message: str) -> str:
+    text = _AMPM_DOTS_RE.sub(r'\1m', message.lower())
+    text = _NORMALIZE_RE.sub(' ', text)
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+def _to_24h(
+    hour: int, minute: int, ampm: Optional[str], assume_business_hours: bool = False, evening: bool = False
+) -> Optional[time]:
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        pm = ampm.startswith('p')
+        if pm and hour != 12:
+            hour += 12
+        elif not pm and hour == 12:
+            hour = 0
+    elif evening and 1 <= hour <= 11:
+        # "tonight at 8"
+        hour += 12
+    elif assume_business_hours and 1 <= hour <= 7:
+        # "at 3" for a meeting means 3 PM, not 3 AM
+        hour += 12
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+    return time(hour, minute)
+
+
+def _match_date(text: str, today: date) -> Tuple[Optional[date], Optional[Tuple[int, int]]]:
+    """First recognised date expression and its span."""
+    for kind, pattern in _DATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        try:
+            if kind == 'relative':
+                offset = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'tmrw': 1, 'day after tomorrow': 2}
+                return today + timedelta(days=offset[match['rel']]), match.span()
+            if kind == 'weekday':
+                days_ahead = _WEEKDAYS[match['wd']] - today.weekday()
+                if days_ahead <= 0:  # Target day already happened this week
+                    days_ahead += 7
+                return today + timedelta(days=days_ahead), match.span()
+            if kind == 'in_days':
+                count = _COUNTS.get(match['n']) or int(match['n'])
+                return today + timedelta(days=count * (7 if match['unit'] == 'week' else 1)), match.span()
+            if kind == 'next_week':
+                return today + timedelta(days=7), match.span()
+            if kind == 'day_of_month':
+                return _next_day_of_month(today, int(match['d'])), match.span()
+
+            month = int(match['mo']) if kind in ('iso', 'slash') else _MONTHS[match['mon']]
+            day = int(match['d'])
+            if match['y']:
+                year = int(match['y'])
+                if year < 100:
+                    year += 2000
+                return date(year, month, day), match.span()
+            # No year given: the next time that day comes around
+            candidate = date(today.year, month, day)
+            if candidate < today:
+                candidate = date(today.year + 1, month, day)
+            return candidate, match.span()
+        except ValueError:
+            return None, match.span()
+    return None, None
+
+
+def _next_day_of_month(today: date, day: int) -> date:
+    """"The 20th": this month's if it hasn't passed, else the next month that has one."""
+    year, month = today.year, today.month
+    for _ in range(12):
+        try:
+            candidate = date(year, month, day)
+            if candidate >= today:
+                return candidate
+        except ValueError:
+            pass
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    raise ValueError(f"no day {day} in any month")
+
+
+def _match_time(text: str, evening: bool = False) -> Tuple[Optional[time], Optional[time]]:
+    match = _RANGE_RE.search(text)
+    if match:
+        ap2 = match['ap2']
+        ap1 = match['ap1'] or ap2
+        start = _to_24h(int(match['h1']), int(match['m1'] or 0), ap1)
+        end = _to_24h(int(match['h2']), int(match['m2'] or 0), ap2)
+        if start and end and not match['ap1'] and start > end:
+            # "11-1 pm" starts in the morning
+            start = _to_24h(int(match['h1']), int(match['m1'] or 0), 'am')
+        if start and end:
+            return start, end
+
+    match = _TIME_RE.search(text)
+    if not match:
+        return None, None
+    if match['named']:
+        return (time(0, 0) if match['named'] == 'midnight' else time(12, 0)), None
+    if match['h1']:
+        return _to_24h(int(match['h1']), int(match['m1'] or 0), match['ap1']), None
+    if match['h2']:
+        return _to_24h(int(match['h2']), int(match['m2']), None, evening=evening), None
+    return _to_24h(int(match['h3']), 0, None, assume_business_hours=True, evening=evening), None
+
+
+@lru_cache(maxsize=4096)
+def _fast_parse(text: str, today: date) -> Optional[Tuple[datetime, Optional[datetime]]]:
+    """
+    Precompiled grammar for the phrases people actually type ("next friday at 3 pm",
+    "tomorrow 10:30am", "oct 20 2-3pm"). Returns None when it can't be sure, so the
+    caller can fall back to dateparser.
+    """
+    target_date, span = _match_date(text, today)
+    if span is not None and target_date is None:
+        return None  # looked like a date but wasn't valid
+    remainder = text if span is None else text[:span[0]] + ' ' + text[span[1]:]
+    if _UNREAD_DATE_RE.search(remainder):
+        return None  # e.g. "in 2 months": today would be a wrong guess
+
+    evening = span is not None and text[span[0]:span[1]] == 'tonight'
+    start, end = _match_time(remainder, evening)
+    if start is None:
+        return None
+    if target_date is None:
+        target_date = today
+
+    start_dt = datetime.combine(target_date, start)
+    end_dt = None
+    if end is not None:
+        end_dt = datetime.combine(target_date, end)
+        if end_dt <= start_dt:
+            end_dt += timedelta(days=1)
+    return start_dt, end_dt
+
+
+def _dateparser_parse(text: str, reference: datetime) -> Optional[datetime]:
+    """Uncached dateparser lookup; also runs inside the fallback worker processes."""
+    # dateparser takes ~0.5s to import, and the server process only needs it without a pool
+    import dateparser
+
+    settings = dict(DATEPARSER_SETTINGS, RELATIVE_BASE=reference)
+    try:
+        parsed = dateparser.parse(text, settings=settings, languages=DATEPARSER_LANGUAGES)
+        if parsed:
+            return parsed
+        cleaned = _SPACES_RE.sub(' ', _FILLER_RE.sub('', text)).strip()
+        if cleaned and cleaned != text:
+            return dateparser.parse(cleaned, settings=settings, languages=DATEPARSER_LANGUAGES)
+    except Exception:
+        pass
+    return None
+
+
+def _warm_worker() -> None:
+    # Loads dateparser's language data once per worker instead of on the first request
+    import dateparser
+    dateparser.parse("next friday at 3 pm", settings=DATEPARSER_SETTINGS, languages=DATEPARSER_LANGUAGES)
+
+
+def _noop() -> None:
+    pass
+
+
+def start_fallback_pool(workers: int = FALLBACK_WORKERS) -> None:
+    """Start and pre-warm the dateparser worker processes (idempotent)."""
+    global _fallback_pool
+    if _fallback_pool is not None:
+        return
+    _fallback_pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_worker,
+    )
+    # Workers are spawned lazily; push one task per worker so they all start warming now
+    for future in [_fallback_pool.submit(_noop) for _ in range(workers)]:
+        future.result()
+
+
+def stop_fallback_pool() -> None:
+    global _fallback_pool
+    if _fallback_pool is not None:
+        _fallback_pool.shutdown(wait=False, cancel_futures=True)
+        _fallback_pool = None
+
+
+def _split_fallback_key(message: str, now: Optional[datetime]):
+    now = now or datetime.now()
+    text = normalize(message)
+    # Relative phrases ("in 2 hours") depend on the clock, so the slow path keys on the minute
+    return text, now, now.replace(second=0, microsecond=0)
+
+
+def parse_datetime_range(message: str, now: Optional[datetime] = None) -> Optional[Tuple[datetime, Optional[datetime]]]:
+    """(start, end) for a message; end is only set when the message gives a time range."""
+    text, now, reference = _split_fallback_key(message, now)
+    if not text:
+        return None
+
+    result = _fast_parse(text, now.date())
+    if result is not None:
+        return result
+
+    parsed = _fallback_cache.get((text, reference), _MISSING)
+    if parsed is _MISSING:
+        parsed = _dateparser_parse(text, reference)
+        _fallback_cache.set((text, reference), parsed)
+    return (parsed, None) if parsed else None
+
+
+async def parse_datetime_range_async(
+    message: str, now: Optional[datetime] = None, timeout: float = FALLBACK_TIMEOUT_SECONDS
+) -> Optional[Tuple[datetime, Optional[datetime]]]:
+    """
+    Same as parse_datetime_range, but the dateparser fallback runs in the warm process
+    pool so it never holds the GIL on the event loop. Gives up (None) after `timeout`.
+    """
+    text, now, reference = _split_fallback_key(message, now)
+    if not text:
+        return None
+
+    result = _fast_parse(text, now.date())
+    if result is not None:
+        return result
+
+    parsed = _fallback_cache.get((text, reference), _MISSING)
+    if parsed is _MISSING:
+        fallback_stats["calls"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            # Without a pool (e.g. scripts) a thread still keeps the loop responsive
+            parsed = await asyncio.wait_for(
+                loop.run_in_executor(_fallback_pool, _dateparser_parse, text, reference), timeout
+            )
+        except asyncio.TimeoutError:
+            fallback_stats["timeouts"] += 1
+            return None
+        except BrokenProcessPool:
+            fallback_stats["errors"] += 1
+            stop_fallback_pool()
+            await loop.run_in_executor(None, start_fallback_pool)
+            return None
+        _fallback_cache.set((text, reference), parsed)
+    return (parsed, None) if parsed else None
+
+
+def mentions_time(message: str) -> bool:
+    """Whether the message names a date or a time the fast path recognises; never calls dateparser."""
+    text = normalize(message)
+    return bool(_TIME_RE.search(text) or any(pattern.search(text) for _, pattern in _DATE_PATTERNS))
+
+
+def parse_date(message: str, today: Optional[date] = None) -> Optional[date]:
+    """Just the day mentioned in a message (fast path only), e.g. for availability questions."""
+    target_date, _ = _match_date(normalize(message), today or date.today())
+    return target_date
+
+
+def parse_datetime(message: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    result = parse_datetime_range(message, now)
+    return result[0] if result else None
+
+
+async def parse_datetime_async(message: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    result = await parse_datetime_range_async(message, now)
+    return result[0] if result else None
+
+
+def cache_info() -> dict:
+    return {
+        "fast_path": _fast_parse.cache_info()._asdict(),
+        "dateparser": dict(_fallback_cache.stats(), **fallback_stats),
+    }
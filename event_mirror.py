@@ -0,0 +1,129 @@
+import asyncio
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from availability import Interval, events_to_intervals, merge_intervals
+from ttl_cache import TTLCache
+
+
+class EventMirror:
+    """
+    Local copy of one calendar's events, kept current with Google sync tokens.
+
+    Events are indexed by start time so busy/upcoming lookups only touch the events
+    that can overlap the requested window.
+    """
+
+    def __init__(self, tz: ZoneInfo):
+        self.tz = tz
+        self.events: Dict[str, Dict] = {}
+        self.sync_token: Optional[str] = None
+        self.last_synced = 0.0
+        self.synced_at: Optional[datetime] = None  # wall clock, for telling users how old a stale answer is
+        self.lock = asyncio.Lock()
+        self._index: Optional[List[tuple]] = None  # sorted (start, end, event_id)
+        self._starts: List[datetime] = []
+        self._max_span = timedelta(0)
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self.sync_token is not None and time.monotonic() - self.last_synced < max_age
+
+    def mark_stale(self) -> None:
+        # Not 0: monotonic time can itself be small shortly after boot
+        self.last_synced = float("-inf")
+
+    def replace_all(self, items: List[Dict], sync_token: Optional[str]) -> None:
+        self.events = {}
+        self.apply(items, sync_token)
+
+    def apply(self, items: List[Dict], sync_token: Optional[str] = None) -> Set[date]:
+        """Apply changed events; returns the days whose busy time may have changed."""
+        changed_days = set()
+        for item in items:
+            previous = self.events.pop(item['id'], None)
+            if item.get('status') != 'cancelled':
+                self.events[item['id']] = item
+            for event in (previous, item):
+                if event is not None and 'start' in event:
+                    changed_days.update(self._days(event))
+        if sync_token:
+            self.sync_token = sync_token
+            self.last_synced = time.monotonic()
+            self.synced_at = datetime.now(self.tz)
+        self._index = None
+        return changed_days
+
+    def _days(self, event: Dict) -> Set[date]:
+        days = set()
+        for start, end in events_to_intervals([event], self.tz):
+            day = start.astimezone(self.tz).date()
+            last = (end - timedelta(microseconds=1)).astimezone(self.tz).date()
+            while day <= last:
+                days.add(day)
+                day += timedelta(days=1)
+        return days
+
+    def _ensure_index(self) -> None:
+        if self._index is not None:
+            return
+        index = []
+        max_span = timedelta(0)
+        for event_id, event in self.events.items():
+            for start, end in events_to_intervals([event], self.tz):
+                index.append((start, end, event_id))
+                max_span = max(max_span, end - start)
+        index.sort(key=lambda entry: entry[0])
+        self._index = index
+        self._starts = [entry[0] for entry in index]
+        self._max_span = max_span
+
+    def _overlapping(self, start: datetime, end: datetime) -> List[tuple]:
+        self._ensure_index()
+        # Nothing starting earlier than start - max_span can still be running at `start`
+        lo = bisect_left(self._starts, start - self._max_span)
+        hi = bisect_left(self._starts, end)
+        return [entry for entry in self._index[lo:hi] if entry[1] > start]
+
+    def busy_between(self, start: datetime, end: datetime) -> List[Interval]:
+        return merge_intervals((s, e) for s, e, _ in self._overlapping(start, end))
+
+    def upcoming(self, now: datetime, limit: int = 10) -> List[Dict]:
+        self._ensure_index()
+        lo = bisect_left(self._starts, now)
+        return [self.events[event_id] for _, _, event_id in self._index[lo:lo + limit]]
+
+
+class MirrorRegistry:
+    """Bounded set of event mirrors keyed by (user, calendar)."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60 * 60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.resyncs = 0
+
+    def get(self, user_id: str, calendar_id: str) -> Optional[EventMirror]:
+        return self._cache.get((user_id, calendar_id))
+
+    def get_or_create(self, user_id: str, calendar_id: str, tz: ZoneInfo) -> EventMirror:
+        mirror = self._cache.get((user_id, calendar_id))
+        if mirror is None:
+            mirror = EventMirror(tz)
+        # Re-setting keeps mirrors that are in active use from expiring
+        self._cache.set((user_id, calendar_id), mirror)
+        return mirror
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._cache.stats()
+        stats.update(
+            full_syncs=self.full_syncs,
+            incremental_syncs=self.incremental_syncs,
+            resyncs=self.resyncs,
+        )
+        return stats
+
+
+default_mirror_registry = MirrorRegistry()
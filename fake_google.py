@@ -0,0 +1,367 @@
+"""
+Local stand-in for the Google Calendar v3 REST API, with error injection.
+
+Serves the handful of endpoints CalendarService uses (events list/get/insert/delete/watch,
+channels.stop, freeBusy, and batches of them) from memory over real HTTP, so the real googleapiclient,
+HttpError parsing, retries, backoff and the circuit breaker all run unchanged.
+
+    python fake_google.py --port 8099 --error-rate 0.2 --latency 0.05
+
+In code:
+
+    server = FakeGoogleServer().start()
+    server.fail(503, times=3)                 # next three calls get 503
+    server.fail(403, reason="rateLimitExceeded")
+    service = server.build_service()
+    calendar_service = CalendarService(None, user_id="u1", service=service)
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser, Parser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+from availability import parse_rfc3339
+
+_EVENTS_RE = re.compile(r'^/calendars/([^/]+)/events(?:/([^/]+))?$')
+
+
+def _event_time(value: Dict) -> datetime:
+    # Inserts may send a local dateTime plus a timeZone, like CalendarService does
+    moment = parse_rfc3339(value["dateTime"])
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=ZoneInfo(value.get("timeZone") or "UTC"))
+    return moment
+
+
+def owner_calendar(access_token: str) -> str:
+    """Where the fake keeps the "primary" calendar of whoever holds `access_token`."""
+    return f"primary:{access_token}"
+
+
+class FakeGoogleServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, error_rate: float = 0.0, latency: float = 0.0):
+        self.error_rate = error_rate
+        self.latency = latency
+        self.calendars: Dict[str, Dict[str, Dict]] = {}  # calendar_id -> event_id -> event
+        self.unreadable: Set[str] = set()  # calendar ids freebusy answers notFound for
+        self.requests = 0
+        self.errors_injected = 0
+        self._faults: List[list] = []  # [status, reason, remaining]
+        self._lock = threading.Lock()
+        self._sync_version = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "FakeGoogleServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def build_service(self):
+        """A googleapiclient Calendar service pointed at this server."""
+        import httplib2
+        from googleapiclient.discovery import build
+        return build(
+            'calendar', 'v3', http=httplib2.Http(timeout=10), static_discovery=True,
+            client_options={"api_endpoint": self.url}
+        )
+
+    # --- error injection ---
+
+    def fail(self, status: int, reason: Optional[str] = None, times: int = 1) -> None:
+        """Make the next `times` requests fail with `status` (and a Google error `reason`)."""
+        with self._lock:
+            self._faults.append([status, reason, times])
+
+    def clear_faults(self) -> None:
+        with self._lock:
+            self._faults.clear()
+        self.error_rate = 0.0
+
+    def _next_fault(self):
+        with self._lock:
+            if self._faults:
+                fault = self._faults[0]
+                fault[2] -= 1
+                if fault[2] <= 0:
+                    self._faults.pop(0)
+                return fault[0], fault[1]
+        if self.error_rate and random.random() < self.error_rate:
+            return random.choice([(503, "backendError"), (500, "backendError"), (403, "rateLimitExceeded")])
+        return None
+
+    # --- calendar data ---
+
+    def add_event(
+        self, calendar_id: str, start: datetime, end: datetime, summary: str = "Busy", event_id: Optional[str] = None
+    ) -> Dict:
+        event = {
+            "id": event_id or uuid.uuid4().hex,
+            "status": "confirmed",
+            "summary": summary,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": end.isoformat()},
+            "htmlLink": "https://calendar.google.com/event?fake",
+        }
+        with self._lock:
+            self._sync_version += 1
+            event["_version"] = self._sync_version
+            self.calendars.setdefault(calendar_id, {})[event["id"]] = event
+        return event
+
+    def _list(self, calendar_id: str, query: Dict[str, str]) -> Dict:
+        with self._lock:
+            events = list(self.calendars.get(calendar_id, {}).values())
+            version = self._sync_version
+        if "syncToken" in query:
+            since = int(query["syncToken"])
+            events = [e for e in events if e["_version"] > since]
+        else:
+            events = [e for e in events if e["status"] != "cancelled"]
+            if "timeMin" in query:
+                time_min = parse_rfc3339(query["timeMin"])
+                events = [e for e in events if parse_rfc3339(e["end"]["dateTime"]) > time_min]
+            if "timeMax" in query:
+                time_max = parse_rfc3339(query["timeMax"])
+                events = [e for e in events if parse_rfc3339(e["start"]["dateTime"]) < time_max]
+        events.sort(key=lambda e: parse_rfc3339(e["start"]["dateTime"]))
+
+        offset = int(query.get("pageToken") or 0)
+        page_size = int(query.get("maxResults") or 250)
+        page = events[offset:offset + page_size]
+        body = {"kind": "calendar#events", "items": [{k: v for k, v in e.items() if k != "_version"} for e in page]}
+        if offset + page_size < len(events):
+            body["nextPageToken"] = str(offset + page_size)
+        else:
+            body["nextSyncToken"] = str(version)
+        return body
+
+    def _insert(self, calendar_id: str, body: Dict) -> Optional[Dict]:
+        """The created event, or None when the client-chosen id is already taken."""
+        if body.get("id") and body["id"] in self.calendars.get(calendar_id, {}):
+            return None
+        event = self.add_event(
+            calendar_id, _event_time(body["start"]), _event_time(body["end"]), body.get("summary", ""),
+            event_id=body.get("id")
+        )
+        return {k: v for k, v in event.items() if k != "_version"}
+
+    def _get(self, calendar_id: str, event_id: str) -> Optional[Dict]:
+        event = self.calendars.get(calendar_id, {}).get(event_id)
+        return {k: v for k, v in event.items() if k != "_version"} if event else None
+
+    def _patch(self, calendar_id: str, event_id: str, body: Dict) -> Optional[Dict]:
+        with self._lock:
+            event = self.calendars.get(calendar_id, {}).get(event_id)
+            if event is None or event["status"] == "cancelled":
+                return None
+            for key in ("start", "end"):
+                if key in body:
+                    event[key] = {"dateTime": _event_time(body[key]).isoformat()}
+            if "summary" in body:
+                event["summary"] = body["summary"]
+            self._sync_version += 1
+            event["_version"] = self._sync_version
+            return {k: v for k, v in event.items() if k != "_version"}
+
+    def _delete(self, calendar_id: str, event_id: str) -> bool:
+        with self._lock:
+            event = self.calendars.get(calendar_id, {}).get(event_id)
+            if event is None or event["status"] == "cancelled":
+                return False
+            self._sync_version += 1
+            event["status"] = "cancelled"
+            event["_version"] = self._sync_version
+            return True
+
+    def _freebusy(self, body: Dict, resolve=lambda calendar_id: calendar_id) -> Dict:
+        time_min, time_max = parse_rfc3339(body["timeMin"]), parse_rfc3339(body["timeMax"])
+        calendars = {}
+        for item in body.get("items", []):
+            if item["id"] in self.unreadable:
+                calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                continue
+            busy = []
+            with self._lock:
+                events = list(self.calendars.get(resolve(item["id"]), {}).values())
+            for event in events:
+                start, end = parse_rfc3339(event["start"]["dateTime"]), parse_rfc3339(event["end"]["dateTime"])
+                if event["status"] != "cancelled" and start < time_max and end > time_min:
+                    busy.append({"start": start.isoformat(), "end": end.isoformat()})
+            calendars[item["id"]] = {"busy": sorted(busy, key=lambda b: b["start"])}
+        return {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"],
+                "calendars": calendars}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Optional[Dict] = None,
+                      content_type: str = "application/json; charset=UTF-8") -> None:
+                if isinstance(body, bytes):
+                    payload = body
+                else:
+                    payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self, status: int, reason: Optional[str], message: str = "Injected error") -> Tuple[int, Dict]:
+                return status, {"error": {
+                    "code": status, "message": message,
+                    "errors": [{"domain": "usageLimits" if reason and "Limit" in reason else "global",
+                                "reason": reason or "backendError", "message": message}],
+                }}
+
+            def _calendar(self, calendar_id: str) -> str:
+                # Every access token gets its own "primary", like every Google user does
+                token = (self.headers.get("Authorization") or "").rpartition(" ")[2]
+                return owner_calendar(token) if calendar_id == "primary" and token else calendar_id
+
+            def _handle(self, method: str) -> None:
+                server.requests += 1
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if server.latency:
+                    time.sleep(server.latency)
+
+                fault = server._next_fault()
+                if fault is not None:
+                    server.errors_injected += 1
+                    return self._send(*self._error(*fault))
+
+                if method == "POST" and urlparse(self.path).path.startswith("/batch/"):
+                    return self._batch(raw)
+                return self._send(*self._route(method, self.path, raw))
+
+            def _route(self, method: str, target: str, raw: bytes) -> Tuple[int, Optional[Dict]]:
+                url = urlparse(target)
+                # The client drops the service path when api_endpoint is overridden; accept both
+                path = url.path[len("/calendar/v3"):] if url.path.startswith("/calendar/v3/") else url.path
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = json.loads(raw) if raw else {}
+
+                match = _EVENTS_RE.match(path)
+                if match:
+                    calendar_id, event_id = self._calendar(match.group(1)), match.group(2)
+                    if method == "GET" and event_id is None:
+                        if query.get("syncToken") and int(query["syncToken"]) > server._sync_version:
+                            return self._error(410, "fullSyncRequired", "Sync token is no longer valid")
+                        return 200, server._list(calendar_id, query)
+                    if method == "POST" and event_id is None:
+                        created = server._insert(calendar_id, body)
+                        if created is None:
+                            return self._error(409, "duplicate", "The requested identifier already exists.")
+                        return 200, created
+                    if method == "GET" and event_id is not None:
+                        event = server._get(calendar_id, event_id)
+                        return (200, event) if event else self._error(404, "notFound", "Not Found")
+                    if method == "POST" and event_id == "watch":
+                        return 200, {
+                            "kind": "api#channel", "id": body.get("id"), "resourceId": uuid.uuid4().hex,
+                            "expiration": str(int((time.time() + 7 * 86400) * 1000)),
+                        }
+                    if method == "PATCH" and event_id is not None:
+                        event = server._patch(calendar_id, event_id, body)
+                        return (200, event) if event else self._error(404, "notFound", "Not Found")
+                    if method == "DELETE" and event_id is not None:
+                        if server._delete(calendar_id, event_id):
+                            return 204, None
+                        return self._error(410, "deleted", "Resource has been deleted")
+                if method == "POST" and path == "/freeBusy":
+                    return 200, server._freebusy(body, self._calendar)
+                if method == "POST" and path == "/channels/stop":
+                    return 204, None
+                return self._error(404, "notFound", f"No fake for {method} {url.path}")
+
+            def _batch(self, raw: bytes) -> None:
+                """
+                multipart/mixed batch: every part is one HTTP request, answered by a part
+                with the same Content-ID. Parts use the batch's own Authorization.
+                """
+                content_type = self.headers.get("Content-Type", "")
+                message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + raw)
+                boundary = uuid.uuid4().hex
+                parts = []
+                for part in message.get_payload():
+                    request_line, _, rest = part.get_payload().partition("\n")
+                    method, target, _ = request_line.split(" ", 2)
+                    inner = Parser().parsestr(rest)
+                    status, body = self._route(method, target, inner.get_payload().encode())
+                    parts.append(
+                        f"--{boundary}\r\nContent-Type: application/http\r\n"
+                        f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                        f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                        f"{json.dumps(body) if body is not None else ''}\r\n"
+                    )
+                payload = "".join(parts) + f"--{boundary}--\r\n"
+                self._send(200, payload.encode(), content_type=f"multipart/mixed; boundary={boundary}")
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Google Calendar API with error injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--events", type=int, default=20, help="random events to seed into --token's 'primary'")
+    parser.add_argument("--token", default="fake-token", help="access token whose 'primary' gets the seeded events")
+    args = parser.parse_args()
+
+    server = FakeGoogleServer(args.host, args.port, error_rate=args.error_rate, latency=args.latency)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    for _ in range(args.events):
+        start = now + timedelta(hours=random.randint(1, 24 * 14))
+        server.add_event(owner_calendar(args.token), start, start + timedelta(minutes=random.choice([30, 45, 60])))
+    print(f"Fake Google Calendar API on {server.url} (error rate {args.error_rate:.0%}), "
+          f"{args.events} events seeded for access token {args.token!r}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+
+from app_logging import get_logger
+from metrics import default_registry
+from rate_limiter import (
+    Backoff, CircuitBreaker, GoogleUnavailable, TokenBucket, error_status, is_rate_limit, is_server_error,
+    retry_after_seconds
+)
+from ttl_cache import TTLCache
+
+logger = get_logger("google_executor")
+
+MAX_WORKERS = 32
+MAX_CONCURRENCY = 32
+PER_USER_CONCURRENCY = 4
+# Request rates (per second) we allow ourselves, kept under the Calendar API's per-project
+# and per-user quotas so we rarely see 403 rateLimitExceeded at all
+GLOBAL_RATE = 50.0
+GLOBAL_BURST = 100
+PER_USER_RATE = 5.0
+PER_USER_BURST = 10
+# Longest a call may queue for a token before we tell the user to try again
+MAX_QUEUE_SECONDS = 10.0
+
+google_call_seconds = default_registry.histogram(
+    "calendar_app_google_api_call_seconds", "Time per Google API call attempt, queueing excluded", ["method", "outcome"]
+)
+google_call_errors = default_registry.counter(
+    "calendar_app_google_api_errors_total", "Failed Google API call attempts by HTTP status or error type",
+    ["method", "status"]
+)
+
+
+class GoogleApiExecutor:
+    """
+    Runs blocking googleapiclient `.execute()` calls on a dedicated thread pool so
+    they never block the event loop.
+
+    Concurrency is bounded per process and per user. httplib2 connections are not
+    thread-safe, so every worker thread keeps its own Http and the credentials are
+    attached per call.
+
+    `execute` is also where quota is managed: calls draw from a global and a per-user
+    token bucket, rate-limit and 5xx/transport errors are retried with jittered
+    exponential backoff, and a circuit breaker fails fast with GoogleUnavailable while
+    Google is down.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        max_concurrency: int = MAX_CONCURRENCY,
+        per_user_concurrency: int = PER_USER_CONCURRENCY,
+        global_rate: float = GLOBAL_RATE,
+        global_burst: float = GLOBAL_BURST,
+        per_user_rate: float = PER_USER_RATE,
+        per_user_burst: float = PER_USER_BURST,
+        max_queue_seconds: float = MAX_QUEUE_SECONDS,
+        backoff: Optional[Backoff] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="google-api")
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._per_user_concurrency = per_user_concurrency
+        self._user_slots: Dict[str, list] = {}  # user_id -> [semaphore, holders]
+        self._local = threading.local()
+
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+        self._user_buckets = TTLCache(maxsize=10000, ttl=600)
+        self._per_user_rate = per_user_rate
+        self._per_user_burst = per_user_burst
+        self.max_queue_seconds = max_queue_seconds
+        self.backoff = backoff or Backoff()
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+
+    def _http(self) -> httplib2.Http:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = httplib2.Http(timeout=30)
+        return http
+
+    def _run(self, request, credentials):
+        if credentials is None:
+            return request.execute()
+        return request.execute(http=AuthorizedHttp(credentials, http=self._http()))
+
+    def _acquire_user_slot(self, user_id: str) -> asyncio.Semaphore:
+        slot = self._user_slots.get(user_id)
+        if slot is None:
+            slot = self._user_slots[user_id] = [asyncio.Semaphore(self._per_user_concurrency), 0]
+        slot[1] += 1
+        return slot[0]
+
+    def _release_user_slot(self, user_id: str) -> None:
+        slot = self._user_slots[user_id]
+        slot[1] -= 1
+        if slot[1] == 0:
+            del self._user_slots[user_id]
+
+    async def run(self, fn, *args, user_id: Optional[str] = None):
+        """Run any blocking callable under the same limits."""
+        loop = asyncio.get_running_loop()
+        if user_id is None:
+            async with self._global:
+                return await loop.run_in_executor(self._pool, fn, *args)
+
+        user_sem = self._acquire_user_slot(user_id)
+        try:
+            async with user_sem:
+                async with self._global:
+                    return await loop.run_in_executor(self._pool, fn, *args)
+        finally:
+            self._release_user_slot(user_id)
+
+    async def _throttle(self, user_id: Optional[str]) -> None:
+        wait = self._global_bucket.reserve(self.max_queue_seconds)
+        if user_id is not None:
+            bucket = self._user_buckets.get(user_id)
+            if bucket is None:
+                bucket = TokenBucket(self._per_user_rate, self._per_user_burst)
+                self._user_buckets.set(user_id, bucket)
+            try:
+                wait = max(wait, bucket.reserve(self.max_queue_seconds))
+            except GoogleUnavailable:
+                self._global_bucket.refund()
+                raise
+        if wait > 0:
+            self.throttled_seconds += wait
+            await asyncio.sleep(wait)
+
+    async def execute(self, request, credentials=None, user_id: Optional[str] = None, idempotent: bool = True):
+        """
+        Execute a googleapiclient HttpRequest without blocking the event loop.
+
+        Non-idempotent requests (inserts) are only retried on rate-limit errors, where
+        Google rejected the call outright; after a 5xx the write may have happened.
+        """
+        # e.g. "calendar.events.list"; batches don't carry one
+        method = getattr(request, "methodId", None) or "batch"
+        attempt = 0
+        while True:
+            # Only claim the breaker's probe once we're actually about to call Google
+            await self._throttle(user_id)
+            self.breaker.before_call()
+            start = time.perf_counter()
+            try:
+                result = await self.run(self._run, request, credentials, user_id=user_id)
+            except Exception as e:
+                google_call_seconds.labels(method, "error").observe(time.perf_counter() - start)
+                google_call_errors.labels(method, str(error_status(e) or e.__class__.__name__)).inc()
+                rate_limited = is_rate_limit(e)
+                server_error = is_server_error(e)
+                if server_error:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_neutral()
+                if rate_limited:
+                    self.rate_limited += 1
+                if not (rate_limited or (server_error and idempotent)):
+                    raise
+                if attempt >= self.backoff.max_retries:
+                    raise GoogleUnavailable(
+                        "Google Calendar is busy or unavailable, please try again shortly",
+                        retry_after=retry_after_seconds(e)
+                    ) from e
+                delay = self.backoff.delay(attempt, retry_after_seconds(e))
+                logger.debug("%s failed (%s), retry %d in %.2fs", method, e.__class__.__name__, attempt + 1, delay)
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled mid-call: says nothing about Google, but mustn't leave the probe held
+                self.breaker.release_probe()
+                raise
+            google_call_seconds.labels(method, "ok").observe(time.perf_counter() - start)
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict:
+        return {
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "circuit": self.breaker.stats(),
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+default_executor = GoogleApiExecutor()
@@ -0,0 +1,67 @@
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from singleflight import SingleFlight
+from ttl_cache import TTLCache
+
+
+def event_id_for(key: str) -> str:
+    """
+    Google event id derived from an idempotency key. Event ids may use base32hex
+    (0-9, a-v), so a hex digest is always valid, and Google rejects a second insert
+    with the same id (409) instead of creating a duplicate.
+    """
+    return hashlib.sha256(key.encode()).hexdigest()[:40]
+
+
+class IdempotencyIndex:
+    """
+    Results of successful bookings by idempotency key, bounded in size and age. A
+    repeat of a key returns the stored result (marked `replayed`) without calling
+    Google; concurrent repeats wait for the first one instead of racing it. Failed
+    attempts aren't stored, so the client can simply retry them.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 24 * 60 * 60):
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._by_event = TTLCache(maxsize=maxsize, ttl=ttl)  # event_id -> key, to forget cancelled events
+        self._inflight = SingleFlight()
+        self.replays = 0
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        result = self._results.get(key)
+        if result is None:
+            return None
+        self.replays += 1
+        return {**result, "replayed": True}
+
+    def remember(self, key: Hashable, result: Dict) -> None:
+        if not result.get("success"):
+            return
+        self._results.set(key, result)
+        if result.get("event_id"):
+            self._by_event.set(result["event_id"], key)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Dict]]) -> Dict:
+        replay = self.get(key)
+        if replay is not None:
+            return replay
+        result = await self._inflight.do(key, fn)
+        self.remember(key, result)
+        return result
+
+    def forget_event(self, event_id: str) -> None:
+        """A cancelled event must not be replayed as if it were still booked."""
+        key = self._by_event.get(event_id)
+        if key is not None:
+            self._by_event.pop(event_id)
+            self._results.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._results.stats()
+        stats["replays"] = self.replays
+        stats["coalesced"] = self._inflight.deduplicated
+        return stats
+
+
+default_idempotency_index = IdempotencyIndex()
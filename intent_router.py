@@ -0,0 +1,117 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_SPACES_RE = re.compile(r'\s+')
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    phrases: Tuple[str, ...]
+    priority: int  # lower wins when several intents match
+    needs_pending: bool = False  # only meaningful while a booking awaits confirmation
+    # A bare answer ("yes", "no"): only wins when the message asks for nothing else and names no time
+    exclusive: bool = False
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """
+    Regex for a set of phrases with shared prefixes factored out, so the engine walks
+    one trie instead of retrying every alternative at every position.
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        if '' in node and len(node) == 1:
+            return ''
+        branches = []
+        optional = False
+        for char in sorted(node, key=lambda c: (c == '', c)):
+            if char == '':
+                optional = True
+                continue
+            branches.append((r'\s+' if char == ' ' else re.escape(char)) + build(node[char]))
+        body = branches[0] if len(branches) == 1 and not optional else '(?:' + '|'.join(branches) + ')'
+        return body + '?' if optional else body
+
+    return build(trie)
+
+
+class IntentRouter:
+    """
+    Table-driven intent classifier. All phrases of all intents are compiled into one
+    word-bounded trie regex, so a message is scanned once however many intents exist;
+    the winning intent is the matched one with the best priority, then the earliest.
+
+    Exclusive intents are answers to a question we asked. "Sure, but make it 4pm" or
+    "book a call, no later than 3pm" say more than yes or no, so any other intent or
+    a time in the message takes over from them.
+    """
+
+    def __init__(self, intents: List[Intent]):
+        self.intents = {intent.name: intent for intent in intents}
+        self._by_phrase: Dict[str, List[Intent]] = {}
+        for intent in intents:
+            for phrase in intent.phrases:
+                self._by_phrase.setdefault(self._normalize(phrase), []).append(intent)
+        self._pattern = re.compile(r'\b' + _trie_pattern(self._by_phrase) + r'\b')
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return _SPACES_RE.sub(' ', text.lower()).strip()
+
+    def matches(self, message: str) -> List[Tuple[int, Intent]]:
+        """Every (position, intent) whose phrase occurs in the message."""
+        found = []
+        for match in self._pattern.finditer(message.lower()):
+            for intent in self._by_phrase[self._normalize(match.group(0))]:
+                found.append((match.start(), intent))
+        return found
+
+    @staticmethod
+    def _best(found: Iterable[Tuple[int, Intent]]) -> Optional[Intent]:
+        best = None
+        for position, intent in found:
+            key = (intent.priority, position)
+            if best is None or key < best[0]:
+                best = (key, intent)
+        return best[1] if best else None
+
+    def classify(self, message: str, has_pending: bool = False, has_time: bool = False) -> Optional[str]:
+        """`has_time`: the message names a date or time, so it isn't a bare yes/no."""
+        found = [(position, intent) for position, intent in self.matches(message)
+                 if has_pending or not intent.needs_pending]
+        answers = [(position, intent) for position, intent in found if intent.exclusive]
+        requests = [(position, intent) for position, intent in found if not intent.exclusive]
+        # A phrase an answer shares with a request ("no, cancel") is still only the answer
+        answered_at = {position for position, _ in answers}
+        if answers and not has_time and all(position in answered_at for position, _ in requests):
+            best = self._best(answers)
+        else:
+            best = self._best(requests)
+        return best.name if best else None
+
+
+CHAT_INTENTS = [
+    Intent("confirm", ("yes", "yep", "yeah", "sure", "confirm", "confirm it", "ok", "okay",
+                       "go ahead", "sounds good", "do it"), priority=10, needs_pending=True, exclusive=True),
+    Intent("decline", ("no", "nope", "cancel", "cancel it", "never mind", "nevermind", "don't",
+                       "dont"), priority=10, needs_pending=True, exclusive=True),
+    Intent("reschedule", ("reschedule", "change time", "change the time", "different time",
+                          "another time", "move it", "move my", "postpone"), priority=20),
+    Intent("book", ("book", "schedule", "set up", "arrange", "plan a", "put a"), priority=25),
+    # Below booking: "schedule a call to cancel the contract" is a booking
+    Intent("cancel_event", ("cancel", "delete", "remove", "call off"), priority=30),
+    Intent("availability", ("available", "availability", "free", "free slots", "open slots",
+                            "when can", "any slots"), priority=35),
+    Intent("list_events", ("show my calendar", "my calendar", "my events", "my meetings",
+                           "upcoming", "agenda", "what's on", "whats on", "list"), priority=40),
+]
+
+chat_router = IntentRouter(CHAT_INTENTS)
@@ -1,23 +1,128 @@
 # === main.py (FastAPI backend) ===
 
-from fastapi import FastAPI, Request, Body, HTTPException
-from fastapi.responses import RedirectResponse
+import time
+IMPORT_STARTED = time.perf_counter()  # keep first: the import time ends up in /metrics
+
+from fastapi import FastAPI, Request, Body, Header, HTTPException, Query
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from datetime import datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import hashlib
+import importlib
 import os
 import json
-import uuid
-import dateparser
 import re
-from typing import Optional
+import uuid
+from typing import List, Optional
+
+from app_logging import get_logger
+from metrics import CONTENT_TYPE, default_registry, stats_families
+from calendar_service import CalendarService, calendar_resource
+from client_pool import CalendarClientPool
+from availability_cache import default_availability_cache
+from event_mirror import default_mirror_registry
+from singleflight import SingleFlight, default_singleflight
+from ttl_cache import TTLCache
+from google_executor import default_executor
+from rate_limiter import GoogleUnavailable
+from idempotency import default_idempotency_index
+from slot_index import default_slot_index_registry
+from watch_channels import WatchChannelManager
+from token_refresher import REFRESH_CHECK_INTERVAL_SECONDS, TokenRefresher
+from slot_engine import SchedulingPreferences
+from session_store import create_store
+from chat_session import ChatSession, ChatSessionStore, PendingBooking, PendingCancellation
+from intent_router import chat_router
+from datetime_parser import cache_info, mentions_time, parse_date, parse_datetime_async, start_fallback_pool, stop_fallback_pool
+
+logger = get_logger("main")
+datetime_parse_seconds = default_registry.histogram(
+    "calendar_app_datetime_parse_seconds", "Time to find a datetime in a chat message", ["result"]
+)
+intent_dispatch_seconds = default_registry.histogram(
+    "calendar_app_intent_dispatch_seconds", "Time to classify a chat message and run its handler", ["intent"]
+)
+chat_errors = default_registry.counter(
+    "calendar_app_chat_errors_total", "Chat messages that failed with an unexpected exception"
+)
+startup_seconds = default_registry.gauge(
+    "calendar_app_startup_seconds",
+    "Cold start: import, lifespan until serving, warm_up of heavy modules, and the first request", ["phase"]
+)
+
+# "prewarm" loads the heavy modules before serving; "lazy" starts serving at once and warms
+# up in the background, so the first requests may pay for whatever isn't loaded yet
+STARTUP_MODE = os.environ.get('STARTUP_MODE', 'prewarm')
+
+def prewarm():
+    """Load what the first requests would otherwise pay for, off the event loop"""
+    importlib.import_module("google_auth_oauthlib.flow")
+    importlib.import_module("team_availability")
+    calendar_resource()
+    try:
+        client_config()
+    except FileNotFoundError:
+        logger.warning("%s not found, /auth won't work", CLIENT_SECRET_FILE)
+
+async def warm_up():
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    # Spawning and warming the dateparser workers takes a moment, keep it off the loop
+    await asyncio.gather(loop.run_in_executor(None, start_fallback_pool), loop.run_in_executor(None, prewarm))
+    startup_seconds.labels("warm_up").set(time.perf_counter() - started)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if STARTUP_MODE == "lazy":
+        warming = asyncio.create_task(warm_up())
+    else:
+        warming = None
+        await warm_up()
+    renewer = asyncio.create_task(renew_watch_channels())
+    maintenance = asyncio.create_task(maintain_stores())
+    token_refresher.track_all()
+    refresher = asyncio.create_task(refresh_tokens())
+    startup_seconds.labels("lifespan").set(time.perf_counter() - started)
+    yield
+    renewer.cancel()
+    maintenance.cancel()
+    refresher.cancel()
+    if warming is not None:
+        # The pool can't be stopped while a thread is still starting it
+        await warming
+    user_tokens.close()
+    chat_sessions.close()
+    user_preferences.close()
+    watch_channels.store.close()
+    stop_fallback_pool()
 
-from calendar_service import CalendarService
+app = FastAPI(title="Google Calendar Booking API", lifespan=lifespan)
 
-app = FastAPI(title="Google Calendar Booking API")
+class FirstRequestTimer:
+    """Times the first HTTP request a worker serves, then stays out of the way"""
+
+    def __init__(self, app):
+        self.app = app
+        self.pending = True
+
+    async def __call__(self, scope, receive, send):
+        if not self.pending or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.pending = False
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            startup_seconds.labels("first_request").set(time.perf_counter() - started)
+
+app.add_middleware(FirstRequestTimer)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,20 +136,148 @@ SCOPES = ['https://www.googleapis.com/auth/calendar']
 CLIENT_SECRET_FILE = 'credentials.json'
 REDIRECT_URI = 'http://localhost:8000/oauth2callback'
 
-user_tokens = {}
-chat_sessions = {}
+@lru_cache(maxsize=1)
+def client_config() -> dict:
+    """The OAuth client secrets, read once per process rather than on every /auth hit"""
+    with open(CLIENT_SECRET_FILE) as f:
+        return json.load(f)
+
+def oauth_flow():
+    # A Flow carries per-login state, so each request gets its own; only the config is shared
+    from google_auth_oauthlib.flow import Flow
+    return Flow.from_client_config(client_config(), scopes=SCOPES, redirect_uri=REDIRECT_URI)
+# Public HTTPS address of /calendar/notifications; push channels are only opened when set
+WEBHOOK_URL = os.environ.get('CALENDAR_WEBHOOK_URL')
+
+def webhook_token() -> str:
+    token = os.environ.get('CALENDAR_WEBHOOK_TOKEN')
+    if token:
+        return token
+    # Channels in a shared store outlive this process and reach other workers, which
+    # would each make up their own token and reject every ping
+    shared = os.environ.get("SESSION_STORE", "memory") != "memory" or int(os.environ.get("WEB_CONCURRENCY", "1")) > 1
+    if WEBHOOK_URL and shared:
+        raise RuntimeError("Set CALENDAR_WEBHOOK_TOKEN when several workers or restarts share watch channels")
+    return str(uuid.uuid4())
+
+WEBHOOK_TOKEN = webhook_token()
+CHANNEL_RENEW_INTERVAL_SECONDS = 5 * 60
+SESSION_IDLE_SECONDS = 2 * 60 * 60
+STORE_MAINTENANCE_INTERVAL_SECONDS = 30
+EVENTS_DEFAULT_WINDOW_DAYS = 30
+# Chat bookings are this long, and a busy time gets this many nearest free alternatives
+CHAT_MEETING_MINUTES = 45
+CHAT_ALTERNATIVES = 3
+
+# Tokens never go idle; chat sessions are dropped after SESSION_IDLE_SECONDS without a message
+user_tokens = create_store("user_tokens")
+chat_sessions = ChatSessionStore(create_store("chat_sessions", idle_ttl=SESSION_IDLE_SECONDS))
+# Working hours, timezone, buffers etc. per user, as SchedulingPreferences dicts; read on
+# every client build and rarely changed, so a couple of seconds' lag between workers is fine
+user_preferences = create_store("user_preferences", read_cache_ttl=2.0)
+
+def load_preferences(user_id: str) -> SchedulingPreferences:
+    return SchedulingPreferences.from_dict(user_preferences.get(user_id))
+
+# Built Google clients, reused across requests for the same user
+client_pool = CalendarClientPool(
+    scopes=SCOPES,
+    service_factory=lambda creds, user_id: CalendarService(creds, user_id=user_id, preferences=load_preferences(user_id))
+)
+
+def get_calendar_service(user_id: str) -> CalendarService:
+    return client_pool.get(user_id, user_tokens[user_id])
+
+# Refreshes access tokens before they expire and writes them back to user_tokens
+token_refresher = TokenRefresher(user_tokens, client_pool, SCOPES)
+
+def store_token(user_id: str, token_json: str):
+    user_tokens[user_id] = token_json
+    token_refresher.track(user_id, token_json)
+
+# Google push-notification channels, one per user calendar
+watch_channels = WatchChannelManager(address=WEBHOOK_URL, token=WEBHOOK_TOKEN, store=create_store("watch_channels"))
+background_tasks = set()
+
+async def renew_watch_channels():
+    while True:
+        await asyncio.sleep(CHANNEL_RENEW_INTERVAL_SECONDS)
+        try:
+            await watch_channels.renew_due(get_calendar_service)
+        except Exception as e:
+            logger.warning("Channel renewal failed: %s", e)
+
+async def refresh_tokens():
+    while True:
+        await asyncio.sleep(REFRESH_CHECK_INTERVAL_SECONDS)
+        try:
+            await token_refresher.refresh_due()
+        except Exception as e:
+            logger.warning("Token refresh failed: %s", e)
+
+async def maintain_stores():
+    while True:
+        await asyncio.sleep(STORE_MAINTENANCE_INTERVAL_SECONDS)
+        try:
+            user_tokens.flush()
+            chat_sessions.flush()
+            user_preferences.flush()
+            watch_channels.store.flush()
+            chat_sessions.sweep(SESSION_IDLE_SECONDS)
+        except Exception as e:
+            logger.warning("Store maintenance failed: %s", e)
+
+def unavailable(e: GoogleUnavailable) -> dict:
+    return {"error": str(e), "status": "unavailable", "retry_after": e.retry_after}
+
+def drop_client_if_revoked(user_id: str, result: dict):
+    # A revoked/expired refresh token surfaces as invalid_grant, don't keep reusing that client
+    if not result.get("success") and "invalid_grant" in str(result.get("error", "")):
+        client_pool.invalidate(user_id)
+        token_refresher.forget(user_id)
 
 @app.get("/")
 async def home():
     return {"message": "Welcome to the Google Calendar Booking API"}
 
+def component_stats() -> dict:
+    return {
+        "client_pool": client_pool.stats(),
+        "availability": default_availability_cache.stats(),
+        "event_mirrors": default_mirror_registry.stats(),
+        "singleflight": default_singleflight.stats(),
+        "google_api": default_executor.stats(),
+        "idempotency": default_idempotency_index.stats(),
+        "slot_index": default_slot_index_registry.stats(),
+        "watch_channels": watch_channels.stats(),
+        "token_refresher": token_refresher.stats(),
+        "user_tokens": user_tokens.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "chat_replies": dict(chat_replies.stats(), coalesced=chat_inflight.deduplicated),
+        "user_preferences": user_preferences.stats(),
+        "datetime_parser": cache_info(),
+    }
+
+# Cache hits, fallbacks, store sizes etc. are already counted by each component
+default_registry.add_collector(lambda: stats_families("calendar_app", component_stats()))
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return component_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: timing histograms, error counters and every /cache/stats number"""
+    return Response(content=default_registry.render(), media_type=CONTENT_TYPE)
+
+@app.delete("/session/{session_id}")
+async def delete_session(session_id: str):
+    chat_sessions.delete(session_id)
+    return {"success": True}
+
 @app.get("/auth")
 async def authorize():
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRET_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI
-    )
+    flow = oauth_flow()
     state = str(uuid.uuid4())
     auth_url, _ = flow.authorization_url(
         access_type='offline',
@@ -58,15 +291,18 @@ async def oauth2callback(request: Request):
     state = request.query_params.get("state")
     code = request.query_params.get("code")
 
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRET_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI
-    )
+    flow = oauth_flow()
     flow.fetch_token(code=code)
 
     creds = flow.credentials
-    user_tokens[state] = creds.to_json()
+    store_token(state, creds.to_json())
+    client_pool.invalidate(state)
+
+    if watch_channels.enabled:
+        try:
+            await watch_channels.register(get_calendar_service(state))
+        except Exception as e:
+            logger.warning("Could not open watch channel for %s: %s", state, e)
 
     streamlit_url = f"http://localhost:8501/?user_id={state}"
     return RedirectResponse(streamlit_url)
@@ -79,8 +315,11 @@ async def link_session(request: dict):
     
     if user_id in user_tokens:
         # Copy the user's credentials to the session_id
-        user_tokens[session_id] = user_tokens[user_id]
-        print(f"[DEBUG] Linked session {session_id} with user {user_id}")
+        store_token(session_id, user_tokens[user_id])
+        if user_id in user_preferences:
+            user_preferences[session_id] = user_preferences[user_id]
+            client_pool.invalidate(session_id)
+        logger.debug("Linked session %s with user %s", session_id, user_id)
         return {"success": True, "message": "Session linked successfully"}
     else:
         return {"success": False, "message": "User not authenticated"}
@@ -96,22 +335,105 @@ async def auth_status(session_id: str = None):
         return {"authenticated": True, "available_users": list(user_tokens.keys())}
     
     return {"authenticated": False}
+
+@app.get("/calendar/events")
+async def list_events(user_id: str, time_min: Optional[datetime] = None, time_max: Optional[datetime] = None,
+                      limit: Optional[int] = Query(None, ge=1)):
+    """
+    Events in [time_min, time_max) (default: the next EVENTS_DEFAULT_WINDOW_DAYS days) as
+    NDJSON, one event per line. Google pages are fetched lazily as the client reads.
+    Malformed times or a limit below 1 are rejected with a 422 before anything streams.
+    """
     if user_id not in user_tokens:
         return {"error": "User not authorized. Go to /auth to connect."}
 
-    creds = Credentials.from_authorized_user_info(
-        json.loads(user_tokens[user_id]), scopes=SCOPES)
-    service = build('calendar', 'v3', credentials=creds)
+    calendar_service = get_calendar_service(user_id)
+    start = time_min or datetime.now(ZoneInfo(calendar_service.timezone))
+    end = time_max or start + timedelta(days=EVENTS_DEFAULT_WINDOW_DAYS)
+
+    async def ndjson():
+        try:
+            async for event in calendar_service.iter_events(start, end, limit=limit):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
-    events_result = service.events().list(
-        calendarId='primary',
-        maxResults=5,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
+@app.post("/calendar/watch")
+async def watch_calendar(request: dict):
+    """Open (or replace) a push-notification channel for a user's calendar"""
+    user_id = request.get("user_id")
+    if user_id not in user_tokens:
+        return {"error": "User not authorized."}
+    if not watch_channels.enabled:
+        return {"error": "Push notifications are not configured (set CALENDAR_WEBHOOK_URL)."}
 
-    events = events_result.get('items', [])
-    return {"events": events}
+    try:
+        channel = await watch_channels.register(get_calendar_service(user_id))
+    except Exception as e:
+        return {"error": str(e)}
+    return {"channel_id": channel.channel_id, "expires_at": channel.expires_at}
+
+@app.post("/calendar/notifications")
+async def calendar_notifications(request: Request):
+    """Receiver for Google events.watch pings; refreshes cached data for that calendar"""
+    channel = watch_channels.lookup(
+        request.headers.get("X-Goog-Channel-ID"),
+        request.headers.get("X-Goog-Channel-Token"),
+    )
+    # Always answer 2xx, otherwise Google keeps retrying the delivery
+    if channel is None:
+        return Response(status_code=204)
+
+    watch_channels.notifications += 1
+    if request.headers.get("X-Goog-Resource-State") == "sync":
+        # Handshake sent when the channel is created, nothing changed yet
+        return Response(status_code=204)
+
+    if channel.user_id in user_tokens:
+        calendar_service = get_calendar_service(channel.user_id)
+        task = asyncio.create_task(refresh_calendar(calendar_service))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    return Response(status_code=204)
+
+async def refresh_calendar(calendar_service: CalendarService):
+    try:
+        await calendar_service.refresh_after_change()
+    except Exception as e:
+        logger.warning("Refresh after notification failed: %s", e)
+
+class PreferencesRequest(BaseModel):
+    user_id: str
+    timezone: Optional[str] = None
+    work_start: Optional[str] = None
+    work_end: Optional[str] = None
+    working_days: Optional[List[int]] = None
+    buffer_before_minutes: Optional[int] = None
+    buffer_after_minutes: Optional[int] = None
+    min_notice_minutes: Optional[int] = None
+    granularity_minutes: Optional[int] = None
+
+@app.get("/calendar/preferences")
+async def get_preferences(user_id: str):
+    return load_preferences(user_id).to_dict()
+
+@app.post("/calendar/preferences")
+async def update_preferences(data: PreferencesRequest):
+    if data.user_id not in user_tokens:
+        return {"error": "User not authorized."}
+
+    # Only the fields sent are changed
+    changes = {k: v for k, v in data.dict(exclude={"user_id"}).items() if v is not None}
+    try:
+        preferences = SchedulingPreferences.from_dict({**load_preferences(data.user_id).to_dict(), **changes})
+    except ValueError as e:
+        return {"error": str(e)}
+    user_preferences[data.user_id] = preferences.to_dict()
+    # The pooled client was built with the old preferences
+    client_pool.invalidate(data.user_id)
+    return preferences.to_dict()
 
 class BookingRequest(BaseModel):
     user_id: str
@@ -120,130 +442,152 @@ class BookingRequest(BaseModel):
     start_time: str
     duration_minutes: int = 60
     description: str = ""
+    # Resending a booking with the same key returns the original event instead of a duplicate
+    idempotency_key: Optional[str] = None
+    check_conflicts: bool = True
 
 @app.post("/calendar/book")
-async def book_event(data: BookingRequest):
+async def book_event(data: BookingRequest, idempotency_key: Optional[str] = Header(None)):
     if data.user_id not in user_tokens:
         return {"error": "User not authorized."}
 
-    creds = Credentials.from_authorized_user_info(
-        json.loads(user_tokens[data.user_id]), scopes=SCOPES)
-    calendar_service = CalendarService(creds)
+    calendar_service = get_calendar_service(data.user_id)
 
     result = await calendar_service.book_appointment(
         date=data.date,
         start_time=data.start_time,
         duration_minutes=data.duration_minutes,
         title=data.title,
-        description=data.description
+        description=data.description,
+        idempotency_key=data.idempotency_key or idempotency_key,
+        check_conflicts=data.check_conflicts
     )
+    drop_client_if_revoked(data.user_id, result)
     return result
 
-def parse_datetime_from_message(message: str) -> Optional[datetime]:
-    """Enhanced datetime parsing function with manual parsing as primary method"""
+class AvailabilityRequest(BaseModel):
+    user_id: str
+    start_date: str
+    end_date: str
+    duration_minutes: int = 60
+    # Default to the user's saved working hours
+    work_start: Optional[str] = None
+    work_end: Optional[str] = None
+    limit: int = 20
+
+@app.post("/calendar/availability")
+async def availability(data: AvailabilityRequest):
+    if data.user_id not in user_tokens:
+        return {"error": "User not authorized."}
+
+    calendar_service = get_calendar_service(data.user_id)
     try:
-        print(f"[DEBUG] Original message: '{message}'")
-        
-        # First try: Simple dateparser with original message
-        try:
-            parsed_datetime = dateparser.parse(message, settings={'DATE_ORDER': 'MDY'})
-            if parsed_datetime:
-                print(f"[DEBUG] Dateparser success with original: {parsed_datetime}")
-                return parsed_datetime
-        except:
-            pass
-        
-        # Second try: Manual parsing with regex patterns
-        patterns = [
-            # "next friday at 3 pm"
-            r'next\s+(\w+day)\s+at\s+(\d{1,2})\s*(am|pm|AM|PM)',
-            # "friday at 3 pm" 
-            r'(\w+day)\s+at\s+(\d{1,2})\s*(am|pm|AM|PM)',
-            # "next friday 3 pm"
-            r'next\s+(\w+day)\s+(\d{1,2})\s*(am|pm|AM|PM)',
-            # "friday 3 pm"
-            r'(\w+day)\s+(\d{1,2})\s*(am|pm|AM|PM)',
-            # "tomorrow at 3 pm"
-            r'(tomorrow)\s+at\s+(\d{1,2})\s*(am|pm|AM|PM)',
-            # "tomorrow 3 pm"
-            r'(tomorrow)\s+(\d{1,2})\s*(am|pm|AM|PM)',
-        ]
-        
-        for i, pattern in enumerate(patterns):
-            match = re.search(pattern, message, re.IGNORECASE)
-            if match:
-                groups = match.groups()
-                print(f"[DEBUG] Pattern {i+1} matched: {groups}")
-                
-                if len(groups) >= 3:
-                    day_part = groups[0].lower()
-                    hour = int(groups[1])
-                    ampm = groups[2].upper()
-                    
-                    print(f"[DEBUG] Extracted - Day: {day_part}, Hour: {hour}, AM/PM: {ampm}")
-                    
-                    # Convert to 24-hour format
-                    if ampm == 'PM' and hour != 12:
-                        hour += 12
-                    elif ampm == 'AM' and hour == 12:
-                        hour = 0
-                    
-                    # Calculate the target date
-                    now = datetime.now()
-                    target_date = None
-                    
-                    if day_part == 'tomorrow':
-                        target_date = now + timedelta(days=1)
-                    else:
-                        # Handle weekday names
-                        weekdays = {
-                            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-                            'friday': 4, 'saturday': 5, 'sunday': 6
-                        }
-                        
-                        if day_part in weekdays:
-                            target_weekday = weekdays[day_part]
-                            current_weekday = now.weekday()
-                            
-                            # Calculate days until target weekday
-                            days_ahead = target_weekday - current_weekday
-                            if days_ahead <= 0:  # Target day already happened this week
-                                days_ahead += 7
-                            
-                            target_date = now + timedelta(days=days_ahead)
-                    
-                    if target_date:
-                        # Combine date and time
-                        result = target_date.replace(hour=hour, minute=0, second=0, microsecond=0)
-                        print(f"[DEBUG] Manual parsing result: {result}")
-                        return result
-        
-        # Third try: Clean message and use dateparser
-        cleaned = re.sub(r'\b(book|schedule|meeting|appointment|call|session)\b', '', message, flags=re.IGNORECASE)
-        cleaned = cleaned.strip()
-        
-        if cleaned != message:
-            print(f"[DEBUG] Trying cleaned message: '{cleaned}'")
-            try:
-                parsed_datetime = dateparser.parse(cleaned, settings={'DATE_ORDER': 'MDY'})
-                if parsed_datetime:
-                    print(f"[DEBUG] Dateparser success with cleaned: {parsed_datetime}")
-                    return parsed_datetime
-            except:
-                pass
-        
-        print("[DEBUG] All parsing attempts failed")
-        return None
-        
+        slots = await calendar_service.find_available_slots_range(
+            start_date=data.start_date,
+            end_date=data.end_date,
+            duration_minutes=data.duration_minutes,
+            work_start=data.work_start,
+            work_end=data.work_end,
+            limit=data.limit
+        )
+    except GoogleUnavailable as e:
+        return unavailable(e)
     except Exception as e:
-        print(f"[DEBUG] Error in parse_datetime_from_message: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+        return {"error": str(e)}
+    return {"slots": slots}
+
+class TeamAvailabilityRequest(BaseModel):
+    user_id: str
+    calendar_ids: List[str]
+    start_date: str
+    end_date: str
+    duration_minutes: int = 60
+    work_start: Optional[str] = None
+    work_end: Optional[str] = None
+    min_attendees: Optional[int] = None
+    limit: int = 20
+
+@app.post("/calendar/team-availability")
+async def team_availability(data: TeamAvailabilityRequest):
+    if data.user_id not in user_tokens:
+        return {"error": "User not authorized."}
+
+    calendar_service = get_calendar_service(data.user_id)
+    try:
+        result = await calendar_service.find_team_availability(
+            calendar_ids=data.calendar_ids,
+            start_date=data.start_date,
+            end_date=data.end_date,
+            duration_minutes=data.duration_minutes,
+            work_start=data.work_start,
+            work_end=data.work_end,
+            min_attendees=data.min_attendees,
+            limit=data.limit
+        )
+    except GoogleUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        return {"error": str(e)}
+    return result
+
+class BulkBookingRequest(BaseModel):
+    bookings: List[BookingRequest]
+    # For bookings that don't set check_conflicts themselves
+    check_conflicts: bool = False
+
+@app.post("/calendar/book/bulk")
+async def book_events_bulk(data: BulkBookingRequest):
+    """Book many events using Google batch requests; one result per booking, in order"""
+    results = [None] * len(data.bookings)
+    by_user = {}
+    for i, booking in enumerate(data.bookings):
+        by_user.setdefault(booking.user_id, []).append(i)
+
+    for user_id, indexes in by_user.items():
+        if user_id not in user_tokens:
+            for i in indexes:
+                results[i] = {"success": False, "error": "User not authorized."}
+            continue
+
+        calendar_service = get_calendar_service(user_id)
+        user_results = await calendar_service.book_appointments_bulk(
+            # Unset fields are left out, so a booking only overrides check_conflicts when it sets it
+            [data.bookings[i].dict(exclude={"user_id"}, exclude_unset=True) for i in indexes],
+            check_conflicts=data.check_conflicts
+        )
+        for i, result in zip(indexes, user_results):
+            results[i] = result
+
+    return {
+        "results": results,
+        "booked": sum(1 for result in results if result.get("success")),
+        "failed": sum(1 for result in results if not result.get("success")),
+    }
+
+# Set by /chat/stream; handlers report progress through it while they work
+chat_progress: ContextVar[Optional[asyncio.Queue]] = ContextVar("chat_progress", default=None)
+
+def report_progress(stage: str, message: str):
+    queue = chat_progress.get()
+    if queue is not None:
+        queue.put_nowait({"stage": stage, "message": message})
+
+async def parse_datetime_from_message(message: str) -> Optional[datetime]:
+    """Datetime in a chat message: precompiled fast path first, dateparser (in a worker process) as a fallback"""
+    start = time.perf_counter()
+    parsed_datetime = await parse_datetime_async(message)
+    datetime_parse_seconds.labels("parsed" if parsed_datetime else "none").observe(time.perf_counter() - start)
+    logger.debug("Parsed %r -> %s", message, parsed_datetime)
+    if parsed_datetime:
+        report_progress("parsed_time", f"Understood {parsed_datetime.strftime('%A, %B %d at %I:%M %p')}")
+    return parsed_datetime
 
 class ChatMessage(BaseModel):
     message: str
     session_id: str
+    # Set by clients that may resend a message (e.g. /chat after a broken /chat/stream):
+    # a repeat gets the first reply instead of being handled twice
+    message_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -251,142 +595,522 @@ class ChatResponse(BaseModel):
     suggestions: list = []
     booking_confirmed: bool = False
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(chat_message: ChatMessage):
+def resolve_chat_user(session_id: str) -> Optional[str]:
+    """Token key for a chat session: its own, else the most recently used one"""
+    if session_id in user_tokens:
+        return session_id
+    # This handles the case where user authenticated but session_id changed
+    if user_tokens:
+        return list(user_tokens.keys())[-1]
+    return None
+
+def not_authenticated(session_id: str) -> ChatResponse:
+    return ChatResponse(
+        response="❌ You need to authenticate first. Please go to /auth to connect your Google Calendar.",
+        session_id=session_id,
+        suggestions=["Go to /auth"]
+    )
+
+def slot_taken(
+    session_id: str, session: ChatSession, heading: str, title: str, day: str, alternatives: List[dict]
+) -> ChatResponse:
+    """A busy time, with its nearest free alternatives as one-click suggestions"""
+    # "No, cancel" only means something while a proposal is waiting; without one it would cancel an event
+    way_out = "No, cancel" if session.booking_pending else "Show my calendar"
+    if not alternatives:
+        return ChatResponse(
+            response=f"{heading} I couldn't find a free slot near it. What other time works?",
+            session_id=session_id,
+            suggestions=[f"Am I free on {day}?", way_out]
+        )
+    lines = [
+        f"• {datetime.strptime(slot['date'] + ' ' + slot['start_time'], '%Y-%m-%d %H:%M').strftime('%A, %B %d at %I:%M %p')}"
+        for slot in alternatives
+    ]
+    return ChatResponse(
+        response=f"{heading} The nearest free times are:\n" + "\n".join(lines) + "\n\nPick one, or tell me another time.",
+        session_id=session_id,
+        suggestions=[f"Book {title.lower()} on {slot['date']} at {slot['start_time']}" for slot in alternatives]
+                    + [way_out]
+    )
+
+UNAVAILABLE_HEADINGS = {
+    "too_soon": "⛔ {when} is too soon to book.",
+    "outside_hours": "⛔ {when} is outside your working hours.",
+    "busy": "⛔ You're busy {when}.",
+}
+
+def unavailable_heading(when: datetime, reason: Optional[str]) -> str:
+    """First line of a reply to a time suggest_slots turned down"""
+    heading = UNAVAILABLE_HEADINGS.get(reason, UNAVAILABLE_HEADINGS["busy"])
+    return heading.format(when=when.strftime('%A, %B %d at %I:%M %p'))
+
+async def nearest_free(user_key: str, start: datetime, duration_minutes: int) -> Optional[dict]:
+    """suggest_slots for a chat; None when the calendar can't be checked right now"""
     try:
-        session_id = chat_message.session_id
-        message = chat_message.message.lower()
+        return await get_calendar_service(user_key).suggest_slots(start, duration_minutes, CHAT_ALTERNATIVES)
+    except Exception as e:
+        logger.warning("Slot check failed: %s", e)
+        return None
+
+async def handle_book(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    parsed_datetime = await parse_datetime_from_message(message)
+
+    if not parsed_datetime:
+        session.awaiting_time = True
+        return ChatResponse(
+            response="🕒 I couldn't understand the date/time. Try phrases like:\n• 'Book meeting next Friday at 3 PM'\n• 'Schedule call Tuesday at 11 AM'\n• 'Meeting tomorrow at 2 PM'",
+            session_id=session_id,
+            suggestions=["Next Monday 2 PM", "Tomorrow 10 AM", "Friday 3 PM"]
+        )
+
+    # Extract meeting title if possible, keeping the one being rescheduled
+    pending = session.booking_pending
+    if pending and parse_date(message) is None and mentions_time(message):
+        # "Make it 4pm instead" moves the proposed meeting, it doesn't mean today
+        parsed_datetime = datetime.combine(datetime.strptime(pending.date, "%Y-%m-%d").date(), parsed_datetime.time())
+
+    date_str = parsed_datetime.strftime("%Y-%m-%d")
+    time_str = parsed_datetime.strftime("%H:%M")
+    title = pending.title if pending else "Meeting"
+    if "meeting" in message:
+        title = "Meeting"
+    elif "call" in message:
+        title = "Call"
+    elif "appointment" in message:
+        title = "Appointment"
+
+    # Don't propose a time that can't be booked; offer the nearest free ones instead
+    user_key = resolve_chat_user(session_id)
+    if user_key:
+        report_progress("checking_availability", "Checking your calendar")
+        check = await nearest_free(user_key, parsed_datetime, CHAT_MEETING_MINUTES)
+        # If we can't tell, propose it anyway: booking checks again and Google has the final word
+        if check is not None and not check["free"]:
+            session.awaiting_time = True
+            return slot_taken(
+                session_id, session, unavailable_heading(parsed_datetime, check.get("reason")),
+                title, date_str, check["alternatives"]
+            )
+
+    session.cancel_pending = None
+    session.booking_pending = PendingBooking(
+        # New for every proposal, so re-booking a cancelled slot isn't mistaken for a retry
+        booking_id=uuid.uuid4().hex,
+        title=title,
+        date=date_str,
+        start_time=time_str,
+        duration_minutes=CHAT_MEETING_MINUTES,
+        description="Scheduled via AI assistant"
+    )
+    session.awaiting_time = False
+
+    # Format the confirmation message nicely
+    formatted_date = parsed_datetime.strftime("%A, %B %d, %Y")
+    formatted_time = parsed_datetime.strftime("%I:%M %p")
 
-        print("[DEBUG] Received message:", message)
-
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = {
-                "history": [],
-                "booking_pending": None,
-                "booking_confirmed": False
-            }
-
-        session = chat_sessions[session_id]
-        print("[DEBUG] Current session:", session)
-
-        if "book" in message or "schedule" in message:
-            # Use the enhanced parsing function
-            parsed_datetime = parse_datetime_from_message(message)
-            print("[DEBUG] Parsed datetime:", parsed_datetime)
-
-            if parsed_datetime:
-                date_str = parsed_datetime.strftime("%Y-%m-%d")
-                time_str = parsed_datetime.strftime("%H:%M")
-                
-                # Extract meeting title if possible
-                title = "Meeting"
-                if "meeting" in message:
-                    title = "Meeting"
-                elif "call" in message:
-                    title = "Call"
-                elif "appointment" in message:
-                    title = "Appointment"
-                
-                session["booking_pending"] = {
-                    "title": title,
-                    "date": date_str,
-                    "start_time": time_str,
-                    "duration_minutes": 45,
-                    "description": "Scheduled via AI assistant"
-                }
-                
-                # Format the confirmation message nicely
-                formatted_date = parsed_datetime.strftime("%A, %B %d, %Y")
-                formatted_time = parsed_datetime.strftime("%I:%M %p")
-                
-                return ChatResponse(
-                    response=f"📅 Should I confirm the {title.lower()} for {formatted_date} at {formatted_time}?",
-                    session_id=session_id,
-                    suggestions=["Yes, confirm it", "No, cancel", "Change time"],
-                    booking_confirmed=False
-                )
-            else:
-                return ChatResponse(
-                    response="🕒 I couldn't understand the date/time. Try phrases like:\n• 'Book meeting next Friday at 3 PM'\n• 'Schedule call Tuesday at 11 AM'\n• 'Meeting tomorrow at 2 PM'",
-                    session_id=session_id,
-                    suggestions=["Next Monday 2 PM", "Tomorrow 10 AM", "Friday 3 PM"]
-                )
-
-        if (message in ["yes", "confirm", "yes, confirm it"] or "yes" in message) and session.get("booking_pending"):
-            booking = session["booking_pending"]
-            print("[DEBUG] Confirming booking:", booking)
-            print(f"[DEBUG] Session ID: {session_id}")
-            print(f"[DEBUG] Available user tokens: {list(user_tokens.keys())}")
-
-            # Check if user is authenticated - try session_id first, then check all tokens
-            user_creds = None
-            user_key = None
-            
-            if session_id in user_tokens:
-                user_creds = user_tokens[session_id]
-                user_key = session_id
-                print(f"[DEBUG] Found credentials for session_id: {session_id}")
-            else:
-                # If session_id doesn't match, try to find any valid user token
-                # This handles the case where user authenticated but session_id changed
-                if user_tokens:
-                    user_key = list(user_tokens.keys())[-1]  # Use the most recent authentication
-                    user_creds = user_tokens[user_key]
-                    print(f"[DEBUG] Using most recent authentication: {user_key}")
-                else:
-                    print("[DEBUG] No user tokens available")
-
-            if not user_creds:
-                return ChatResponse(
-                    response="❌ You need to authenticate first. Please go to /auth to connect your Google Calendar.",
-                    session_id=session_id,
-                    suggestions=["Go to /auth"]
-                )
-
-            try:
-                creds = Credentials.from_authorized_user_info(json.loads(user_creds), scopes=SCOPES)
-                calendar_service = CalendarService(creds)
-                result = await calendar_service.book_appointment(**booking)
-
-                # Clear the pending booking
-                session["booking_pending"] = None
-                session["booking_confirmed"] = True
-                
-                return ChatResponse(
-                    response=f"✅ {booking['title']} confirmed for {booking['date']} at {booking['start_time']}!\n\n[View in Google Calendar]({result.get('calendar_link', '')})",
-                    session_id=session_id,
-                    booking_confirmed=True,
-                    suggestions=["Book another meeting", "Show my calendar"]
-                )
-            except Exception as e:
-                print(f"[DEBUG] Booking error: {e}")
-                return ChatResponse(
-                    response=f"❌ Sorry, there was an error booking your appointment: {str(e)}",
-                    session_id=session_id,
-                    suggestions=["Try again", "Check calendar"]
-                )
-
-        if message in ["no", "cancel", "no, cancel"] and session.get("booking_pending"):
-            session["booking_pending"] = None
+    return ChatResponse(
+        response=f"📅 Should I confirm the {title.lower()} for {formatted_date} at {formatted_time}?",
+        session_id=session_id,
+        suggestions=["Yes, confirm it", "No, cancel", "Change time"],
+        booking_confirmed=False
+    )
+
+def chat_booking_key(session_id: str, booking: PendingBooking) -> str:
+    digest = hashlib.sha256(json.dumps(booking.to_dict(), sort_keys=True).encode()).hexdigest()
+    return f"chat:{session_id}:{digest}"
+
+async def handle_confirm(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    if session.cancel_pending is not None:
+        return await confirm_cancellation(session_id, session)
+
+    booking = session.booking_pending
+    logger.debug("Confirming booking %s for session %s", booking.booking_id, session_id)
+
+    user_key = resolve_chat_user(session_id)
+    if not user_key:
+        return not_authenticated(session_id)
+
+    try:
+        calendar_service = get_calendar_service(user_key)
+        report_progress("booking", "Booking it in Google Calendar")
+        result = await calendar_service.book_appointment(
+            date=booking.date,
+            start_time=booking.start_time,
+            duration_minutes=booking.duration_minutes,
+            title=booking.title,
+            description=booking.description,
+            # A repeated "yes" for the same proposal must not book it twice
+            idempotency_key=chat_booking_key(session_id, booking)
+        )
+        drop_client_if_revoked(user_key, result)
+        if result.get("conflict"):
+            session.awaiting_time = True
+            start = datetime.strptime(f"{booking.date} {booking.start_time}", "%Y-%m-%d %H:%M")
+            check = await nearest_free(user_key, start, booking.duration_minutes)
+            return slot_taken(
+                session_id, session, f"⛔ {booking.date} at {booking.start_time} is no longer free.",
+                booking.title, booking.date, check["alternatives"] if check else []
+            )
+        if not result.get("success"):
+            # Keep the pending booking so "yes" again retries it
             return ChatResponse(
-                response="❌ Booking cancelled. Let me know if you'd like to schedule something else!",
+                response=f"❌ Sorry, I couldn't book that: {result.get('error')}",
                 session_id=session_id,
-                suggestions=["Book a meeting", "Show my calendar"]
+                suggestions=["Yes, try again", "No, cancel"] if result.get("retryable") else ["Change time", "No, cancel"]
             )
+        report_progress("booked", "Booked")
+
+        # Clear the pending booking
+        session.booking_pending = None
+        session.booking_confirmed = True
 
-        # Default response
         return ChatResponse(
-            response="👋 I'm here to help you book appointments! Just tell me when you'd like to schedule something.\n\nExamples:\n• 'Book meeting next Friday at 3 PM'\n• 'Schedule call Tuesday at 11 AM'",
+            response=f"✅ {booking.title} confirmed for {booking.date} at {booking.start_time}!\n\n[View in Google Calendar]({result.get('calendar_link', '')})",
             session_id=session_id,
-            suggestions=["Book a meeting", "Show my calendar", "Next Monday 2 PM"]
+            booking_confirmed=True,
+            suggestions=["Book another meeting", "Show my calendar"]
         )
-        
     except Exception as e:
-        print(f"[ERROR] Exception in chat endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Booking from chat failed")
+        return ChatResponse(
+            response=f"❌ Sorry, there was an error booking your appointment: {str(e)}",
+            session_id=session_id,
+            suggestions=["Try again", "Check calendar"]
+        )
+
+async def handle_decline(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    cancellation = session.cancel_pending
+    session.cancel_pending = None
+    if cancellation is not None:
+        return ChatResponse(
+            response=f"👍 Okay, I'll keep '{cancellation.title}' on {cancellation.when}.",
+            session_id=session_id,
+            suggestions=["Book a meeting", "Show my calendar"]
+        )
+
+    session.booking_pending = None
+    session.awaiting_time = False
+    return ChatResponse(
+        response="❌ Booking cancelled. Let me know if you'd like to schedule something else!",
+        session_id=session_id,
+        suggestions=["Book a meeting", "Show my calendar"]
+    )
+
+# "move my meeting on friday at 3pm | to | 4pm": the first "to" separates the event from its new time
+RESCHEDULE_TO_RE = re.compile(r'\bto\b')
+
+def find_event_at(events: List[dict], when: datetime, same_day: bool = True) -> Optional[dict]:
+    """The first event starting at `when`; with same_day=False, at that clock time on any day"""
+    wanted = when.strftime("%Y-%m-%dT%H:%M") if same_day else when.strftime("T%H:%M")
+    for event in events:
+        start = event["start"].get("dateTime", "")[:16]
+        if start == wanted or (not same_day and start.endswith(wanted)):
+            return event
+    return None
+
+async def handle_reschedule(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    if session.booking_pending is None:
+        return await move_existing_event(session_id, session, message)
+
+    # Moving the meeting we just proposed; "move it to friday 4pm" carries the new time already
+    if await parse_datetime_from_message(message):
+        return await handle_book(session_id, session, message)
+
+    session.awaiting_time = True
+    return ChatResponse(
+        response="🕒 Sure, what time would work better?",
+        session_id=session_id,
+        suggestions=["Tomorrow 10 AM", "Next Monday 2 PM", "Friday 3 PM"]
+    )
+
+async def move_existing_event(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    """"Reschedule my meeting on friday at 3pm to 4pm": move that event, never book a new one"""
+    user_key = resolve_chat_user(session_id)
+    if not user_key:
+        return not_authenticated(session_id)
+
+    calendar_service = get_calendar_service(user_key)
+    parts = RESCHEDULE_TO_RE.split(message, maxsplit=1)
+    source_text, target_text = parts if len(parts) == 2 else (message, "")
+    source = await parse_datetime_from_message(source_text) if target_text else None
+    target = await parse_datetime_from_message(target_text) if target_text else None
+    report_progress("fetching_events", "Looking up your upcoming events")
+    upcoming = await calendar_service.get_upcoming_events(limit=50)
+    event = find_event_at(upcoming, source, same_day=parse_date(source_text) is not None) if source else None
+
+    if event is None or target is None:
+        lines = [f"• {e.get('summary', 'No Title')} — {e['start'].get('dateTime', e['start'].get('date'))}" for e in upcoming[:5]]
+        return ChatResponse(
+            response="🤔 Which event should I move, and to when? For example: \"move my meeting on Friday at 3pm to 4pm\"."
+                     + ("\n\n" + "\n".join(lines) if lines else ""),
+            session_id=session_id,
+            suggestions=["Show my calendar"]
+        )
+
+    tz = ZoneInfo(calendar_service.timezone)
+    old_start = datetime.fromisoformat(event["start"]["dateTime"]).astimezone(tz)
+    old_end = datetime.fromisoformat(event["end"]["dateTime"]).astimezone(tz)
+    if parse_date(target_text) is None:
+        # "...to 4pm" keeps the event's day
+        target = datetime.combine(old_start.date(), target.time())
+    new_start = target.replace(tzinfo=tz)
+    new_end = new_start + (old_end - old_start)
+    title = event.get("summary", "No Title")
+
+    report_progress("checking_availability", "Checking your calendar")
+    check = await nearest_free(user_key, new_start, int((new_end - new_start).total_seconds() // 60))
+    # Overlapping its own old slot isn't a conflict
+    overlaps_itself = new_start < old_end and old_start < new_end
+    if check is not None and not check["free"] and not (overlaps_itself and check.get("reason") == "busy"):
+        alternatives = check["alternatives"]
+        lines = [f"• {slot['date']} at {slot['start_time']}" for slot in alternatives]
+        return ChatResponse(
+            response=f"{unavailable_heading(new_start, check.get('reason'))} I left '{title}' where it is."
+                     + ("\n\nFree nearby:\n" + "\n".join(lines) if lines else ""),
+            session_id=session_id,
+            suggestions=[
+                f"Reschedule {old_start.strftime('%Y-%m-%d at %H:%M')} to {slot['date']} at {slot['start_time']}"
+                for slot in alternatives
+            ] + ["Show my calendar"]
+        )
+
+    report_progress("moving", "Moving it in Google Calendar")
+    result = await calendar_service.move_event(event["id"], new_start, new_end)
+    if not result.get("success"):
+        return ChatResponse(
+            response=f"❌ Sorry, I couldn't move '{title}': {result.get('error')}",
+            session_id=session_id,
+            suggestions=["Show my calendar"]
+        )
+    return ChatResponse(
+        response=f"🔁 Moved '{title}' from {old_start.strftime('%A, %B %d at %I:%M %p')} "
+                 f"to {new_start.strftime('%A, %B %d at %I:%M %p')}.",
+        session_id=session_id,
+        suggestions=["Show my calendar", "Book a meeting"]
+    )
+
+async def handle_cancel_event(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    user_key = resolve_chat_user(session_id)
+    if not user_key:
+        return not_authenticated(session_id)
+
+    calendar_service = get_calendar_service(user_key)
+    parsed_datetime = await parse_datetime_from_message(message)
+    report_progress("fetching_events", "Looking up your upcoming events")
+    upcoming = await calendar_service.get_upcoming_events(limit=50)
+
+    event = find_event_at(upcoming, parsed_datetime) if parsed_datetime else None
+    if event is not None:
+        # Deleting is not undoable, ask first; "yes" goes through handle_confirm
+        session.booking_pending = None
+        session.cancel_pending = PendingCancellation(
+            event_id=event["id"],
+            title=event.get("summary", "No Title"),
+            when=parsed_datetime.strftime("%A, %B %d at %I:%M %p")
+        )
+        return ChatResponse(
+            response=f"🗑️ Should I cancel '{session.cancel_pending.title}' on {session.cancel_pending.when}?",
+            session_id=session_id,
+            suggestions=["Yes, cancel it", "No, keep it"]
+        )
+
+    lines = [f"• {e.get('summary', 'No Title')} — {e['start'].get('dateTime', e['start'].get('date'))}" for e in upcoming[:5]]
+    return ChatResponse(
+        response="🤔 Which event should I cancel? Tell me its date and time." + ("\n\n" + "\n".join(lines) if lines else ""),
+        session_id=session_id,
+        suggestions=["Show my calendar"]
+    )
+
+async def confirm_cancellation(session_id: str, session: ChatSession) -> ChatResponse:
+    cancellation = session.cancel_pending
+    user_key = resolve_chat_user(session_id)
+    if not user_key:
+        return not_authenticated(session_id)
+
+    report_progress("cancelling", "Cancelling it in Google Calendar")
+    result = await get_calendar_service(user_key).cancel_event(cancellation.event_id)
+    if not result.get("success"):
+        # Keep it pending so "yes" again retries
+        return ChatResponse(
+            response=f"❌ Sorry, I couldn't cancel that event: {result.get('error')}",
+            session_id=session_id,
+            suggestions=["Yes, try again", "No, keep it"]
+        )
+
+    session.cancel_pending = None
+    return ChatResponse(
+        response=f"🗑️ Cancelled '{cancellation.title}' on {cancellation.when}.",
+        session_id=session_id,
+        suggestions=["Book a meeting", "Show my calendar"]
+    )
+
+async def handle_availability(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    user_key = resolve_chat_user(session_id)
+    if not user_key:
+        return not_authenticated(session_id)
+
+    parsed_date = parse_date(message)
+    if parsed_date is None:
+        parsed_datetime = await parse_datetime_from_message(message)
+        parsed_date = parsed_datetime.date() if parsed_datetime else datetime.now().date()
+    day = parsed_date.strftime("%Y-%m-%d")
+    report_progress("checking_availability", f"Checking availability for {day}")
+    availability = await get_calendar_service(user_key).get_available_slots(day, duration_minutes=CHAT_MEETING_MINUTES)
+    slots = availability["slots"]
+
+    if availability["status"] == "unavailable":
+        return ChatResponse(
+            response=f"⚠️ I can't reach Google Calendar right now, so I can't check {day}. Please try again in a minute.",
+            session_id=session_id,
+            suggestions=[f"Am I free on {day}?"]
+        )
+    # Slots from the last sync are still useful, as long as we say so
+    note = ""
+    if availability["status"] == "stale":
+        as_of = datetime.fromisoformat(availability["as_of"]).strftime("%H:%M")
+        note = f"\n\n⚠️ Google Calendar isn't responding, this is from my last sync at {as_of}."
+
+    if not slots:
+        return ChatResponse(
+            response=f"😕 No free slots on {day}." + note,
+            session_id=session_id,
+            suggestions=["Tomorrow", "Next Monday"]
+        )
+    lines = [f"• {slot['start_time']}–{slot['end_time']}" for slot in slots]
+    return ChatResponse(
+        response=f"🗓️ You're free on {day}:\n" + "\n".join(lines) + note,
+        session_id=session_id,
+        suggestions=[f"Book meeting on {day} at {slot['start_time']}" for slot in slots[:3]]
+    )
+
+async def handle_list_events(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    user_key = resolve_chat_user(session_id)
+    if not user_key:
+        return not_authenticated(session_id)
+
+    report_progress("fetching_events", "Fetching your upcoming events")
+    events = await get_calendar_service(user_key).get_upcoming_events(limit=5)
+    if not events:
+        return ChatResponse(
+            response="📭 You have no upcoming events.",
+            session_id=session_id,
+            suggestions=["Book a meeting"]
+        )
+    lines = [f"• {e.get('summary', 'No Title')} — {e['start'].get('dateTime', e['start'].get('date'))}" for e in events]
+    return ChatResponse(
+        response="📆 Your upcoming events:\n" + "\n".join(lines),
+        session_id=session_id,
+        suggestions=["Book a meeting", "Cancel a meeting"]
+    )
+
+async def handle_default(session_id: str, session: ChatSession, message: str) -> ChatResponse:
+    # A bare time right after we asked for one ("Next Monday 2 PM") continues the booking
+    if session.awaiting_time or session.booking_pending:
+        if await parse_datetime_from_message(message):
+            return await handle_book(session_id, session, message)
+
+    return ChatResponse(
+        response="👋 I'm here to help you book appointments! Just tell me when you'd like to schedule something.\n\nExamples:\n• 'Book meeting next Friday at 3 PM'\n• 'Schedule call Tuesday at 11 AM'",
+        session_id=session_id,
+        suggestions=["Book a meeting", "Show my calendar", "Next Monday 2 PM"]
+    )
+
+CHAT_HANDLERS = {
+    "book": handle_book,
+    "confirm": handle_confirm,
+    "decline": handle_decline,
+    "reschedule": handle_reschedule,
+    "cancel_event": handle_cancel_event,
+    "availability": handle_availability,
+    "list_events": handle_list_events,
+}
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(chat_message: ChatMessage):
+    return await process_chat(chat_message)
+
+@app.post("/chat/stream")
+async def chat_stream(chat_message: ChatMessage):
+    """
+    Same as /chat, as server-sent events: "progress" events while the message is being
+    handled, then one "result" event carrying the ChatResponse.
+    """
+    queue = asyncio.Queue()
+
+    async def events():
+        token = chat_progress.set(queue)
+        try:
+            # The task copies the context, so handlers see the queue
+            task = asyncio.create_task(process_chat(chat_message))
+        finally:
+            chat_progress.reset(token)
+
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({get, task}, return_when=asyncio.FIRST_COMPLETED)
+            if get in done:
+                yield f"event: progress\ndata: {json.dumps(get.result())}\n\n"
+                continue
+            get.cancel()
+            while not queue.empty():
+                yield f"event: progress\ndata: {json.dumps(queue.get_nowait())}\n\n"
+            yield f"event: result\ndata: {json.dumps(task.result().dict())}\n\n"
+            return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Replies by (session_id, message_id); a resend within this window is answered from here
+chat_replies = TTLCache(maxsize=10000, ttl=10 * 60)
+chat_inflight = SingleFlight()
+
+async def process_chat(chat_message: ChatMessage) -> ChatResponse:
+    if not chat_message.message_id:
+        return await handle_chat(chat_message)
+    key = (chat_message.session_id, chat_message.message_id)
+    reply = chat_replies.get(key)
+    if reply is None:
+        # A resend while the first copy is still being handled waits for its reply
+        reply = await chat_inflight.do(key, lambda: handle_chat(chat_message))
+        chat_replies.set(key, reply)
+    return reply
+
+async def handle_chat(chat_message: ChatMessage) -> ChatResponse:
+    try:
+        session_id = chat_message.session_id
+        message = chat_message.message.lower()
+
+        logger.debug("Message from %s: %r", session_id, message)
+
+        session = chat_sessions.get(session_id) or ChatSession()
+        session.record("user", message)
+
+        start = time.perf_counter()
+        intent = chat_router.classify(message, has_pending=session.has_pending, has_time=mentions_time(message))
+        logger.debug("Intent: %s", intent)
+        report_progress("intent", intent or "unknown")
+        handler = CHAT_HANDLERS.get(intent, handle_default)
+        try:
+            response = await handler(session_id, session, message)
+            session.record("assistant", response.response)
+            return response
+        finally:
+            intent_dispatch_seconds.labels(intent or "unknown").observe(time.perf_counter() - start)
+            # Handlers only change the session; it is written back once here, which also
+            # keeps it from going idle
+            chat_sessions[session_id] = session
+
+    except Exception:
+        chat_errors.inc()
+        logger.exception("Chat request failed")
         return ChatResponse(
             response="❌ Sorry, something went wrong. Please try again.",
             session_id=chat_message.session_id,
             suggestions=["Try again"]
-        )
\ No newline at end of file
+        )
+
+startup_seconds.labels("import").set(time.perf_counter() - IMPORT_STARTED)
@@ -0,0 +1,172 @@
+import json
+import random
+import socket
+import time
+from typing import Dict, Optional
+
+import httplib2
+
+# Google answers quota trouble with 429, or 403 plus one of these reasons
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+TRANSPORT_ERRORS = (ConnectionError, TimeoutError, socket.timeout, httplib2.HttpLib2Error)
+
+
+class GoogleUnavailable(Exception):
+    """Google can't be reached right now (circuit open, quota exhausted or retries used up)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GoogleRateLimited(GoogleUnavailable):
+    """Our own token bucket would make the caller wait longer than it is allowed to."""
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return int(status) if status is not None else None
+
+
+def error_reason(error: BaseException) -> Optional[str]:
+    """The `reason` of a googleapiclient HttpError, e.g. "rateLimitExceeded"."""
+    details = getattr(error, 'error_details', None)
+    if isinstance(details, list):
+        for detail in details:
+            if isinstance(detail, dict) and detail.get('reason'):
+                return detail['reason']
+    content = getattr(error, 'content', None)
+    if content:
+        try:
+            errors = json.loads(content).get('error', {}).get('errors') or []
+            return errors[0].get('reason') if errors else None
+        except (ValueError, AttributeError):
+            return None
+    return None
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    status = error_status(error)
+    return status == 429 or (status == 403 and error_reason(error) in RATE_LIMIT_REASONS)
+
+
+def is_server_error(error: BaseException) -> bool:
+    """Failures that say Google (or the network to it) is unhealthy; these trip the breaker."""
+    return error_status(error) in RETRYABLE_STATUSES or isinstance(error, TRANSPORT_ERRORS)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    resp = getattr(error, 'resp', None)
+    value = resp.get('retry-after') if hasattr(resp, 'get') else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket for a single event loop. A caller that finds the bucket empty reserves
+    its token anyway (the level goes negative) and sleeps until it would have refilled,
+    so waiters are served in arrival order without a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """Take a token; returns how long to wait for it. Raises if that exceeds `max_wait`."""
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if max_wait is not None and wait > max_wait:
+            raise GoogleRateLimited("Too many Google Calendar requests, slow down", retry_after=wait)
+        self._tokens -= 1
+        return wait
+
+    def refund(self) -> None:
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+
+class CircuitBreaker:
+    """
+    Stops calling Google for `reset_timeout` seconds after `failure_threshold`
+    consecutive server/transport failures, then lets one probe call through
+    (half-open) to decide whether to close again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise GoogleUnavailable("Google Calendar is temporarily unavailable", retry_after=remaining)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise GoogleUnavailable("Google Calendar is temporarily unavailable", retry_after=1.0)
+            self._probing = True
+
+    def release_probe(self) -> None:
+        """The probe was abandoned (e.g. cancelled) without an answer; let the next call probe instead."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_neutral(self) -> None:
+        """The call finished without telling us anything about Google's health (e.g. a 404)."""
+        if self.state == self.HALF_OPEN:
+            self.record_success()
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips,
+                "rejected": self.rejected}
+
+
+class Backoff:
+    """Exponential backoff with full jitter: attempt n sleeps uniform(0, min(cap, base * 2**n))."""
+
+    def __init__(self, base: float = 0.5, cap: float = 8.0, max_retries: int = 4):
+        self.base = base
+        self.cap = cap
+        self.max_retries = max_retries
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        # Google's own Retry-After wins when it asks for longer
+        return max(delay, retry_after or 0.0)
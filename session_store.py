@@ -0,0 +1,312 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from app_logging import get_logger
+from ttl_cache import TTLCache
+
+logger = get_logger("session_store")
+
+_MISSING = object()
+_DELETED = object()
+
+
+class KeyValueStore(ABC):
+    """
+    Dict-like store for tokens and chat sessions. Values must be JSON-serializable for
+    a backend that leaves the process, like SQLiteStore; MemoryStore holds whatever it
+    is given, so callers that know they have one may keep live objects in it.
+    Callers write a value back after mutating it.
+    """
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        """Keys, least recently used first (MemoryStore counts reads as use, SQLiteStore only writes)."""
+
+    @abstractmethod
+    def expire_idle(self, max_idle_seconds: float) -> int:
+        """Drop entries unused for `max_idle_seconds` (as `keys` counts use); returns how many went."""
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self)}
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.delete(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class MemoryStore(KeyValueStore):
+    """In-process store with LRU size bound and optional idle TTL (single worker only). Reads count as use."""
+
+    def __init__(self, maxsize: int = 10000, idle_ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, last_used), least recently used first
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def _expired(self, last_used: float) -> bool:
+        return self.idle_ttl is not None and time.monotonic() - last_used > self.idle_ttl
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if self._expired(item[1]):
+                del self._data[key]
+                self.evictions += 1
+                return default
+            # A hit keeps the entry: active users' tokens mustn't be the first evicted
+            self._data[key] = (item[0], time.monotonic())
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [key for key, (_, last_used) in self._data.items() if not self._expired(last_used)]
+
+    def expire_idle(self, max_idle_seconds: float) -> int:
+        cutoff = time.monotonic() - max_idle_seconds
+        with self._lock:
+            # Entries are kept in use order, so idle ones are all at the front
+            expired = 0
+            while self._data:
+                key, (_, last_used) = next(iter(self._data.items()))
+                if last_used >= cutoff:
+                    break
+                del self._data[key]
+                expired += 1
+            self.evictions += expired
+            return expired
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "evictions": self.evictions}
+
+
+class SQLiteStore(KeyValueStore):
+    """
+    SQLite (WAL mode) store that several uvicorn workers can share.
+
+    By default every write commits before it returns: a token saved by the worker
+    that handled the login must work on the next request, whichever worker gets it.
+    With `batch_size` > 1 writes are buffered instead and flushed in one transaction
+    once that many are pending, or `flush_interval` after the first one at the latest;
+    only use that for data that may lag behind. Likewise reads only go through a
+    short-lived cache with `read_cache_ttl` > 0: another worker's change (or a new
+    key) is then seen once the cached copy expires, so leave it off for tokens and
+    chat sessions.
+    """
+
+    def __init__(
+        self, path: str, namespace: str, batch_size: int = 1, flush_interval: float = 1.0,
+        read_cache_size: int = 4096, read_cache_ttl: float = 0.0
+    ):
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_updated ON kv (namespace, updated_at)")
+        self._lock = threading.RLock()
+        self._pending: Dict[str, tuple] = {}  # key -> (value or _DELETED, written_at)
+        self._first_pending_at: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._cache = TTLCache(maxsize=read_cache_size, ttl=read_cache_ttl) if read_cache_ttl > 0 else None
+        self.flushes = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return default if pending[0] is _DELETED else pending[0]
+
+        if self._cache is not None:
+            cached = self._cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                return default if cached is _DELETED else cached
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+        value = json.loads(row[0]) if row else _DELETED
+        if self._cache is not None:
+            self._cache.set(key, value)
+        return default if value is _DELETED else value
+
+    def _write(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._pending[key] = (value, time.time())
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            if self._cache is not None:
+                self._cache.pop(key)
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._first_pending_at >= self.flush_interval):
+                self.flush()
+            elif self._timer is None:
+                # Otherwise a lone write would wait for the next one (or maintenance) to be committed
+                self._timer = threading.Timer(self.flush_interval, self._flush_later)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_later(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning("Flushing %s failed: %s", self.namespace, e)
+
+    def set(self, key: str, value: Any) -> None:
+        self._write(key, value)
+
+    def delete(self, key: str) -> None:
+        self._write(key, _DELETED)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            upserts = [
+                (self.namespace, key, json.dumps(value), written_at)
+                for key, (value, written_at) in self._pending.items() if value is not _DELETED
+            ]
+            deletes = [
+                (self.namespace, key)
+                for key, (value, _) in self._pending.items() if value is _DELETED
+            ]
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    upserts,
+                )
+                self._conn.executemany("DELETE FROM kv WHERE namespace = ? AND key = ?", deletes)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._pending.clear()
+            self._first_pending_at = None
+            self.flushes += 1
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(
+                "SELECT key FROM kv WHERE namespace = ? ORDER BY updated_at", (self.namespace,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.flush()
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM kv WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+    def expire_idle(self, max_idle_seconds: float) -> int:
+        with self._lock:
+            self.flush()
+            cursor = self._conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND updated_at < ?",
+                (self.namespace, time.time() - max_idle_seconds),
+            )
+            if self._cache is not None:
+                self._cache.clear()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        stats = {"size": len(self), "pending_writes": len(self._pending), "flushes": self.flushes}
+        if self._cache is not None:
+            stats.update({f"read_cache_{k}": v for k, v in self._cache.stats().items()})
+        return stats
+
+
+def create_store(
+    namespace: str, idle_ttl: Optional[float] = None, maxsize: int = 10000, read_cache_ttl: float = 0.0
+) -> KeyValueStore:
+    """
+    Store chosen by SESSION_STORE ("memory" or "sqlite"); the SQLite file is
+    SESSION_STORE_PATH and is shared by every namespace and worker. `read_cache_ttl`
+    only applies to SQLite; set it just for data another worker may see late.
+    """
+    backend = os.environ.get("SESSION_STORE", "memory")
+    if backend == "sqlite":
+        return SQLiteStore(os.environ.get("SESSION_STORE_PATH", "sessions.db"), namespace, read_cache_ttl=read_cache_ttl)
+    if backend == "memory":
+        return MemoryStore(maxsize=maxsize, idle_ttl=idle_ttl)
+    raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
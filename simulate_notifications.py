@@ -0,0 +1,80 @@
+# === simulate_notifications.py ===
+#
+# Local stand-in for Google's push notifications.
+#
+#   python simulate_notifications.py --user-id <id>
+#       Runs the API in-process, registers a fake watch channel for the user and
+#       posts a "sync" handshake followed by "exists" change pings.
+#
+#   python simulate_notifications.py --url http://localhost:8000 --channel-id <id> --token <token>
+#       Posts the same pings to a running server for an already registered channel.
+
+import argparse
+import time
+import uuid
+
+import requests
+
+
+def notification_headers(channel_id: str, token: str, state: str, number: int) -> dict:
+    return {
+        "X-Goog-Channel-ID": channel_id,
+        "X-Goog-Channel-Token": token,
+        "X-Goog-Resource-ID": "simulated-resource",
+        "X-Goog-Resource-State": state,
+        "X-Goog-Message-Number": str(number),
+    }
+
+
+def post_notifications(post, channel_id: str, token: str, count: int, interval: float):
+    response = post("/calendar/notifications", headers=notification_headers(channel_id, token, "sync", 1))
+    print(f"sync -> {response.status_code}")
+    for i in range(count):
+        time.sleep(interval)
+        response = post("/calendar/notifications", headers=notification_headers(channel_id, token, "exists", i + 2))
+        print(f"exists #{i + 1} -> {response.status_code}")
+
+
+def run_in_process(user_id: str, count: int, interval: float):
+    from fastapi.testclient import TestClient
+
+    import main
+    from watch_channels import WatchChannel
+
+    channel = WatchChannel(
+        channel_id=str(uuid.uuid4()),
+        resource_id="simulated-resource",
+        user_id=user_id,
+        calendar_id="primary",
+        expires_at=time.time() + 3600,
+    )
+    main.watch_channels.add(channel)
+
+    with TestClient(main.app) as client:
+        post_notifications(client.post, channel.channel_id, main.watch_channels.token, count, interval)
+        print(client.get("/cache/stats").json())
+
+
+def run_remote(url: str, channel_id: str, token: str, count: int, interval: float):
+    def post(path, headers):
+        return requests.post(f"{url}{path}", headers=headers, timeout=10)
+
+    post_notifications(post, channel_id, token, count, interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post simulated Google Calendar push notifications")
+    parser.add_argument("--url", help="Base URL of a running API; omit to run the API in-process")
+    parser.add_argument("--user-id", default="simulated-user")
+    parser.add_argument("--channel-id")
+    parser.add_argument("--token")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.url:
+        if not (args.channel_id and args.token):
+            parser.error("--channel-id and --token are required with --url")
+        run_remote(args.url, args.channel_id, args.token, args.count, args.interval)
+    else:
+        run_in_process(args.user_id, args.count, args.interval)
@@ -0,0 +1,197 @@
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from availability import Interval, merge_intervals
+
+ALL_DAYS = (0, 1, 2, 3, 4, 5, 6)  # Monday = 0, like date.weekday()
+
+
+@dataclass(frozen=True)
+class SchedulingPreferences:
+    """A user's booking rules: when they work and how much room meetings need."""
+    timezone: str = "Asia/Kolkata"
+    work_start: str = "09:00"
+    work_end: str = "17:00"
+    working_days: Tuple[int, ...] = ALL_DAYS
+    buffer_before_minutes: int = 0  # free time required before a new meeting
+    buffer_after_minutes: int = 0  # free time required after it
+    min_notice_minutes: int = 0  # how soon from now a meeting may start
+    granularity_minutes: int = 15  # slot starts snap to this grid, in local time
+
+    def __post_init__(self):
+        try:
+            ZoneInfo(self.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone: {self.timezone}")
+        if time.fromisoformat(self.work_start) >= time.fromisoformat(self.work_end):
+            raise ValueError("work_start must be before work_end")
+        if not set(self.working_days) <= set(ALL_DAYS):
+            raise ValueError("working_days must be weekday numbers 0 (Monday) to 6 (Sunday)")
+        if min(self.buffer_before_minutes, self.buffer_after_minutes, self.min_notice_minutes) < 0:
+            raise ValueError("buffers and notice can't be negative")
+        if self.granularity_minutes <= 0:
+            raise ValueError("granularity_minutes must be positive")
+
+    @property
+    def tz(self) -> ZoneInfo:
+        return ZoneInfo(self.timezone)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "SchedulingPreferences":
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in (data or {}).items() if k in known and v is not None}
+        if "working_days" in values:
+            values["working_days"] = tuple(sorted(set(values["working_days"])))
+        return cls(**values)
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["working_days"] = list(self.working_days)
+        return data
+
+
+class BusyTimeline:
+    """
+    Sorted, merged busy intervals kept as parallel start/end lists. Because the
+    intervals are disjoint both lists are sorted, so "is [a, b) free" is one bisect
+    and free gaps in a window start from the first relevant interval, not the top.
+    """
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        merged = merge_intervals(intervals)
+        self._starts = [start for start, _ in merged]
+        self._ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def intervals(self) -> List[Interval]:
+        return list(zip(self._starts, self._ends))
+
+    def add(self, start: datetime, end: datetime) -> None:
+        """Insert a busy interval, merging it with any it overlaps or touches."""
+        i = bisect_left(self._ends, start)
+        j = bisect_right(self._starts, end)
+        if i < j:
+            start = min(start, self._starts[i])
+            end = max(end, self._ends[j - 1])
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        # The only interval that can overlap is the first one ending after `start`
+        i = bisect_right(self._ends, start)
+        return i == len(self._starts) or self._starts[i] >= end
+
+    def free_between(self, start: datetime, end: datetime) -> List[Interval]:
+        """Gaps inside [start, end) not covered by any busy interval."""
+        gaps = []
+        current = start
+        i = bisect_right(self._ends, start)
+        while i < len(self._starts) and self._starts[i] < end:
+            if self._starts[i] > current:
+                gaps.append((current, self._starts[i]))
+            current = max(current, self._ends[i])
+            i += 1
+        if current < end:
+            gaps.append((current, end))
+        return gaps
+
+
+def align_up(moment: datetime, minutes: int, tz: ZoneInfo) -> datetime:
+    """Round up to the next multiple of `minutes` past local midnight."""
+    local = moment.astimezone(tz)
+    # Same-zone subtraction is wall-clock time, so the grid stays put across DST changes
+    offset = local - datetime.combine(local.date(), time.min, tz)
+    remainder = offset % timedelta(minutes=minutes)
+    return local if not remainder else local + (timedelta(minutes=minutes) - remainder)
+
+
+class SlotEngine:
+    """
+    Free slots for one calendar under a user's SchedulingPreferences.
+
+    Buffers are folded into the timeline up front: an event [a, b) blocks
+    [a - buffer_after, b + buffer_before), so every later query is a plain interval
+    lookup.
+    """
+
+    def __init__(self, busy: Iterable[Interval], preferences: Optional[SchedulingPreferences] = None):
+        self.preferences = preferences or SchedulingPreferences()
+        before = timedelta(minutes=self.preferences.buffer_before_minutes)
+        after = timedelta(minutes=self.preferences.buffer_after_minutes)
+        self.timeline = BusyTimeline((start - after, end + before) for start, end in busy)
+
+    def add_busy(self, start: datetime, end: datetime) -> None:
+        self.timeline.add(
+            start - timedelta(minutes=self.preferences.buffer_after_minutes),
+            end + timedelta(minutes=self.preferences.buffer_before_minutes)
+        )
+
+    def earliest_start(self, now: Optional[datetime] = None) -> datetime:
+        now = now or datetime.now(self.preferences.tz)
+        return now + timedelta(minutes=self.preferences.min_notice_minutes)
+
+    def working_windows(self, first_day: date, last_day: date) -> List[Interval]:
+        prefs = self.preferences
+        tz = prefs.tz
+        work_start, work_end = time.fromisoformat(prefs.work_start), time.fromisoformat(prefs.work_end)
+        windows = []
+        day = first_day
+        while day <= last_day:
+            if day.weekday() in prefs.working_days:
+                windows.append((datetime.combine(day, work_start, tz), datetime.combine(day, work_end, tz)))
+            day += timedelta(days=1)
+        return windows
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        """No event (or its buffers) touches [start, end). O(log n)."""
+        return self.timeline.is_free(start, end)
+
+    def in_working_hours(self, start: datetime, end: datetime) -> bool:
+        """[start, end) sits inside its day's working hours, on a working day."""
+        local_day = start.astimezone(self.preferences.tz).date()
+        return any(w_start <= start and end <= w_end for w_start, w_end in self.working_windows(local_day, local_day))
+
+    def gaps_in(
+        self, start: datetime, end: datetime, duration_minutes: int, now: Optional[datetime] = None
+    ) -> List[Interval]:
+        """Bookable gaps inside [start, end), each starting on the granularity grid and long enough."""
+        prefs = self.preferences
+        start = max(start, self.earliest_start(now))
+        gaps = []
+        for gap_start, gap_end in self.timeline.free_between(start, end):
+            gap_start = align_up(gap_start, prefs.granularity_minutes, prefs.tz)
+            if gap_end - gap_start >= timedelta(minutes=duration_minutes):
+                gaps.append((gap_start, gap_end.astimezone(prefs.tz)))
+        return gaps
+
+    def free_windows(
+        self, first_day: date, last_day: date, duration_minutes: int, now: Optional[datetime] = None
+    ) -> List[Interval]:
+        """Bookable gaps inside the working hours of every day from first_day to last_day."""
+        windows = []
+        for window_start, window_end in self.working_windows(first_day, last_day):
+            windows.extend(self.gaps_in(window_start, window_end, duration_minutes, now))
+        return windows
+
+    def slots(
+        self, first_day: date, last_day: date, duration_minutes: int, limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        return format_slots(self.free_windows(first_day, last_day, duration_minutes, now), limit)
+
+
+def format_slots(windows: List[Interval], limit: Optional[int] = None) -> List[Dict]:
+    return [
+        {
+            "date": slot_start.strftime('%Y-%m-%d'),
+            "start_time": slot_start.strftime('%H:%M'),
+            "end_time": slot_end.strftime('%H:%M'),
+            "duration_available": int((slot_end - slot_start).total_seconds() / 60),
+        }
+        for slot_start, slot_end in windows[:limit]
+    ]
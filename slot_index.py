@@ -0,0 +1,148 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from availability import Interval
+from slot_engine import SchedulingPreferences, SlotEngine
+from ttl_cache import TTLCache
+
+# How far ahead the index (and so the suggestions) reach
+SLOT_INDEX_DAYS = 21
+
+
+class FreeSlotIndex:
+    """
+    Every free gap inside a user's working hours from `first_day` to `last_day`,
+    computed once from their busy time. "Is this slot free" and "what is free nearest
+    to it" are then bisects over the gap list and need no Google calls.
+    """
+
+    def __init__(
+        self, busy: Iterable[Interval], preferences: SchedulingPreferences, first_day: date, last_day: date,
+        now: Optional[datetime] = None
+    ):
+        self.preferences = preferences
+        self.first_day = first_day
+        self.last_day = last_day
+        self.engine = SlotEngine(busy, preferences)
+        self._rebuild(now)
+
+    def _rebuild(self, now: Optional[datetime] = None) -> None:
+        # Every gap regardless of length; queries filter by their own duration
+        self._gaps = self.engine.free_windows(self.first_day, self.last_day, 0, now)
+        self._starts = [start for start, _ in self._gaps]
+        self._ends = [end for _, end in self._gaps]
+
+    def __len__(self) -> int:
+        return len(self._gaps)
+
+    def covers(self, moment: datetime) -> bool:
+        return self.first_day <= moment.astimezone(self.preferences.tz).date() <= self.last_day
+
+    def is_free(self, start: datetime, duration_minutes: int, now: Optional[datetime] = None) -> bool:
+        """The slot can be booked: past the notice period, inside working hours and clear of events."""
+        return self.unavailable_reason(start, duration_minutes, now) is None
+
+    def unavailable_reason(self, start: datetime, duration_minutes: int, now: Optional[datetime] = None) -> Optional[str]:
+        """Why the slot can't be booked ("too_soon", "outside_hours" or "busy"), or None if it can."""
+        end = start + timedelta(minutes=duration_minutes)
+        if start < self.engine.earliest_start(now):
+            return "too_soon"
+        if not self.engine.in_working_hours(start, end):
+            return "outside_hours"
+        if not self.engine.is_free(start, end):
+            return "busy"
+        return None
+
+    def add_busy(self, start: datetime, end: datetime, now: Optional[datetime] = None) -> None:
+        """Write a new booking through instead of rebuilding from the calendar."""
+        self.engine.add_busy(start, end)
+        self._rebuild(now)
+
+    def _later(self, moment: datetime, duration: timedelta) -> Iterator[datetime]:
+        """Slot starts at or after `moment` on the granularity grid, earliest first."""
+        step = timedelta(minutes=self.preferences.granularity_minutes)
+        for i in range(bisect_right(self._ends, moment), len(self._gaps)):
+            gap_start, gap_end = self._gaps[i]
+            # Gap starts are on the grid, so stepping from them stays on it
+            start = gap_start if moment <= gap_start else gap_start - ((gap_start - moment) // step) * step
+            while start + duration <= gap_end:
+                yield start
+                start += step
+
+    def _earlier(self, moment: datetime, duration: timedelta) -> Iterator[datetime]:
+        """Slot starts before `moment` on the granularity grid, latest first."""
+        step = timedelta(minutes=self.preferences.granularity_minutes)
+        for i in range(bisect_left(self._starts, moment) - 1, -1, -1):
+            gap_start, gap_end = self._gaps[i]
+            latest = min(gap_end - duration, moment - timedelta(microseconds=1))
+            if latest < gap_start:
+                continue
+            start = gap_start + ((latest - gap_start) // step) * step
+            while start >= gap_start:
+                yield start
+                start -= step
+
+    def nearest(
+        self, moment: datetime, duration_minutes: int, limit: int = 3, now: Optional[datetime] = None
+    ) -> List[Interval]:
+        """
+        Up to `limit` free slots closest to `moment` on either side, in time order. They
+        don't overlap each other, so each one is a real alternative to the others.
+        """
+        duration = timedelta(minutes=duration_minutes)
+        earliest = self.engine.earliest_start(now)
+        candidates = heapq.merge(
+            ((abs(start - moment), start) for start in self._later(moment, duration)),
+            ((abs(start - moment), start) for start in self._earlier(moment, duration)),
+        )
+        chosen = []
+        for _, start in candidates:
+            # The index may be a few minutes old; don't offer what is now inside the notice period
+            if start < earliest or any(abs(start - other) < duration for other in chosen):
+                continue
+            chosen.append(start)
+            if len(chosen) == limit:
+                break
+        return [(start, start + duration) for start in sorted(chosen)]
+
+
+class SlotIndexRegistry:
+    """
+    FreeSlotIndex per (user, calendar). Bookings write through; anything else that
+    changes the calendar drops the index so the next lookup rebuilds it.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 5 * 60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.builds = 0
+        self.write_throughs = 0
+
+    def get(self, user_id: str, calendar_id: str, preferences: SchedulingPreferences) -> Optional[FreeSlotIndex]:
+        index = self._cache.get((user_id, calendar_id))
+        # Built under different working hours or buffers
+        if index is not None and index.preferences != preferences:
+            return None
+        return index
+
+    def set(self, user_id: str, calendar_id: str, index: FreeSlotIndex) -> None:
+        self._cache.set((user_id, calendar_id), index)
+        self.builds += 1
+
+    def add_busy(self, user_id: str, calendar_id: str, start: datetime, end: datetime) -> None:
+        index = self._cache.get((user_id, calendar_id))
+        if index is not None:
+            index.add_busy(start, end)
+            self.write_throughs += 1
+
+    def invalidate(self, user_id: str, calendar_id: str) -> None:
+        self._cache.pop((user_id, calendar_id))
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._cache.stats()
+        stats.update(builds=self.builds, write_throughs=self.write_throughs)
+        return stats
+
+
+default_slot_index_registry = SlotIndexRegistry()
@@ -2,9 +2,12 @@
 
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from datetime import datetime
 import uuid
+from collections import deque
+from itertools import islice
 from urllib.parse import urlparse, parse_qs
 
 # === PAGE CONFIG ===
@@ -16,16 +19,24 @@ st.set_page_config(
 
 # === API CONFIG ===
 API_BASE_URL = "http://localhost:8000"
+EVENTS_CACHE_TTL_SECONDS = 30
+# The chat keeps this many messages and redraws only the last MESSAGES_SHOWN on each rerun
+MESSAGES_KEPT = 100
+MESSAGES_SHOWN = 30
 
 # === SESSION STATE INIT ===
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
 
 if "messages" not in st.session_state:
-    st.session_state.messages = [{
+    st.session_state.messages = deque([{
         "role": "assistant",
         "content": "👋 Hello! I'm your AI appointment assistant. I can check availability, book meetings, and show your calendar. How can I help today?"
-    }]
+    }], maxlen=MESSAGES_KEPT)
+
+# Quick replies offered with the assistant's last message, shown as buttons
+if "suggestions" not in st.session_state:
+    st.session_state.suggestions = []
 
 if "booking_confirmed" not in st.session_state:
     st.session_state.booking_confirmed = False
@@ -38,11 +49,30 @@ if "user_id" not in st.session_state:
         st.session_state.user_id = query_params["user_id"][0]
 
 # === FUNCTIONS ===
-def send_message(message: str):
+def get_http_session() -> requests.Session:
+    """
+    Keep-alive connections to the backend, reused across reruns. requests.Session isn't
+    thread-safe, so it isn't shared between users: each browser session has its own,
+    and its reruns never overlap.
+    """
+    session = st.session_state.get("http_session")
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        st.session_state.http_session = session
+    return session
+
+def choose_suggestion(suggestion: str):
+    # Runs before the rerun the click causes, which then sends it like a typed message
+    st.session_state.chosen_suggestion = suggestion
+
+def send_message(message: str, message_id: str):
     try:
-        response = requests.post(
+        response = get_http_session().post(
             f"{API_BASE_URL}/chat",
-            json={"message": message, "session_id": st.session_state.session_id},
+            json={"message": message, "session_id": st.session_state.session_id, "message_id": message_id},
             timeout=30
         )
         return response.json() if response.status_code == 200 else None
@@ -50,10 +80,70 @@ def send_message(message: str):
         st.error(f"❌ Error: {str(e)}")
         return None
 
-def fetch_events(user_id: str):
+def send_message_stream(message: str, placeholder):
+    """
+    /chat/stream: show each progress event in `placeholder` as it arrives, then the
+    final reply. Falls back to the blocking /chat call if streaming fails. Both carry
+    the same message_id, so if the backend already got the message the fallback only
+    fetches its reply; a "yes" is never handled twice.
+    """
+    message_id = str(uuid.uuid4())
+    try:
+        res = get_http_session().post(
+            f"{API_BASE_URL}/chat/stream",
+            json={"message": message, "session_id": st.session_state.session_id, "message_id": message_id},
+            stream=True,
+            timeout=30
+        )
+    except requests.RequestException:
+        # Unreachable, or no response in time; the backend may have the message already
+        return send_message(message, message_id)
+
+    try:
+        with res:
+            if res.status_code != 200:
+                return send_message(message, message_id)
+
+            progress = []
+            event_type = None
+            for line in res.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event_type = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event_type == "progress":
+                        progress.append(f"⏳ {data['message']}…")
+                        placeholder.markdown("\n\n".join(progress))
+                    elif event_type == "result":
+                        return data
+    except Exception:
+        pass
+    # The stream broke or ended without a reply; the backend dedupes by message_id
+    return send_message(message, message_id)
+
+@st.cache_data(ttl=EVENTS_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_events_cached(user_id: str, limit: int = 10):
+    # The backend streams NDJSON, one event per line. Errors raise so they aren't cached.
+    with get_http_session().get(
+        f"{API_BASE_URL}/calendar/events",
+        params={"user_id": user_id, "limit": limit},
+        stream=True,
+        timeout=10
+    ) as res:
+        res.raise_for_status()
+        events = []
+        for line in res.iter_lines():
+            if not line:
+                continue
+            item = json.loads(line)
+            if "error" in item:
+                raise RuntimeError(item["error"])
+            events.append(item)
+        return events
+
+def fetch_events(user_id: str, limit: int = 10):
     try:
-        res = requests.get(f"{API_BASE_URL}/calendar/events", params={"user_id": user_id})
-        return res.json().get("events", []) if res.status_code == 200 else []
+        return fetch_events_cached(user_id, limit)
     except Exception as e:
         st.error(f"Failed to fetch events: {str(e)}")
         return []
@@ -91,33 +181,48 @@ if st.session_state.user_id:
     st.divider()
     st.subheader("💬 Talk to the Assistant")
 
-    for msg in st.session_state.messages:
+    hidden = len(st.session_state.messages) - MESSAGES_SHOWN
+    if hidden > 0:
+        st.caption(f"{hidden} earlier messages not shown")
+    for msg in islice(st.session_state.messages, max(hidden, 0), None):
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
 
-    user_input = st.chat_input("Type your message here...")
+    user_input = st.chat_input("Type your message here...") or st.session_state.pop("chosen_suggestion", None)
 
     if user_input:
         st.session_state.messages.append({"role": "user", "content": user_input})
         with st.chat_message("user"):
             st.markdown(user_input)
 
-        response_data = send_message(user_input)
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            response_data = send_message_stream(user_input, placeholder)
+            if response_data:
+                assistant_msg = response_data.get("response", "I didn't understand that.")
+                placeholder.markdown(assistant_msg)
+            else:
+                placeholder.empty()
 
         if response_data:
-            assistant_msg = response_data.get("response", "I didn't understand that.")
             st.session_state.messages.append({"role": "assistant", "content": assistant_msg})
-            with st.chat_message("assistant"):
-                st.markdown(assistant_msg)
+            st.session_state.suggestions = response_data.get("suggestions") or []
 
             if response_data.get("booking_confirmed"):
+                # The calendar changed, don't keep showing the cached event list
+                fetch_events_cached.clear()
                 st.success("✅ Appointment booked!")
 
+    suggestions = st.session_state.suggestions
+    if suggestions:
+        for i, (column, suggestion) in enumerate(zip(st.columns(len(suggestions)), suggestions)):
+            column.button(suggestion, key=f"suggestion-{i}-{suggestion}", on_click=choose_suggestion, args=(suggestion,))
+
 ## --- 4. RESET BUTTON ---
 st.divider()
 if st.button("🔁 Reset Session"):
     try:
-        requests.delete(f"{API_BASE_URL}/session/{st.session_state.session_id}")
+        get_http_session().delete(f"{API_BASE_URL}/session/{st.session_state.session_id}", timeout=10)
     except:
         pass
     st.session_state.clear()
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from availability import Interval
+
+
+class TeamAvailability:
+    """
+    Minute-resolution availability engine for many calendars at once.
+
+    Every calendar's busy intervals are folded into a single int array holding, per
+    minute, how many attendees are busy (difference array + cumsum), so intersecting
+    hundreds of calendars is a handful of vectorized passes regardless of how many
+    events each one has.
+    """
+
+    def __init__(self, range_start: datetime, range_end: datetime):
+        self.tz = range_start.tzinfo
+        # Minute offsets are taken in UTC: two datetimes sharing a ZoneInfo subtract as
+        # wall-clock time, which is an hour off across a DST change
+        self.range_start = range_start.astimezone(timezone.utc)
+        self.minutes = int((range_end - self.range_start).total_seconds() // 60)
+        self.attendees = 0
+        self.busy_count = np.zeros(self.minutes, dtype=np.int32)
+        self.working = np.ones(self.minutes, dtype=bool)
+
+    def _offsets(self, intervals: List[Interval]):
+        if not intervals:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        bounds = np.array(
+            [((s.astimezone(timezone.utc) - self.range_start).total_seconds(),
+              (e.astimezone(timezone.utc) - self.range_start).total_seconds())
+             for s, e in intervals],
+            dtype=np.float64,
+        )
+        # Round outwards so a partially busy minute counts as busy
+        starts = np.clip(np.floor(bounds[:, 0] / 60), 0, self.minutes).astype(np.int64)
+        ends = np.clip(np.ceil(bounds[:, 1] / 60), 0, self.minutes).astype(np.int64)
+        keep = ends > starts
+        return starts[keep], ends[keep]
+
+    def _coverage(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        diff = np.zeros(self.minutes + 1, dtype=np.int32)
+        np.add.at(diff, starts, 1)
+        np.add.at(diff, ends, -1)
+        return np.cumsum(diff[:-1])
+
+    def add_calendars(self, busy_by_calendar: Dict[str, List[Interval]]) -> None:
+        all_intervals = [interval for intervals in busy_by_calendar.values() for interval in intervals]
+        self.attendees += len(busy_by_calendar)
+        # Intervals are merged per calendar, so coverage counts distinct busy attendees
+        self.busy_count += self._coverage(*self._offsets(all_intervals)).astype(np.int32)
+
+    def restrict_to(self, windows: List[Interval]) -> None:
+        """Only consider minutes inside the given (e.g. working hours) windows."""
+        self.working = self._coverage(*self._offsets(windows)) > 0
+
+    def free_windows(
+        self, duration_minutes: int, min_attendees: Optional[int] = None, limit: int = 20
+    ) -> List[Dict]:
+        """
+        Windows of at least `duration_minutes` where at least `min_attendees` (default:
+        everyone) are free, ranked by attendees free and then by start time.
+        """
+        required = self.attendees if min_attendees is None else min_attendees
+        allowed_busy = self.attendees - required
+        free = self.working & (self.busy_count <= allowed_busy)
+
+        edges = np.diff(np.concatenate(([0], free.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        long_enough = (ends - starts) >= duration_minutes
+        starts, ends = starts[long_enough], ends[long_enough]
+        if starts.size == 0:
+            return []
+
+        # Worst-case busy count inside each window decides how many can attend all of it.
+        # reduceat spans from one window start to the next, so mask out everything else.
+        in_window = self._coverage(starts, ends) > 0
+        worst_busy = np.maximum.reduceat(np.where(in_window, self.busy_count, -1), starts)
+        attendees_free = self.attendees - worst_busy
+
+        order = np.lexsort((starts, -attendees_free))[:limit]
+        return [
+            {
+                "start": (self.range_start + timedelta(minutes=int(starts[i]))).astimezone(self.tz).isoformat(),
+                "end": (self.range_start + timedelta(minutes=int(ends[i]))).astimezone(self.tz).isoformat(),
+                "duration_minutes": int(ends[i] - starts[i]),
+                "attendees_free": int(attendees_free[i]),
+                "attendees_total": self.attendees,
+            }
+            for i in order
+        ]
@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import httplib2
+import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from availability_cache import AvailabilityCache
+from calendar_service import CalendarService
+from event_mirror import MirrorRegistry
+from fake_google import FakeGoogleServer, owner_calendar
+from google_executor import GoogleApiExecutor
+from idempotency import IdempotencyIndex
+from singleflight import SingleFlight
+from slot_index import SlotIndexRegistry
+
+TZ = ZoneInfo("Asia/Kolkata")
+TOKEN = "test-user"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = FakeGoogleServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def service(server):
+    server.calendars.clear()
+    server.unreadable.clear()
+    resource = build(
+        'calendar', 'v3', http=httplib2.Http(timeout=10), static_discovery=True,
+        client_options={"api_endpoint": server.url}
+    )
+    executor = GoogleApiExecutor(max_workers=4)
+    yield CalendarService(
+        Credentials(TOKEN, expiry=datetime.utcnow() + timedelta(days=1)), user_id=TOKEN, service=resource,
+        executor=executor, availability_cache=AvailabilityCache(), mirrors=MirrorRegistry(),
+        singleflight=SingleFlight(), idempotency=IdempotencyIndex(), slot_indexes=SlotIndexRegistry(),
+    )
+    executor.shutdown()
+
+
+def next_monday():
+    today = datetime.now(TZ).date()
+    return today + timedelta(days=7 - today.weekday())
+
+
+def test_team_availability_skips_unreadable_calendars(server, service):
+    day = next_monday()
+    start = datetime.combine(day, datetime.min.time(), TZ).replace(hour=9)
+    server.add_event("bob@example.com", start, start.replace(hour=12))
+    server.unreadable.add("eve@example.com")
+
+    result = run(service.find_team_availability(
+        ["alice@example.com", "bob@example.com", "eve@example.com"], day.isoformat(), day.isoformat(), 60
+    ))
+
+    assert result["skipped_calendars"] == [{"calendar_id": "eve@example.com", "reason": "notFound"}]
+    [window] = result["windows"]
+    assert window["start"] == start.replace(hour=12).isoformat()
+    assert window["attendees_total"] == 2
+
+
+def test_busy_intervals_still_raise_for_an_unreadable_calendar(server, service):
+    server.unreadable.add("eve@example.com")
+    start = datetime.now(TZ)
+    with pytest.raises(RuntimeError, match="eve@example.com"):
+        run(service.get_busy_intervals(start, start + timedelta(hours=1), ["eve@example.com"]))
+
+
+def test_bulk_booking_checks_conflicts_per_item(server, service):
+    day = next_monday()
+    start = datetime.combine(day, datetime.min.time(), TZ).replace(hour=10)
+    server.add_event(owner_calendar(TOKEN), start, start.replace(hour=11))
+
+    def booking(time, **extra):
+        return dict({"date": day.isoformat(), "start_time": time, "duration_minutes": 60}, **extra)
+
+    results = run(service.book_appointments_bulk([
+        booking("10:00", check_conflicts=True),   # clashes with the existing event
+        booking("10:30"),                         # didn't ask for a check
+        booking("14:00", check_conflicts=True),
+        booking("14:30", check_conflicts=True),   # clashes with the one above
+    ]))
+
+    assert [result["success"] for result in results] == [False, True, True, False]
+    assert results[0]["conflict"] and results[3]["conflict"]
+    assert len(server.calendars[owner_calendar(TOKEN)]) == 3
+
+
+def test_bulk_booking_default_check_applies_to_items_without_their_own(server, service):
+    day = next_monday()
+    start = datetime.combine(day, datetime.min.time(), TZ).replace(hour=10)
+    server.add_event(owner_calendar(TOKEN), start, start.replace(hour=11))
+
+    results = run(service.book_appointments_bulk([
+        {"date": day.isoformat(), "start_time": "10:00"},
+        {"date": day.isoformat(), "start_time": "10:00", "check_conflicts": False},
+    ], check_conflicts=True))
+
+    assert [result["success"] for result in results] == [False, True]
+
+
+def test_bulk_booking_replays_idempotent_items(server, service):
+    day = next_monday()
+    bookings = [{"date": day.isoformat(), "start_time": "15:00", "idempotency_key": "k1"}]
+    first = run(service.book_appointments_bulk(bookings))
+    again = run(service.book_appointments_bulk(bookings))
+    assert first[0]["success"] and again[0]["event_id"] == first[0]["event_id"]
+    assert len(server.calendars[owner_calendar(TOKEN)]) == 1
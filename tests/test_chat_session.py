@@ -0,0 +1,58 @@
+from chat_session import (
+    HISTORY_LENGTH, HISTORY_MESSAGE_CHARS, ChatSession, ChatSessionStore, PendingBooking, PendingCancellation
+)
+from session_store import MemoryStore, SQLiteStore
+
+
+def booking():
+    return PendingBooking(
+        booking_id="b1", title="Meeting", date="2026-10-20", start_time="15:00", duration_minutes=45,
+        description="Scheduled via AI assistant"
+    )
+
+
+def test_history_is_a_bounded_ring_of_truncated_messages():
+    session = ChatSession()
+    for i in range(HISTORY_LENGTH + 5):
+        session.record("user", f"{i} " + "x" * 1000)
+    assert len(session.history) == HISTORY_LENGTH
+    assert session.history[0][1].startswith("5 ")
+    assert all(len(text) == HISTORY_MESSAGE_CHARS for _, text in session.history)
+
+
+def test_dict_round_trip():
+    session = ChatSession(booking_pending=booking(), awaiting_time=True)
+    session.cancel_pending = PendingCancellation(event_id="e1", title="Standup", when="Tuesday at 10:00 AM")
+    session.record("user", "book a meeting")
+    restored = ChatSession.from_dict(session.to_dict())
+    assert restored.to_dict() == session.to_dict()
+    assert restored.has_pending
+
+
+def test_from_dict_skips_old_style_history():
+    restored = ChatSession.from_dict({"history": ["just text", ["user", "hi"]]})
+    assert list(restored.history) == [("user", "hi")]
+
+
+def test_memory_backend_keeps_live_records():
+    store = ChatSessionStore(MemoryStore())
+    session = ChatSession(booking_pending=booking())
+    store["s"] = session
+    assert store["s"] is session
+    stats = store.stats()
+    assert stats["size"] == 1 and stats["bytes_per_session"] > 0
+
+
+def test_sqlite_backend_stores_dicts(tmp_path):
+    sessions = ChatSessionStore(SQLiteStore(str(tmp_path / "sessions.db"), "chat_sessions"))
+    session = ChatSession(booking_pending=booking())
+    session.record("assistant", "Should I confirm?")
+    sessions["s"] = session
+    loaded = sessions["s"]
+    assert loaded is not session
+    assert loaded.booking_pending == session.booking_pending
+    assert list(loaded.history) == [("assistant", "Should I confirm?")]
+    assert "bytes_per_session" not in sessions.stats()
+    del sessions["s"]
+    assert "s" not in sessions
+    sessions.close()
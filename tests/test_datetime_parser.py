@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+import pytest
+
+from datetime_parser import _fast_parse, normalize, parse_date, parse_datetime, parse_datetime_range
+
+# A Saturday morning
+NOW = datetime(2026, 10, 17, 9, 30)
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("next friday at 3 pm", datetime(2026, 10, 23, 15, 0)),
+    ("tomorrow 10:30am", datetime(2026, 10, 18, 10, 30)),
+    ("book a meeting at 3", datetime(2026, 10, 17, 15, 0)),
+    ("book a meeting in 3 days at 11am", datetime(2026, 10, 20, 11, 0)),
+    ("schedule a call in a week at 4pm", datetime(2026, 10, 24, 16, 0)),
+    ("meeting 2 weeks from now at 10am", datetime(2026, 10, 31, 10, 0)),
+    ("meeting next week at 2pm", datetime(2026, 10, 24, 14, 0)),
+    ("book call on the 20th at 3pm", datetime(2026, 10, 20, 15, 0)),
+    ("book on the 1st at 9am", datetime(2026, 11, 1, 9, 0)),
+    ("tonight at 8", datetime(2026, 10, 17, 20, 0)),
+    ("tonight at 8:30", datetime(2026, 10, 17, 20, 30)),
+])
+def test_fast_path_phrases(message, expected):
+    assert parse_datetime(message, NOW) == expected
+
+
+def test_time_range():
+    assert parse_datetime_range("oct 20th 2-3pm", NOW) == (datetime(2026, 10, 20, 14, 0), datetime(2026, 10, 20, 15, 0))
+
+
+def test_day_of_month_skips_months_without_it():
+    assert parse_date("the 31st", date(2026, 11, 5)) == date(2026, 12, 31)
+
+
+@pytest.mark.parametrize("message", ["in 2 months at 3pm", "the weekend after next at 10am", "on the 45th at 3pm"])
+def test_unread_date_words_defer_to_dateparser(message):
+    # Guessing today would propose the wrong day; None sends it to the slow path
+    assert _fast_parse(normalize(message), NOW.date()) is None
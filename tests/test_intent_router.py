@@ -0,0 +1,57 @@
+import pytest
+
+from datetime_parser import mentions_time
+from intent_router import chat_router
+
+
+def classify(message: str, has_pending: bool = False) -> str:
+    return chat_router.classify(message, has_pending=has_pending, has_time=mentions_time(message))
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("yes", "confirm"),
+    ("Yes, confirm it", "confirm"),
+    ("sounds good", "confirm"),
+    ("no", "decline"),
+    ("No, cancel", "decline"),
+    ("cancel it", "decline"),
+    ("Yes, cancel it", "confirm"),
+    ("No, keep it", "decline"),
+    ("Change time", "reschedule"),
+])
+def test_bare_answers_while_pending(message, expected):
+    assert classify(message, has_pending=True) == expected
+
+
+@pytest.mark.parametrize("message", ["yes", "no", "sure"])
+def test_answers_need_something_pending(message):
+    assert classify(message) is None
+
+
+def test_booking_outranks_cancelling():
+    assert classify("schedule a meeting to cancel the contract on friday at 3pm") == "book"
+    assert classify("book a call to remove the old pipeline tomorrow at 10am") == "book"
+
+
+def test_cancelling_on_its_own():
+    assert classify("cancel my meeting tomorrow at 3pm") == "cancel_event"
+    assert classify("delete the call I booked for friday") == "cancel_event"
+
+
+def test_answer_with_a_new_time_is_not_a_confirmation():
+    # Falls through to the default handler, which re-proposes the new time
+    assert classify("sure, but make it at 4pm instead", has_pending=True) is None
+
+
+def test_answer_with_another_intent_is_that_intent():
+    assert classify("book a call, no later than 3pm friday", has_pending=True) == "book"
+    assert classify("book a call, no later than 3pm friday") == "book"
+    assert classify("yes, and reschedule my other meeting", has_pending=True) == "reschedule"
+
+
+def test_cancel_with_a_time_while_pending_is_a_cancellation():
+    assert classify("cancel my 3pm meeting tomorrow", has_pending=True) == "cancel_event"
+
+
+def test_reschedule_is_not_schedule():
+    assert classify("reschedule my meeting") == "reschedule"
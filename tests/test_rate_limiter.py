@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+import pytest
+
+from google_executor import GoogleApiExecutor
+from rate_limiter import CircuitBreaker, GoogleRateLimited
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeRequest:
+    methodId = "calendar.events.list"
+
+    def __init__(self, gate=None):
+        self.gate = gate
+
+    def execute(self, http=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return {"items": []}
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_cancelled_probe_releases_the_breaker():
+    async def scenario():
+        executor = GoogleApiExecutor(max_workers=2, breaker=half_open_breaker())
+        gate = threading.Event()
+        try:
+            probe = asyncio.ensure_future(executor.execute(FakeRequest(gate)))
+            await asyncio.sleep(0.05)
+            assert executor.breaker.state == CircuitBreaker.HALF_OPEN
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            gate.set()
+            # The next call gets to probe, and closes the circuit
+            assert await executor.execute(FakeRequest()) == {"items": []}
+            return executor.breaker.state
+        finally:
+            gate.set()
+            executor.shutdown()
+
+    assert run(scenario()) == CircuitBreaker.CLOSED
+
+
+def test_throttled_call_does_not_take_the_probe():
+    async def scenario():
+        executor = GoogleApiExecutor(max_workers=2, global_rate=0.01, global_burst=1, max_queue_seconds=0,
+                                     breaker=half_open_breaker())
+        try:
+            executor._global_bucket.reserve()
+            with pytest.raises(GoogleRateLimited):
+                await executor.execute(FakeRequest())
+            return executor.breaker
+        finally:
+            executor.shutdown()
+
+    breaker = run(scenario())
+    # Still free for a real call to probe with
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.rejected == 0
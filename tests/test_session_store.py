@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from session_store import MemoryStore, SQLiteStore
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryStore(maxsize=2)
+    store["a"] = 1
+    store["b"] = 2
+    assert store.get("a") == 1  # a is now the more recently used
+    store["c"] = 3
+    assert "b" not in store
+    assert store.get("a") == 1 and store.get("c") == 3
+    assert store.stats() == {"size": 2, "evictions": 1}
+
+
+def test_memory_store_idle_expiry_counts_reads_as_use():
+    store = MemoryStore(idle_ttl=60)
+    store["old"] = 1
+    store["new"] = 2
+    store._data["old"] = (1, time.monotonic() - 120)
+    store._data["new"] = (2, time.monotonic() - 30)
+    assert store.expire_idle(60) == 1
+    assert store.keys() == ["new"]
+    assert store.get("new") == 2
+    assert store.expire_idle(10) == 0
+
+
+def test_memory_store_keys_in_use_order():
+    store = MemoryStore()
+    for key in "abc":
+        store[key] = key
+    store.get("a")
+    assert store.keys() == ["b", "c", "a"]
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_sqlite_store_round_trip(sqlite_path):
+    store = SQLiteStore(sqlite_path, "tokens")
+    store["user"] = {"token": "abc"}
+    assert store["user"] == {"token": "abc"}
+    del store["user"]
+    assert "user" not in store
+    assert len(store) == 0
+    store.close()
+
+
+def test_sqlite_namespaces_are_separate(sqlite_path):
+    tokens, sessions = SQLiteStore(sqlite_path, "tokens"), SQLiteStore(sqlite_path, "sessions")
+    tokens["k"] = 1
+    assert "k" not in sessions
+    tokens.close()
+    sessions.close()
+
+
+def test_sqlite_other_worker_sees_writes_and_deletes_at_once(sqlite_path):
+    # Two stores on one file stand in for two uvicorn workers
+    writer, reader = SQLiteStore(sqlite_path, "tokens"), SQLiteStore(sqlite_path, "tokens")
+    assert reader.get("user") is None  # a miss must not be remembered
+    writer["user"] = {"token": "abc"}
+    assert reader.get("user") == {"token": "abc"}
+    writer["user"] = {"token": "def"}
+    assert reader.get("user") == {"token": "def"}
+    del writer["user"]
+    assert reader.get("user") is None
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_read_cache_is_opt_in(sqlite_path):
+    writer = SQLiteStore(sqlite_path, "prefs")
+    cached = SQLiteStore(sqlite_path, "prefs", read_cache_ttl=60)
+    writer["user"] = {"work_start": "09:00"}
+    assert cached.get("user") == {"work_start": "09:00"}
+    writer["user"] = {"work_start": "10:00"}
+    # Allowed to lag until the cached copy expires, and says so in its stats
+    assert cached.get("user") == {"work_start": "09:00"}
+    assert "read_cache_size" in cached.stats()
+    assert "read_cache_size" not in writer.stats()
+    writer.close()
+    cached.close()
+
+
+def test_sqlite_batched_writes_flush(sqlite_path):
+    store = SQLiteStore(sqlite_path, "events", batch_size=3, flush_interval=60)
+    reader = SQLiteStore(sqlite_path, "events")
+    store["a"] = 1
+    assert store.get("a") == 1  # pending writes are visible to their own store
+    assert reader.get("a") is None
+    store.flush()
+    assert reader.get("a") == 1
+    store.close()
+    reader.close()
+
+
+def test_sqlite_expire_idle(sqlite_path):
+    store = SQLiteStore(sqlite_path, "sessions")
+    store["old"] = 1
+    store._conn.execute("UPDATE kv SET updated_at = ? WHERE key = 'old'", (time.time() - 120,))
+    store["new"] = 2
+    assert store.expire_idle(60) == 1
+    assert store.keys() == ["new"]
+    store.close()
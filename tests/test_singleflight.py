@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from idempotency import IdempotencyIndex
+from singleflight import SingleFlight
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_calls_share_one_result():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        return results, calls, flight.stats()
+
+    results, calls, stats = run(scenario())
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert stats == {"calls": 1, "deduplicated": 4, "in_flight": 0}
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "result"
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert run(scenario()) == "result"
+
+
+def test_call_is_cancelled_once_every_waiter_has_gone():
+    async def scenario():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        # The next caller starts a fresh call instead of inheriting the cancelled one
+        fresh = await flight.do("key", lambda: asyncio.sleep(0, result="fresh"))
+        return fresh, flight.stats()["in_flight"]
+
+    assert run(scenario()) == ("fresh", 0)
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    assert [type(e) for e in run(scenario())] == [ValueError, ValueError]
+
+
+def test_duplicate_booking_survives_the_first_request_going_away():
+    async def scenario():
+        index = IdempotencyIndex()
+        release = asyncio.Event()
+        inserts = 0
+
+        async def book():
+            nonlocal inserts
+            inserts += 1
+            await release.wait()
+            return {"success": True, "event_id": "event-1"}
+
+        first = asyncio.create_task(index.run("key", book))
+        await asyncio.sleep(0)
+        retry = asyncio.create_task(index.run("key", book))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await retry, inserts
+
+    result, inserts = run(scenario())
+    assert result == {"success": True, "event_id": "event-1"}
+    assert inserts == 1
@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from slot_engine import BusyTimeline, SchedulingPreferences, SlotEngine, align_up
+
+TZ = ZoneInfo("Asia/Kolkata")
+MONDAY = date(2026, 10, 19)
+EARLY = datetime(2026, 10, 1, tzinfo=TZ)  # "now" well before every slot
+
+
+def at(hour, minute=0, day=MONDAY):
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=TZ)
+
+
+def prefs(**values):
+    return SchedulingPreferences(**dict({"timezone": "Asia/Kolkata"}, **values))
+
+
+def test_preferences_reject_bad_values():
+    with pytest.raises(ValueError):
+        prefs(timezone="Mars/Olympus")
+    with pytest.raises(ValueError):
+        prefs(work_start="18:00", work_end="09:00")
+    with pytest.raises(ValueError):
+        prefs(working_days=(7,))
+    with pytest.raises(ValueError):
+        prefs(buffer_before_minutes=-5)
+
+
+def test_preferences_round_trip_ignores_unknown_keys():
+    loaded = SchedulingPreferences.from_dict({"work_start": "10:00", "working_days": [4, 0, 0], "colour": "blue"})
+    assert loaded.working_days == (0, 4)
+    assert SchedulingPreferences.from_dict(loaded.to_dict()) == loaded
+
+
+def test_timeline_merges_overlapping_and_touching_intervals():
+    timeline = BusyTimeline([(at(9), at(10)), (at(10), at(11)), (at(13), at(14))])
+    timeline.add(at(10, 30), at(13, 30))
+    assert timeline.intervals() == [(at(9), at(14))]
+
+
+def test_timeline_free_between():
+    timeline = BusyTimeline([(at(10), at(11)), (at(12), at(13))])
+    assert timeline.free_between(at(9), at(14)) == [(at(9), at(10)), (at(11), at(12)), (at(13), at(14))]
+    assert timeline.is_free(at(11), at(12))
+    assert not timeline.is_free(at(10, 30), at(11, 30))
+
+
+def test_timeline_compares_across_offsets():
+    timeline = BusyTimeline([(at(10), at(11))])
+    assert not timeline.is_free(at(10).astimezone(timezone.utc), at(10, 30).astimezone(timezone.utc))
+
+
+def test_align_up_snaps_to_local_grid():
+    assert align_up(at(9, 1), 15, TZ) == at(9, 15)
+    assert align_up(at(9, 15), 15, TZ) == at(9, 15)
+
+
+def test_slots_stay_inside_working_hours():
+    engine = SlotEngine([(at(10), at(16))], prefs(work_start="09:00", work_end="17:00"))
+    assert engine.slots(MONDAY, MONDAY, 30, now=EARLY) == [
+        {"date": "2026-10-19", "start_time": "09:00", "end_time": "10:00", "duration_available": 60},
+        {"date": "2026-10-19", "start_time": "16:00", "end_time": "17:00", "duration_available": 60},
+    ]
+    assert engine.slots(MONDAY, MONDAY, 90, now=EARLY) == []
+
+
+def test_buffers_widen_busy_time():
+    engine = SlotEngine([(at(12), at(13))], prefs(buffer_before_minutes=15, buffer_after_minutes=30))
+    # 30 minutes must stay free between a new meeting and the event after it, 15 after the event
+    assert not engine.is_free(at(11, 15), at(11, 45))
+    assert engine.is_free(at(11), at(11, 30))
+    assert not engine.is_free(at(13), at(13, 30))
+    assert engine.is_free(at(13, 15), at(13, 45))
+
+
+def test_notice_period_and_working_days():
+    engine = SlotEngine([], prefs(working_days=(0,), min_notice_minutes=60, granularity_minutes=30))
+    now = at(9, 10)
+    first = engine.free_windows(MONDAY, MONDAY + timedelta(days=1), 30, now=now)
+    # Tuesday isn't a working day, and Monday starts at the first grid point after the notice
+    assert first == [(at(10, 30), at(17))]
+    assert engine.in_working_hours(at(9), at(10))
+    assert not engine.in_working_hours(at(9, day=MONDAY + timedelta(days=1)), at(10, day=MONDAY + timedelta(days=1)))
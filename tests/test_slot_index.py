@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from slot_engine import SchedulingPreferences
+from slot_index import FreeSlotIndex, SlotIndexRegistry
+
+TZ = ZoneInfo("Asia/Kolkata")
+DAY = date(2026, 10, 20)
+NOW = datetime(2026, 10, 20, 8, 0, tzinfo=TZ)
+
+
+def at(hour, minute=0, day=DAY):
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=TZ)
+
+
+def index_for(busy, **preferences):
+    prefs = SchedulingPreferences(timezone="Asia/Kolkata", work_start="09:00", work_end="17:00", **preferences)
+    return FreeSlotIndex(busy, prefs, DAY, DAY + timedelta(days=1), now=NOW)
+
+
+def test_free_slot_inside_working_hours():
+    index = index_for([(at(10), at(11))])
+    assert index.is_free(at(11), 30, now=NOW)
+    assert index.unavailable_reason(at(10, 30), 30, now=NOW) == "busy"
+
+
+def test_off_hours_slots_are_not_free():
+    index = index_for([])
+    assert index.unavailable_reason(at(7), 30, now=NOW - timedelta(hours=2)) == "outside_hours"
+    # Starts inside working hours but runs past their end
+    assert index.unavailable_reason(at(16, 45), 30, now=NOW) == "outside_hours"
+
+
+def test_past_and_short_notice_slots_are_not_free():
+    index = index_for([], min_notice_minutes=120)
+    assert index.unavailable_reason(at(9), 30, now=NOW) == "too_soon"
+    assert index.unavailable_reason(at(9, 30), 30, now=NOW) == "too_soon"
+    assert index.is_free(at(10), 30, now=NOW)
+
+
+def test_nearest_skips_the_notice_period():
+    index = index_for([(at(10), at(12))], min_notice_minutes=60)
+    now = at(9, 20)
+    slots = index.nearest(at(10), 30, limit=2, now=now)
+    assert [start for start, _ in slots] == [at(12), at(12, 30)]
+
+
+def test_nearest_offers_non_overlapping_slots_on_both_sides():
+    index = index_for([(at(11), at(12))])
+    slots = index.nearest(at(11), 30, limit=3, now=NOW)
+    assert [start for start, _ in slots] == [at(10), at(10, 30), at(12)]
+
+
+def test_add_busy_writes_through():
+    index = index_for([])
+    assert index.is_free(at(14), 60, now=NOW)
+    index.add_busy(at(14), at(15), now=NOW)
+    assert index.unavailable_reason(at(14, 30), 30, now=NOW) == "busy"
+    assert index.nearest(at(14), 60, limit=1, now=NOW) == [(at(13), at(14))]
+
+
+def test_covers_only_its_days():
+    index = index_for([])
+    assert index.covers(at(12, day=DAY + timedelta(days=1)))
+    assert not index.covers(at(12, day=DAY + timedelta(days=2)))
+
+
+def test_registry_drops_indexes_built_under_other_preferences():
+    registry = SlotIndexRegistry()
+    index = index_for([])
+    registry.set("user", "primary", index)
+    assert registry.get("user", "primary", index.preferences) is index
+    assert registry.get("user", "primary", SchedulingPreferences(work_start="10:00")) is None
+    registry.invalidate("user", "primary")
+    assert registry.get("user", "primary", index.preferences) is None
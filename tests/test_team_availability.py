@@ -0,0 +1,55 @@
+from datetime import date, datetime, time, timezone
+from zoneinfo import ZoneInfo
+
+from availability import working_windows
+from team_availability import TeamAvailability
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def engine_for(first_day, last_day, busy_by_calendar):
+    windows = working_windows(first_day, last_day, time(9), time(17), NEW_YORK)
+    engine = TeamAvailability(windows[0][0], windows[-1][1])
+    engine.add_calendars(busy_by_calendar)
+    engine.restrict_to(windows)
+    return engine
+
+
+def test_everyone_free_windows_skip_busy_attendees():
+    busy = {
+        "a@example.com": [],
+        "b@example.com": [(datetime(2026, 10, 5, 10, tzinfo=NEW_YORK), datetime(2026, 10, 5, 12, tzinfo=NEW_YORK))],
+    }
+    windows = engine_for(date(2026, 10, 5), date(2026, 10, 5), busy).free_windows(60)
+    assert [(w["start"], w["end"]) for w in windows] == [
+        ("2026-10-05T09:00:00-04:00", "2026-10-05T10:00:00-04:00"),
+        ("2026-10-05T12:00:00-04:00", "2026-10-05T17:00:00-04:00"),
+    ]
+    assert all(w["attendees_free"] == 2 for w in windows)
+
+
+def test_min_attendees_allows_some_busy():
+    busy = {
+        "a@example.com": [],
+        "b@example.com": [(datetime(2026, 10, 5, 9, tzinfo=NEW_YORK), datetime(2026, 10, 5, 17, tzinfo=NEW_YORK))],
+    }
+    engine = engine_for(date(2026, 10, 5), date(2026, 10, 5), busy)
+    assert engine.free_windows(60) == []
+    [window] = engine.free_windows(60, min_attendees=1)
+    assert window["attendees_free"] == 1
+    assert window["duration_minutes"] == 8 * 60
+
+
+def test_windows_across_a_dst_change():
+    # New York falls back on 1 November 2026; freebusy answers in UTC
+    busy_start = datetime(2026, 11, 2, 9, tzinfo=NEW_YORK).astimezone(timezone.utc)
+    busy_end = datetime(2026, 11, 2, 17, tzinfo=NEW_YORK).astimezone(timezone.utc)
+    busy = {"a@example.com": [], "b@example.com": [(busy_start, busy_end)]}
+    windows = engine_for(date(2026, 10, 30), date(2026, 11, 3), busy).free_windows(60)
+    spans = [(w["start"], w["end"]) for w in windows]
+    assert spans == [
+        ("2026-10-30T09:00:00-04:00", "2026-10-30T17:00:00-04:00"),
+        ("2026-10-31T09:00:00-04:00", "2026-10-31T17:00:00-04:00"),
+        ("2026-11-01T09:00:00-05:00", "2026-11-01T17:00:00-05:00"),
+        ("2026-11-03T09:00:00-05:00", "2026-11-03T17:00:00-05:00"),
+    ]
@@ -0,0 +1,149 @@
+import asyncio
+import heapq
+import json
+import time
+from datetime import timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import google.auth.transport.requests
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+
+from app_logging import get_logger
+from client_pool import CalendarClientPool
+from session_store import KeyValueStore
+
+logger = get_logger("token_refresher")
+
+# Refresh this long before Google's access token expires (they live for an hour)
+REFRESH_MARGIN_SECONDS = 5 * 60
+# How often the refresher wakes up to look for tokens that are due
+REFRESH_CHECK_INTERVAL_SECONDS = 30
+REFRESH_CONCURRENCY = 8
+# A refresh that failed for a transient reason is tried again after this long
+REFRESH_RETRY_SECONDS = 60
+
+
+class TokenRefresher:
+    """
+    Refreshes OAuth access tokens in the background shortly before they expire, so the
+    google-auth lazy refresh inside a request never has to run.
+
+    Expiry times sit in a heap, so each check only looks at the tokens that are due.
+    A refreshed token is written back to the store. The pooled client shares the same
+    Credentials object, so it keeps working and is not rebuilt. Tokens whose refresh
+    grant was revoked are dropped from tracking and their pooled client invalidated.
+    """
+
+    def __init__(
+        self, store: KeyValueStore, pool: CalendarClientPool, scopes: List[str],
+        margin_seconds: float = REFRESH_MARGIN_SECONDS, concurrency: int = REFRESH_CONCURRENCY,
+        refresh_fn: Optional[Callable[[Credentials], None]] = None
+    ):
+        self.store = store
+        self.pool = pool
+        self.scopes = scopes
+        self.margin_seconds = margin_seconds
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._refresh_fn = refresh_fn or (lambda creds: creds.refresh(google.auth.transport.requests.Request()))
+        self._due: Dict[str, float] = {}  # user_id -> unix time the token should be refreshed
+        self._heap: List[Tuple[float, str]] = []  # may hold outdated entries, checked against _due
+        self.refreshes = 0
+        self.failures = 0
+        self.revoked = 0
+
+    def _refresh_at(self, token_json: str) -> Optional[float]:
+        info = json.loads(token_json)
+        if not info.get("refresh_token") or not info.get("expiry"):
+            return None
+        creds = Credentials.from_authorized_user_info(info, scopes=self.scopes)
+        return creds.expiry.replace(tzinfo=timezone.utc).timestamp() - self.margin_seconds
+
+    def track(self, user_id: str, token_json: str) -> None:
+        """Start (or restart) watching a stored token; call whenever one is written."""
+        refresh_at = self._refresh_at(token_json)
+        if refresh_at is None:
+            self._due.pop(user_id, None)
+            return
+        self._schedule(user_id, refresh_at)
+
+    def _schedule(self, user_id: str, refresh_at: float) -> None:
+        self._due[user_id] = refresh_at
+        heapq.heappush(self._heap, (refresh_at, user_id))
+
+    def forget(self, user_id: str) -> None:
+        self._due.pop(user_id, None)
+
+    def track_all(self) -> None:
+        for user_id in self.store.keys():
+            token_json = self.store.get(user_id)
+            if token_json:
+                self.track(user_id, token_json)
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            refresh_at, user_id = heapq.heappop(self._heap)
+            if self._due.get(user_id) == refresh_at:
+                del self._due[user_id]
+                due.append(user_id)
+        return due
+
+    async def refresh_due(self) -> int:
+        due = self.due()
+        if due:
+            await asyncio.gather(*(self._refresh(user_id) for user_id in due))
+        return len(due)
+
+    async def _refresh(self, user_id: str) -> None:
+        async with self._semaphore:
+            token_json = self.store.get(user_id)
+            if not token_json:
+                return
+            # Another worker sharing the store may have refreshed it already
+            refresh_at = self._refresh_at(token_json)
+            if refresh_at is None:
+                return
+            if refresh_at > time.time():
+                self._schedule(user_id, refresh_at)
+                return
+
+            # Refresh the pooled client's own credentials when it is current, so requests
+            # already holding that client see the new token too
+            service = self.pool.peek(user_id, token_json)
+            creds = service.credentials if service is not None else Credentials.from_authorized_user_info(
+                json.loads(token_json), scopes=self.scopes
+            )
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._refresh_fn, creds)
+            except RefreshError as e:
+                if "invalid_grant" in str(e):
+                    logger.info("Refresh token for %s was revoked", user_id)
+                    self.revoked += 1
+                    self.pool.invalidate(user_id)
+                    return
+                self._retry_later(user_id, e)
+                return
+            except Exception as e:
+                self._retry_later(user_id, e)
+                return
+
+            new_json = creds.to_json()
+            self.store[user_id] = new_json
+            self.pool.replace_token(user_id, token_json, new_json)
+            self.refreshes += 1
+            self.track(user_id, new_json)
+
+    def _retry_later(self, user_id: str, error: Exception) -> None:
+        logger.warning("Token refresh for %s failed, retrying: %s", user_id, error)
+        self.failures += 1
+        self._schedule(user_id, time.time() + REFRESH_RETRY_SECONDS)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked": len(self._due),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "revoked": self.revoked,
+        }
@@ -0,0 +1,143 @@
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from app_logging import get_logger
+from session_store import KeyValueStore, MemoryStore
+
+logger = get_logger("watch_channels")
+
+# Google caps events.watch channels at a few weeks; ask for a week and renew before it lapses
+CHANNEL_TTL_SECONDS = 7 * 24 * 60 * 60
+RENEW_MARGIN_SECONDS = 60 * 60
+
+
+@dataclass
+class WatchChannel:
+    channel_id: str
+    resource_id: str
+    user_id: str
+    calendar_id: str
+    expires_at: float  # unix seconds
+
+
+class WatchChannelManager:
+    """
+    Registers Google `events.watch` push channels per user and calendar, renews them
+    before they expire and maps incoming channel ids back to the user they belong to.
+
+    Channels live in `store` (channel id -> WatchChannel dict). With a shared store a
+    notification can land on any worker, and channels outlive a restart.
+    """
+
+    def __init__(
+        self, address: Optional[str], token: str, ttl_seconds: int = CHANNEL_TTL_SECONDS,
+        store: Optional[KeyValueStore] = None
+    ):
+        self.address = address
+        self.token = token
+        self.ttl_seconds = ttl_seconds
+        self.store = store if store is not None else MemoryStore()
+        self.notifications = 0
+        self.renewals = 0
+
+    @property
+    def enabled(self) -> bool:
+        # Google only delivers to a public HTTPS address
+        return bool(self.address)
+
+    def get(self, channel_id: str) -> Optional[WatchChannel]:
+        data = self.store.get(channel_id)
+        return WatchChannel(**data) if data else None
+
+    def channels(self) -> List[WatchChannel]:
+        return [channel for channel in map(self.get, self.store.keys()) if channel is not None]
+
+    def add(self, channel: WatchChannel) -> None:
+        previous = self.for_calendar(channel.user_id, channel.calendar_id)
+        if previous is not None and previous.channel_id != channel.channel_id:
+            self.store.delete(previous.channel_id)
+        self.store.set(channel.channel_id, asdict(channel))
+
+    def remove(self, channel_id: str) -> Optional[WatchChannel]:
+        channel = self.get(channel_id)
+        if channel is not None:
+            self.store.delete(channel_id)
+        return channel
+
+    def lookup(self, channel_id: Optional[str], token: Optional[str]) -> Optional[WatchChannel]:
+        if not channel_id or token != self.token:
+            return None
+        return self.get(channel_id)
+
+    def for_calendar(self, user_id: str, calendar_id: str) -> Optional[WatchChannel]:
+        # One channel per user calendar, so a scan is only as long as the user list
+        for channel in self.channels():
+            if channel.user_id == user_id and channel.calendar_id == calendar_id:
+                return channel
+        return None
+
+    async def register(self, calendar_service) -> WatchChannel:
+        """Open a channel for the service's user/calendar, replacing any existing one."""
+        result = await calendar_service._execute(calendar_service.service.events().watch(
+            calendarId=calendar_service.calendar_id,
+            body={
+                "id": str(uuid.uuid4()),
+                "type": "web_hook",
+                "address": self.address,
+                "token": self.token,
+                "params": {"ttl": str(self.ttl_seconds)},
+            }
+        ))
+        old = self.for_calendar(calendar_service.user_id, calendar_service.calendar_id)
+
+        channel = WatchChannel(
+            channel_id=result["id"],
+            resource_id=result["resourceId"],
+            user_id=calendar_service.user_id,
+            calendar_id=calendar_service.calendar_id,
+            expires_at=int(result.get("expiration", (time.time() + self.ttl_seconds) * 1000)) / 1000,
+        )
+        self.add(channel)
+        if old is not None:
+            await self.stop(calendar_service, old)
+        return channel
+
+    async def stop(self, calendar_service, channel: WatchChannel) -> None:
+        self.remove(channel.channel_id)
+        try:
+            await calendar_service._execute(calendar_service.service.channels().stop(
+                body={"id": channel.channel_id, "resourceId": channel.resource_id}
+            ))
+        except Exception as e:
+            # The channel will lapse on its own at expiry
+            logger.warning("Failed to stop channel %s: %s", channel.channel_id, e)
+
+    def due_for_renewal(self, margin: float = RENEW_MARGIN_SECONDS) -> List[WatchChannel]:
+        deadline = time.time() + margin
+        return [channel for channel in self.channels() if channel.expires_at <= deadline]
+
+    async def renew_due(self, get_service: Callable[[str], object]) -> int:
+        """Re-register every channel close to expiry. `get_service` maps user_id -> CalendarService."""
+        renewed = 0
+        for channel in self.due_for_renewal():
+            # Another worker sharing the store may have renewed it already
+            if self.get(channel.channel_id) is None:
+                continue
+            try:
+                await self.register(get_service(channel.user_id))
+                renewed += 1
+            except Exception as e:
+                logger.warning("Failed to renew channel %s: %s", channel.channel_id, e)
+                if channel.expires_at <= time.time():
+                    self.remove(channel.channel_id)
+        self.renewals += renewed
+        return renewed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self.store),
+            "notifications": self.notifications,
+            "renewals": self.renewals,
+        }